@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import time
+import platform
+import tracemalloc
+import statistics
+from datetime import datetime
+
+# Shared helpers for the benchmark scripts: timing, peak memory and result files
+# that can be compared run-to-run (same seeds, same sizes). Run-to-run comparison uses
+# the fastest repeat (min_s): scheduler and cache noise only ever adds time, so the
+# minimum is the steadiest figure. A case counts as a regression only when it is more
+# than `threshold` slower AND the slowdown exceeds the noise floor: NOISE_FLOOR_S, or
+# the spread (median - min) of either run, whichever is larger.
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+NOISE_FLOOR_S = float(os.getenv("BENCH_NOISE_FLOOR_MS", "2")) / 1000
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def measure(fn, repeats=5, setup=None):
+    """Runs fn() `repeats` times (plus once under tracemalloc). Returns timing + peak memory."""
+    times = []
+    for _ in range(repeats):
+        if setup: setup()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+
+    # Separate traced run: tracemalloc slows code down, so it never feeds the timings
+    if setup: setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_s": round(statistics.median(times), 6),
+        "min_s": round(min(times), 6),
+        "repeats": repeats,
+        "peak_mem_mb": round(peak / (1024 * 1024), 3),
+    }
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def _latest_result(suite):
+    if not os.path.isdir(RESULTS_DIR): return None
+    files = sorted(f for f in os.listdir(RESULTS_DIR) if f.startswith(f"{suite}_") and f.endswith(".json"))
+    return os.path.join(RESULTS_DIR, files[-1]) if files else None
+
+
+def _spread(r):
+    return max(0.0, r["median_s"] - r.get("min_s", r["median_s"]))
+
+
+def save_results(suite, results, compare_to=None, threshold=0.10, noise_floor=NOISE_FLOOR_S):
+    """
+    Writes results/<suite>_<timestamp>.json and prints the change (of min_s) against the
+    previous run (or compare_to). Cases more than `threshold` slower, by more than the
+    noise floor, are flagged as regressions. Returns the number of regressions.
+    """
+    previous_path = compare_to or _latest_result(suite)
+    previous = {}
+    if previous_path and os.path.exists(previous_path):
+        with open(previous_path, "r", encoding="utf-8") as fh:
+            previous = {r["case"]: r for r in json.load(fh)["results"]}
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"{suite}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, "w", encoding="utf-8") as fh:
+        json.dump({"suite": suite, "environment": environment(), "results": results}, fh, indent=2)
+
+    regressions = 0
+    print(f"\n{'case':<58} {'min':>10} {'median':>10} {'peak MB':>9} {'vs prev':>9}")
+    for r in results:
+        delta = ""
+        old = previous.get(r["case"])
+        # Older result files only have median_s
+        new_s, old_s = r.get("min_s", r["median_s"]), old and old.get("min_s", old.get("median_s"))
+        if old_s:
+            change = (new_s - old_s) / old_s
+            delta = f"{change:+.0%}"
+            noise = max(noise_floor, _spread(r), _spread(old))
+            if change > threshold and new_s - old_s > noise:
+                delta += " ⚠️"
+                regressions += 1
+        print(f"{r['case']:<58} {new_s:>9.4f}s {r['median_s']:>9.4f}s {r['peak_mem_mb']:>9.1f} {delta:>9}")
+    print(f"\n📄 Saved: {out_path}")
+    if previous_path: print(f"   Compared with: {previous_path}")
+    return regressions
@@ -0,0 +1,140 @@
+# backend/benchmarks/bench_fixtures.py
+# Offline accuracy + speed harness for product detail extraction, over the recorded
+# page corpus in fixtures/product_pages (<ASIN>.html, expected output in expected.json).
+#
+#   python -m benchmarks.bench_fixtures                    # every fixture
+#   python -m benchmarks.bench_fixtures --budget-kb 64     # streamed read under a tight budget
+#   python -m benchmarks.bench_fixtures --record B0XXXXXXXX  # add a live page (1 Scrape.do credit)
+#
+# Per fixture and method it reports parse time, peak allocated memory and how many
+# output fields match expected.json:
+#   parse_selective / parse_soup   - the two parsers on the page in memory
+#   fetch_full / fetch_streamed    - fetch_product_page() + parse against a local
+#                                    Scrape.do stand-in (benchmarks/scrape_do_stub.py)
+# A wrong field fails the run, except for a streamed read cut off by the byte budget
+# (that is reported as completeness, not as an error). Recorded expectations come from
+# the reference BeautifulSoup parser; review them before committing a new fixture.
+import os
+import json
+import argparse
+
+from benchmarks._common import measure, save_results
+from benchmarks.scrape_do_stub import FIXTURES_DIR, ScrapeDoStub
+
+from features import amazon_details
+from features.amazon_details import (FETCH_CHUNK, PAGE_BYTE_BUDGET, STREAM_STATS, fetch_product_page,
+                                     parse_product_page, parse_product_page_soup, read_until_complete)
+
+EXPECTED_FILE = "expected.json"
+
+
+def load_corpus(fixtures_dir):
+    with open(os.path.join(fixtures_dir, EXPECTED_FILE), "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _accuracy(actual, expected):
+    wrong = [k for k in expected if actual.get(k) != expected[k]]
+    return len(expected) - len(wrong), wrong
+
+
+# --- RECORDING ---
+def record(asins, fixtures_dir):
+    """Fetches live pages through Scrape.do into the corpus (full body, no streaming)."""
+    token = os.getenv("SCRAPE_DO_TOKEN")
+    if not token: raise SystemExit("❌ SCRAPE_DO_TOKEN missing in .env (needed to record)")
+    corpus = load_corpus(fixtures_dir)
+    for asin in asins:
+        html, error = fetch_product_page(asin, token, stream=False)
+        if error: raise SystemExit(f"❌ {asin}: {error}")
+        with open(os.path.join(fixtures_dir, f"{asin}.html"), "w", encoding="utf-8") as fh:
+            fh.write(html)
+        corpus[asin] = parse_product_page_soup(html, asin)
+        print(f"📥 Recorded {asin} ({len(html) // 1024} KB): {json.dumps(corpus[asin], ensure_ascii=False)[:200]}")
+    with open(os.path.join(fixtures_dir, EXPECTED_FILE), "w", encoding="utf-8") as fh:
+        json.dump(corpus, fh, indent=2, ensure_ascii=False)
+
+
+# --- BENCHMARKS ---
+def bench_fixture(asin, expected, stub, budget, repeats):
+    """Returns (results, failures) for one recorded page."""
+    with open(stub.page_path(asin), "r", encoding="utf-8") as fh:
+        html = fh.read()
+    size_kb = len(html.encode("utf-8")) // 1024
+
+    def fetch(stream):
+        page, error = fetch_product_page(asin, "offline", stream=stream, budget=budget)
+        if error: raise RuntimeError(error)
+        return parse_product_page(page, asin)
+
+    methods = {
+        "parse_selective": lambda: parse_product_page(html, asin),
+        "parse_soup": lambda: parse_product_page_soup(html, asin),
+        "fetch_full": lambda: fetch(False),
+        "fetch_streamed": lambda: fetch(True),
+    }
+    results, failures = [], []
+    for method, fn in methods.items():
+        pages_before, read_before = STREAM_STATS.pages, STREAM_STATS.bytes_read
+        result = dict(measure(fn, repeats), case=f"{method}[{asin},{size_kb}KB]")
+        matched, wrong = _accuracy(fn(), expected)
+        result["fields"] = f"{matched}/{len(expected)}"
+        if method == "fetch_streamed":
+            # Client side: the stand-in's socket buffer may already hold the rest
+            pages = STREAM_STATS.pages - pages_before
+            result["read_kb"] = round((STREAM_STATS.bytes_read - read_before) / max(1, pages) / 1024, 1)
+        if wrong:
+            # A budget cut may legitimately lose fields; anything else is an extraction bug
+            budget_cut = False
+            if method == "fetch_streamed":
+                data = html.encode("utf-8")
+                _, info = read_until_complete((data[i:i + FETCH_CHUNK] for i in range(0, len(data), FETCH_CHUNK)), budget)
+                budget_cut = info["stop"] == "budget"
+            if not budget_cut: failures.append(f"{method}[{asin}]: {', '.join(wrong)}")
+        results.append(result)
+        if method == "fetch_streamed":
+            print(f"   streamed: {result['fields']} fields, read {result['read_kb']} of {size_kb} KB")
+    return results, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recorded product page corpus: accuracy and speed")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--only", action="append", default=[], help="ASIN to run (repeatable)")
+    parser.add_argument("--budget-kb", type=int, default=PAGE_BYTE_BUDGET // 1024, help="streamed read byte budget")
+    parser.add_argument("--delay-ms", type=int, default=0, help="stand-in delay per 16 KB chunk (slow link)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--record", action="append", default=[], help="fetch a live page into the corpus (repeatable)")
+    parser.add_argument("--compare", help="result file to compare against (default: previous run)")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.fixtures)
+        return
+
+    corpus = load_corpus(args.fixtures)
+    asins = args.only or sorted(corpus)
+    results, failures, fields = [], [], {}
+    with ScrapeDoStub(args.fixtures, delay_ms=args.delay_ms) as stub:
+        amazon_details.SCRAPE_DO_ENDPOINT = stub.endpoint
+        for asin in asins:
+            print(f"⏱️ {asin}")
+            fixture_results, fixture_failures = bench_fixture(asin, corpus[asin], stub, args.budget_kb * 1024, args.repeats)
+            results.extend(fixture_results)
+            failures.extend(fixture_failures)
+            for r in fixture_results:
+                method = r["case"].split("[")[0]
+                matched, total = map(int, r["fields"].split("/"))
+                done = fields.setdefault(method, [0, 0])
+                done[0] += matched
+                done[1] += total
+
+    print("\n📊 Field accuracy: " + ", ".join(f"{m} {ok}/{total}" for m, (ok, total) in fields.items()))
+    for failure in failures:
+        print(f"❌ {failure}")
+    regressions = save_results("fixtures", results, compare_to=args.compare)
+    raise SystemExit(1 if failures or regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
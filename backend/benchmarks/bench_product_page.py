@@ -0,0 +1,149 @@
+# backend/benchmarks/bench_product_page.py
+# Parse-time / peak-memory benchmark for features/amazon_details.py: the selective
+# extractor (parse_product_page) against the previous full BeautifulSoup parse, and
+# the streamed early-stop read (read_until_complete + parse of the prefix).
+#
+#   python -m benchmarks.bench_product_page                    # synthetic 0.3/1.5 MB pages
+#   python -m benchmarks.bench_product_page --page saved.html  # + real saved pages
+#
+# Both parsers must return the same dict for every page; a mismatch fails the run.
+# The streamed read is reported with its completeness: how many output fields match
+# the full-page parse, and how much of the page was read before stopping.
+# Synthetic pages are generated once (fixed seeds) under cache/bench_data and reused.
+import os
+import json
+import random
+import argparse
+
+from benchmarks._common import BACKEND_DIR, measure, save_results
+
+from features.amazon_details import (FETCH_CHUNK, PAGE_BYTE_BUDGET, parse_product_page,
+                                     parse_product_page_soup, read_until_complete)
+
+DEFAULT_DATA_DIR = os.path.join(BACKEND_DIR, 'cache', 'bench_data')
+WORDS = ["wireless", "charger", "fast", "usb", "cable", "premium", "braided", "compatible",
+         "iphone", "android", "durable", "warranty", "portable", "adapter", "smart", "home"]
+
+
+# --- SYNTHETIC PAGE ---
+def _sentence(rng, n=12):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize()
+
+
+def _filler(rng, blocks):
+    """Navigation, carousels, reviews and inline scripts: the bulk of a real page."""
+    parts = []
+    for i in range(blocks):
+        kind = i % 4
+        if kind == 0:
+            items = "".join(f'<li class="nav-item"><a href="/s?k={rng.choice(WORDS)}">{_sentence(rng, 3)}</a></li>' for _ in range(20))
+            parts.append(f'<div class="nav-section" data-idx="{i}"><ul>{items}</ul></div>')
+        elif kind == 1:
+            payload = json.dumps({"asins": [f"B0{rng.randrange(10**8):08d}" for _ in range(30)], "widget": "landingImage-carousel"})
+            parts.append(f'<script type="text/javascript">P.when("A").execute(function(){{ var d = {payload}; if (a < b) {{ d.x = \'<span id="productTitle">\'; }} }});</script>')
+        elif kind == 2:
+            reviews = "".join(f'<div class="review"><span class="a-profile-name">{_sentence(rng, 2)}</span><p>{_sentence(rng, 40)} &amp; more</p></div>' for _ in range(6))
+            parts.append(f'<div class="reviews-block">{reviews}</div>')
+        else:
+            parts.append(f'<style>.c{i} {{ color: #333; margin: 0 auto; }} .c{i} > span {{ display: none; }}</style>')
+    return "".join(parts)
+
+
+def make_product_page(data_dir, target_kb):
+    path = os.path.join(data_dir, f"product_page_{target_kb}kb.html")
+    if os.path.exists(path): return path
+
+    rng = random.Random(target_kb)
+    images = {f"https://m.media-amazon.com/images/I/71{rng.randrange(10**6)}._SX{w}_.jpg": [w, w] for w in (300, 450, 679, 1500)}
+    bullets = "".join(f'<li><span class="a-list-item"> {_sentence(rng, 18)} &amp; {_sentence(rng, 4)} </span></li>' for _ in range(7))
+    head = (f'<head><meta charset="utf-8"><title>Amazon.in</title>'
+            f'<meta name="description" content="{_sentence(rng, 25)}">{_filler(rng, 8)}</head>')
+    product = (
+        f'<div id="centerCol"><h1 id="title"><span id="productTitle" class="a-size-large"> {_sentence(rng, 14)} '
+        f'<!-- sponsored --> </span></h1>'
+        f'<div id="bylineInfo_feature_div"><a id="bylineInfo" class="a-link-normal" href="/stores/x">Visit the Portronics Store</a></div>'
+        f'<div id="imgTagWrapperId" class="imgTagWrapper"><img alt="x" src="https://m.media-amazon.com/images/I/71x._AC_SY300_.jpg" '
+        f'data-old-hires="" data-a-dynamic-image="{json.dumps(images).replace(chr(34), "&quot;")}" id="landingImage"></div>'
+        f'<div id="feature-bullets" class="a-section"><ul class="a-unordered-list">{bullets}'
+        f'<li class="a-declarative"><span>Show more</span></li></ul></div></div>'
+    )
+    page = f'<!doctype html><html lang="en-in">{head}<body>'
+    filler_blocks = max(1, (target_kb * 1024) // 1300)
+    # Targets sit after the first third of the page, like the real layout
+    page += _filler(rng, filler_blocks // 3) + product + _filler(rng, filler_blocks - filler_blocks // 3) + '</body></html>'
+
+    os.makedirs(data_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(page)
+    return path
+
+
+# --- BENCHMARKS ---
+def bench_page(path, repeats):
+    with open(path, "r", encoding="utf-8", errors="replace") as fh:
+        html = fh.read()
+    name = os.path.basename(path)
+    size_kb = len(html.encode("utf-8")) // 1024
+
+    selective = parse_product_page(html, "B0BENCH000")
+    soup = parse_product_page_soup(html, "B0BENCH000")
+    if selective != soup:
+        diff = {k: (selective.get(k), soup.get(k)) for k in soup if selective.get(k) != soup.get(k)}
+        raise SystemExit(f"❌ {name}: extractors disagree: {diff}")
+
+    return [
+        dict(measure(lambda: parse_product_page(html, "B0BENCH000"), repeats), case=f"parse_selective[{name},{size_kb}KB]"),
+        dict(measure(lambda: parse_product_page_soup(html, "B0BENCH000"), repeats), case=f"parse_soup[{name},{size_kb}KB]"),
+    ]
+
+
+def bench_stream(path, budget, repeats):
+    """Streamed read of a saved page in FETCH_CHUNK pieces, compared field by field with the full parse."""
+    with open(path, "rb") as fh:
+        data = fh.read()
+    name = os.path.basename(path)
+    full = parse_product_page(data.decode("utf-8", errors="replace"), "B0BENCH000")
+
+    def run():
+        chunks = (data[i:i + FETCH_CHUNK] for i in range(0, len(data), FETCH_CHUNK))
+        prefix, info = read_until_complete(chunks, budget)
+        return parse_product_page(prefix, "B0BENCH000"), info
+
+    streamed, info = run()
+    matching = [k for k in full if streamed.get(k) == full[k]]
+    result = dict(measure(run, repeats), case=f"parse_streamed[{name},{budget // 1024}KB budget]")
+    result.update(stop=info["stop"], read_pct=round(100 * info["bytes"] / len(data), 1),
+                  fields_matching=f"{len(matching)}/{len(full)}")
+    print(f"   streamed: stopped on {info['stop']} after {result['read_pct']}% of the page, "
+          f"{result['fields_matching']} fields match the full parse")
+    return result, len(matching) == len(full)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product page extraction benchmarks")
+    parser.add_argument("--sizes", default="300,1500", help="comma separated synthetic page sizes (KB)")
+    parser.add_argument("--page", action="append", default=[], help="saved product page (repeatable)")
+    parser.add_argument("--budget-kb", type=int, default=PAGE_BYTE_BUDGET // 1024, help="streamed read byte budget")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--compare", help="result file to compare against (default: previous run)")
+    args = parser.parse_args()
+
+    pages = [make_product_page(args.data_dir, int(kb)) for kb in args.sizes.split(",") if kb]
+    pages += args.page
+
+    results, complete = [], 0
+    for path in pages:
+        print(f"⏱️ Parsing {os.path.basename(path)}")
+        results.extend(bench_page(path, args.repeats))
+        result, identical = bench_stream(path, args.budget_kb * 1024, args.repeats)
+        results.append(result)
+        complete += identical
+    print(f"📊 Streamed read matched the full parse on {complete}/{len(pages)} pages")
+
+    regressions = save_results("product_page", results, compare_to=args.compare)
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+# backend/benchmarks/bench_sku_pipeline.py
+# Catalog-scale benchmarks for features/sku_printing.py (printing disabled).
+#
+#   python -m benchmarks.bench_sku_pipeline            # 1k/10k labels, 1k/100k rows
+#   python -m benchmarks.bench_sku_pipeline --full     # + 100k labels, 1M rows
+#   python -m benchmarks.bench_sku_pipeline --labels 5000 --rows 20000 --formats csv
+#
+# Synthetic data is generated once (fixed seeds) under cache/bench_data and reused.
+# Each run is saved to benchmarks/results/ and compared with the previous run.
+import os
+import time
+import random
+import string
+import argparse
+
+from benchmarks._common import BACKEND_DIR, measure, save_results
+
+import pandas as pd
+import openpyxl
+
+from features import label_index
+from features.label_index import get_label_index
+from features.print_backends import PreviewBackend, RawSocketBackend
+from features.print_scheduler import PrintJob, PrintScheduler
+from features.sku_printing import find_label_file, process_order_file, resolve_order_skus
+from features.report_export import PARQUET_AVAILABLE, ReportWriter
+from features.ingest import detect_layout, iter_chunks
+from fake_printer import FakePrinter
+
+DEFAULT_DATA_DIR = os.path.join(BACKEND_DIR, 'cache', 'bench_data')
+DESCRIPTIONS = ["Remote", "Cover", "Case", "Charger", "Cable 1m", "Adapter", "Battery Pack"]
+
+
+# --- SYNTHETIC DATA ---
+def _sku(rng):
+    return f"{''.join(rng.choices(string.ascii_uppercase, k=2))}-{''.join(rng.choices(string.ascii_uppercase + string.digits, k=6))}"
+
+
+def make_label_folder(data_dir, count):
+    """Folder of `count` empty .lbl files named like real templates. Reused if already complete."""
+    folder = os.path.join(data_dir, f"labels_{count}")
+    marker = os.path.join(folder, ".complete")
+    rng = random.Random(count)
+    skus = [_sku(rng) for _ in range(count)]
+    if os.path.exists(marker): return folder, skus
+
+    os.makedirs(folder, exist_ok=True)
+    for sku in skus:
+        desc = rng.choice(DESCRIPTIONS)
+        open(os.path.join(folder, f"{sku} {desc}.lbl"), "w").close()
+    open(marker, "w").close()
+    return folder, skus
+
+
+def make_order_sheet(data_dir, rows, label_skus, fmt, header):
+    """Order sheet with repeated SKUs (~80% known, 20% missing) and some zero/invalid quantities."""
+    name = f"orders_{rows}_{len(label_skus)}_{'hdr' if header else 'nohdr'}.{fmt}"
+    path = os.path.join(data_dir, name)
+    if os.path.exists(path): return path
+
+    rng = random.Random(rows)
+    hot = label_skus[: max(1, len(label_skus) // 5)]
+    quantities = [1, 1, 1, 2, 3, 5, 0, "n/a"]
+
+    def generate():
+        for _ in range(rows):
+            sku = rng.choice(hot) if rng.random() < 0.8 else _sku(rng)
+            yield sku, rng.choice(quantities)
+
+    if fmt == "csv":
+        with open(path, "w", encoding="utf-8") as fh:
+            if header: fh.write("Order ID,Seller SKU,Qty\n")
+            for i, (sku, qty) in enumerate(generate()):
+                fh.write(f"{i},{sku},{qty}\n" if header else f"{sku},{qty}\n")
+    else:
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        if header: ws.append(["Order ID", "Seller SKU", "Qty"])
+        for i, (sku, qty) in enumerate(generate()):
+            ws.append([i, sku, qty] if header else [sku, qty])
+        wb.save(path)
+    return path
+
+
+# --- CASES ---
+def bench_index_build(folder, count, repeats):
+    def reset():
+        label_index._indexes.clear()
+        try: os.remove(label_index._index_path(folder))
+        except FileNotFoundError: pass
+    result = measure(lambda: get_label_index(folder), repeats, setup=reset)
+    return dict(result, case=f"label_index_build[labels={count}]")
+
+
+def bench_lookups(folder, count, skus, repeats, lookups=1000):
+    rng = random.Random(7)
+    queries = [rng.choice(skus) for _ in range(lookups // 2)] + [_sku(rng) for _ in range(lookups - lookups // 2)]
+    index = get_label_index(folder)
+
+    def run():
+        for q in queries:
+            find_label_file(q, folder)
+    result = measure(run, repeats, setup=index._memo.clear)
+    return dict(result, case=f"find_label_file[labels={count},n={lookups}]")
+
+
+def bench_process(folder, count, order_path, rows, fmt, header, repeats, work_dir):
+    os.chdir(work_dir)  # reports land in ./uploads
+    backend = [PreviewBackend()]
+    result = measure(lambda: process_order_file(order_path, folder, printers=backend), repeats)
+    return dict(result, case=f"process_order_file[{fmt},{'hdr' if header else 'nohdr'},rows={rows},labels={count}]")
+
+
+def bench_ingest(order_path, rows, fmt, repeats):
+    """Upload parsing alone: features/ingest.py streaming vs a full pandas read."""
+    def streaming():
+        layout = detect_layout(order_path, ("sku", "qty"), fallback={"sku": 0, "qty": 1})
+        return sum(len(chunk) for chunk in iter_chunks(layout))
+    def full_read():
+        return len(pd.read_csv(order_path) if fmt == "csv" else pd.read_excel(order_path))
+    return [
+        dict(measure(streaming, repeats), case=f"ingest[{fmt},rows={rows}]"),
+        dict(measure(full_read, repeats), case=f"ingest_pandas_full[{fmt},rows={rows}]"),
+    ]
+
+
+def bench_report_write(folder, count, order_path, rows, repeats, work_dir):
+    """Streaming ReportWriter per output format (parquet only when pyarrow is installed)."""
+    if order_path.endswith(".csv"):
+        df = pd.read_csv(order_path)
+    else:
+        df = pd.read_excel(order_path)
+    report = resolve_order_skus(df["Seller SKU"], df["Qty"], folder, False).drop(columns=["Label Path"])
+    results = []
+    for fmt in ("xlsx", "csv") + (("parquet",) if PARQUET_AVAILABLE else ()):
+        out_path = os.path.join(work_dir, f"bench_report.{fmt}")
+        def write():
+            with ReportWriter(out_path, list(report.columns), column_types={"Quantity": "int64"}) as out:
+                out.write_frame(report)
+        results.append(dict(measure(write, repeats), case=f"report_write[{fmt},rows={rows}]"))
+    return results
+
+
+def bench_print_pool(data_dir, repeats, printers=2, seconds_per_label=0.05, jobs=8, qty=10):
+    """
+    Scheduler against fake raw printers that print at a fixed speed. run() must last as
+    long as the printing itself and split equal jobs evenly; its labels/min must match the
+    printers' real rate. A scheduler timing socket writes instead of printing fails the run.
+    """
+    folder = os.path.join(data_dir, "print_pool")
+    os.makedirs(folder, exist_ok=True)
+    labels = []
+    for i in range(jobs):
+        stem = os.path.join(folder, f"PP-{i:04d} Remote")
+        open(stem + ".lbl", "w").close()
+        with open(stem + ".zpl", "w") as fh:
+            fh.write(f"^XA^FO50,50^A0N,40,40^FDPP-{i:04d}^FS^PQ1^XZ")
+        labels.append(stem + ".lbl")
+
+    fakes = [FakePrinter(seconds_per_label=seconds_per_label).start() for _ in range(printers)]
+    last = {}
+    try:
+        def run():
+            backends = [RawSocketBackend(f.host, f.port) for f in fakes]
+            for b in backends: b.STATUS_POLL_SECONDS = 0.01   # fake labels are 20x faster than real ones
+            scheduler = PrintScheduler(backends)
+            started = time.perf_counter()
+            done = scheduler.run([PrintJob(path, os.path.basename(path), qty) for path in labels])
+            last.update(wall=time.perf_counter() - started, stats=scheduler.stats(),
+                        printed=sum(j.status == "PRINTED" for j in done))
+        result = measure(run, repeats)
+    finally:
+        for f in fakes: f.stop()
+
+    printing_seconds = jobs * qty * seconds_per_label / printers
+    split = [s["jobs"] for s in last["stats"]]
+    rate = sum(s["labels_per_minute"] for s in last["stats"]) / printers
+    print(f"   {last['printed']}/{jobs} printed in {last['wall']:.2f}s (printing alone: {printing_seconds:.2f}s), "
+          f"jobs per printer {split}, {rate:.0f} labels/min per printer (real: {60 / seconds_per_label:.0f})")
+    if last["wall"] < printing_seconds * 0.9:
+        raise SystemExit("❌ print pool: run() returned before the printers finished printing")
+    if max(split) - min(split) > 1:
+        raise SystemExit(f"❌ print pool: identical printers got uneven work {split}")
+    if rate > 60 / seconds_per_label * 1.15:
+        raise SystemExit(f"❌ print pool: {rate:.0f} labels/min is faster than the printers can print")
+    return dict(result, case=f"print_pool[printers={printers},jobs={jobs}x{qty}]", jobs_per_printer=split,
+                labels_per_minute=round(rate, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SKU pipeline benchmarks")
+    parser.add_argument("--labels", default="1000,10000", help="comma separated label folder sizes")
+    parser.add_argument("--rows", default="1000,100000", help="comma separated order sheet sizes")
+    parser.add_argument("--formats", default="csv,xlsx")
+    parser.add_argument("--full", action="store_true", help="add 100k labels and 1M rows")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--compare", help="result file to compare against (default: previous run)")
+    args = parser.parse_args()
+
+    label_sizes = [int(x) for x in args.labels.split(",") if x]
+    row_sizes = [int(x) for x in args.rows.split(",") if x]
+    if args.full:
+        label_sizes = sorted(set(label_sizes + [100000]))
+        row_sizes = sorted(set(row_sizes + [1000000]))
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    work_dir = os.path.join(args.data_dir, "work")
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+
+    print("🏗️ Preparing label folders...")
+    folders = {n: make_label_folder(args.data_dir, n) for n in label_sizes}
+
+    for n, (folder, skus) in folders.items():
+        print(f"⏱️ Label index / lookups: {n} labels")
+        results.append(bench_index_build(folder, n, args.repeats))
+        results.append(bench_lookups(folder, n, skus, args.repeats))
+
+    # Order sheets run against the biggest catalog
+    n = max(label_sizes)
+    folder, skus = folders[n]
+    for rows in row_sizes:
+        for fmt in formats:
+            for header in (True, False):
+                print(f"⏱️ process_order_file: {rows} rows, {fmt}, header={header}")
+                order_path = make_order_sheet(args.data_dir, rows, skus, fmt, header)
+                results.append(bench_process(folder, n, order_path, rows, fmt, header, args.repeats, work_dir))
+            print(f"⏱️ Ingest: {rows} rows, {fmt}")
+            results.extend(bench_ingest(make_order_sheet(args.data_dir, rows, skus, fmt, True), rows, fmt, args.repeats))
+        print(f"⏱️ Report writing: {rows} rows")
+        order_path = make_order_sheet(args.data_dir, rows, skus, formats[0], True)
+        results.extend(bench_report_write(folder, n, order_path, rows, args.repeats, work_dir))
+
+    print("⏱️ Print pool: fake printers")
+    results.append(bench_print_pool(args.data_dir, args.repeats))
+
+    regressions = save_results("sku_pipeline", results, compare_to=args.compare)
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
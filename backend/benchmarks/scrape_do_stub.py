@@ -0,0 +1,123 @@
+# backend/benchmarks/scrape_do_stub.py
+# Local stand-in for the Scrape.do API: serves recorded product pages by ASIN so the
+# fetch + extraction path runs offline, without credits. Pages are sent in chunks
+# (optionally with a per-chunk delay to model a slow link); a client that stops
+# reading early just closes the connection, as with the real API.
+#
+#   with ScrapeDoStub(FIXTURES_DIR) as stub:
+#       amazon_details.SCRAPE_DO_ENDPOINT = stub.endpoint
+#
+#   python -m benchmarks.scrape_do_stub --port 8765   # standalone, for manual runs
+import os
+import re
+import time
+import argparse
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures', 'product_pages')
+
+_ASIN_RE = re.compile(r"/dp/([A-Z0-9]{10})")
+
+
+class ScrapeDoStub:
+    def __init__(self, fixtures_dir=FIXTURES_DIR, port=0, chunk_kb=16, delay_ms=0):
+        self.fixtures_dir = fixtures_dir
+        self.chunk = chunk_kb * 1024
+        self.delay = delay_ms / 1000
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def page_path(self, asin):
+        return os.path.join(self.fixtures_dir, f"{asin}.html")
+
+    def _count(self):
+        with self._lock:
+            self.requests += 1
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                match = _ASIN_RE.search(query.get("url", [""])[0])
+                path = stub.page_path(match.group(1)) if match else None
+                if not query.get("token"):
+                    return self._reply(401, b"Unauthorized: token missing")
+                if path is None or not os.path.exists(path):
+                    return self._reply(404, b"Target page not found")
+
+                with open(path, "rb") as fh:
+                    body = fh.read()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                stub._count()
+                try:
+                    for pos in range(0, len(body), stub.chunk):
+                        if stub.delay: time.sleep(stub.delay)
+                        self.wfile.write(body[pos:pos + stub.chunk])
+                except (BrokenPipeError, ConnectionResetError):
+                    pass   # client stopped reading early
+
+            def _reply(self, status, message):
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(message)))
+                self.end_headers()
+                self.wfile.write(message)
+                stub._count()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Scrape.do stand-in serving recorded pages")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--chunk-kb", type=int, default=16)
+    parser.add_argument("--delay-ms", type=int, default=0, help="sleep before each chunk")
+    args = parser.parse_args()
+
+    stub = ScrapeDoStub(args.fixtures, args.port, args.chunk_kb, args.delay_ms)
+    print(f"🧪 Scrape.do stand-in on {stub.endpoint} (set SCRAPE_DO_ENDPOINT to use it)")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
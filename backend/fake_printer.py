@@ -0,0 +1,127 @@
+# backend/fake_printer.py
+# Local stand-in for a Zebra network printer (raw TCP 9100).
+# Use it to try the raw print backend without hardware:
+#   python fake_printer.py --port 9100
+#   SKU_PRINT_BACKEND=raw SKU_PRINTER_HOST=127.0.0.1 SKU_PRINTER_PORT=9100 python server.py
+import re
+import time
+import argparse
+import threading
+import socketserver
+from collections import deque
+
+
+class FakePrinter:
+    """
+    Threaded TCP server that behaves like a Zebra on port 9100: one print head (labels
+    come out one at a time, seconds_per_label each, whatever connection sent them) behind
+    a receive buffer of `buffer_formats` formats. While the buffer is full the connection
+    isn't read, so senders are held to the printer's pace. ~HS is answered at once with
+    the formats still buffered and the labels left in the current batch;
+    answer_status=False models a device that ignores it.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, seconds_per_label=0.0, buffer_formats=2, answer_status=True):
+        self.jobs = []                  # payload of every format, once printed
+        self.seconds_per_label = seconds_per_label
+        self.buffer_formats = buffer_formats
+        self.answer_status = answer_status
+        self._waiting = deque()         # (payload, labels) received, not started
+        self._labels_left = 0           # labels left in the batch being printed
+        self._cond = threading.Condition()
+        printer = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                buffer = b""
+                while True:
+                    data = self.request.recv(4096)
+                    if not data: break
+                    buffer += data
+                    # Tilde commands are handled immediately, ahead of queued formats
+                    while b"~HS" in buffer:
+                        buffer = buffer.replace(b"~HS", b"", 1)
+                        if printer.answer_status: self.request.sendall(printer.host_status())
+                    while b"^XZ" in buffer:
+                        fmt, buffer = buffer.split(b"^XZ", 1)
+                        if b"^XA" in fmt: printer._receive(fmt[fmt.index(b"^XA"):] + b"^XZ")
+                # health checks just connect and close
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            request_queue_size = 128
+
+        self.server = Server((host, port), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address
+        self._thread = None
+        self._engine = threading.Thread(target=self._print_engine, daemon=True)
+
+    def _receive(self, payload):
+        labels = sum(int(q) for q in re.findall(rb'\^PQ(\d+)', payload)) or 1
+        with self._cond:
+            # Buffer full: stop reading this connection until the head frees a slot
+            while len(self._waiting) >= self.buffer_formats:
+                self._cond.wait()
+            self._waiting.append((payload, labels))
+            self._cond.notify_all()
+
+    def _print_engine(self):
+        while True:
+            with self._cond:
+                while not self._waiting:
+                    self._cond.wait()
+                payload, labels = self._waiting.popleft()
+                self._labels_left = labels
+                self._cond.notify_all()
+            for _ in range(labels):
+                if self.seconds_per_label: time.sleep(self.seconds_per_label)
+                with self._cond:
+                    self._labels_left -= 1
+            with self._cond:
+                self.jobs.append(payload)
+                self._cond.notify_all()
+
+    def host_status(self):
+        """~HS reply: formats in receive buffer (string 1, field 5), labels remaining (string 2, field 9)."""
+        with self._cond:
+            formats, remaining = len(self._waiting), self._labels_left
+        return (f"\x02030,0,0,1245,{formats:03d},0,0,0,000,0,0,0\x03\r\n"
+                f"\x02001,0,0,0,1,2,6,0,{remaining:08d},1,000\x03\r\n"
+                f"\x021234,0\x03\r\n").encode("ascii")
+
+    def wait_idle(self, timeout=None):
+        """Blocks until everything received has been printed."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._waiting and not self._labels_left, timeout)
+
+    def start(self):
+        self._engine.start()
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake raw-socket label printer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--seconds-per-label", type=float, default=0.0)
+    args = parser.parse_args()
+
+    printer = FakePrinter(args.host, args.port, args.seconds_per_label).start()
+    print(f"🖨️ Fake printer listening on {printer.host}:{printer.port} (Ctrl+C to stop)")
+    try:
+        printer._thread.join()
+    except KeyboardInterrupt:
+        printer.stop()
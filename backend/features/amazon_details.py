@@ -2,16 +2,100 @@ import requests
 import re
 import os
 import json
+import codecs
+import threading
+from collections import Counter
 import urllib.parse
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
+from .html_extract import find_element, IncrementalExtractor
+from .details_cache import DETAILS_CACHE
+
 current_file_path = os.path.abspath(__file__)
 features_dir = os.path.dirname(current_file_path)
 backend_dir = os.path.dirname(features_dir)
 env_path = os.path.join(backend_dir, '.env')
 load_dotenv(dotenv_path=env_path)
 
+# Overridable for offline runs (benchmarks/scrape_do_stub.py serves recorded pages)
+SCRAPE_DO_ENDPOINT = os.getenv("SCRAPE_DO_ENDPOINT", "http://api.scrape.do")
+
+# --- STREAMING FETCH (byte budget + early stop) ---
+# Everything we extract sits in the first part of the page; the rest is reviews,
+# carousels and scripts. With streaming on, the body is read in chunks and fed to an
+# IncrementalExtractor, and the download stops as soon as every REQUIRED_TARGETS
+# element has fully arrived, or once PAGE_BYTE_BUDGET bytes have been read, whichever
+# comes first. parse_product_page() then runs on the prefix. Stop reasons and per-field
+# hit rates are counted in STREAM_STATS (GET /api/amazon-details/stats), to check
+# completeness against full-page parsing. A read cut off by the budget before every
+# required element arrived is returned with "partial": True and the missing fields, and
+# is not cached (the next lookup fetches again).
+STREAM_FETCH = os.getenv("DETAILS_STREAM_FETCH", "1") != "0"
+PAGE_BYTE_BUDGET = int(os.getenv("DETAILS_BYTE_BUDGET_KB", "1024")) * 1024
+FETCH_CHUNK = 16 * 1024
+
+# field -> alternatives; any one complete element satisfies the field
+REQUIRED_TARGETS = {
+    "title": [("span", {"id": "productTitle"})],
+    "brand": [("a", {"id": "bylineInfo"})],
+    "image": [("div", {"id": "imgTagWrapperId"}), ("img", {"id": "landingImage"})],
+    "bullets": [("div", {"id": "feature-bullets"})],
+}
+
+
+class StreamStats:
+    """Counters for streamed page reads: why each read stopped and which fields it found."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.bytes_read = 0
+        self.stops = Counter()    # complete | budget | eof
+        self.fields = Counter()   # field -> pages where it was found
+
+    def record(self, info):
+        with self._lock:
+            self.pages += 1
+            self.bytes_read += info["bytes"]
+            self.stops[info["stop"]] += 1
+            self.fields.update(info["found"])
+
+    def snapshot(self):
+        with self._lock:
+            pages = self.pages or 1
+            return {
+                "pages": self.pages,
+                "avg_kb_read": round(self.bytes_read / pages / 1024, 1),
+                "stops": dict(self.stops),
+                "field_rates": {name: round(self.fields[name] / pages, 3) for name in REQUIRED_TARGETS},
+            }
+
+
+STREAM_STATS = StreamStats()
+
+
+def read_until_complete(chunks, budget=PAGE_BYTE_BUDGET, encoding="utf-8", targets=REQUIRED_TARGETS):
+    """
+    Consumes byte chunks until every target element is complete or `budget` bytes were
+    read. Returns (html read so far, {"bytes", "stop": complete|budget|eof, "found"}).
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    extractor = IncrementalExtractor(targets)
+    read, stop = 0, "eof"
+    for chunk in chunks:
+        if not chunk: continue
+        read += len(chunk)
+        if extractor.feed(decoder.decode(chunk)):
+            stop = "complete"
+            break
+        if read >= budget:
+            stop = "budget"
+            break
+    else:
+        extractor.feed(decoder.decode(b"", final=True))
+    return extractor.text, {"bytes": read, "stop": stop, "found": sorted(extractor.found)}
+
 def extract_asin(url):
     """Extracts ASIN (B0...) from any Amazon URL"""
     regex = r"(?:/dp/|/gp/product/)([A-Z0-9]{10})"
@@ -19,104 +103,190 @@ def extract_asin(url):
     if match: return match.group(1)
     return None
 
-def get_product_details(amazon_url):
+def fetch_product_page(asin, api_token, stream=STREAM_FETCH, budget=PAGE_BYTE_BUDGET, info=None):
+    """
+    Product page HTML via the Scrape.do proxy. Returns (html, error).
+    stream=True reads only up to the last element we need (see read_until_complete);
+    pass a dict as `info` to get that read's stop reason and found fields.
+    """
+    # 1. Construct Scrape.do URL
+    # We target the clean DP link to minimize noise
+    target_url = f"https://www.amazon.in/dp/{asin}"
+    encoded_url = urllib.parse.quote(target_url)
+
+    # Scrape.do API Endpoint
+    # render=false (Cheaper, 1 credit) usually works for Amazon product text
+    proxy_url = f"{SCRAPE_DO_ENDPOINT}?token={api_token}&url={encoded_url}"
+
+    if not stream:
+        response = requests.get(proxy_url, timeout=60)
+        if response.status_code != 200:
+            return None, f"Scrape.do Failed: {response.status_code} - {response.text[:100]}"
+        return response.text, None
+
+    # Leaving the block closes the connection, so an early stop skips the rest of the body
+    with requests.get(proxy_url, timeout=60, stream=True) as response:
+        if response.status_code != 200:
+            return None, f"Scrape.do Failed: {response.status_code} - {response.text[:100]}"
+        html, read_info = read_until_complete(response.iter_content(FETCH_CHUNK), budget, response.encoding or "utf-8")
+    STREAM_STATS.record(read_info)
+    if info is not None: info.update(read_info)
+    return html, None
+
+def _clean_landing_image(src):
+    # Strip resizing code if present (e.g. ._AC_XY200_.jpg)
+    return re.sub(r'\._AC_.*?_\.', '.', src)
+
+def _details(asin, title, brand, img_url, description):
+    return {
+        "status": "success",
+        "asin": asin,
+        "title": title,
+        "brand": brand,
+        "image_url": img_url, 
+        "description": description,
+        "seo_url": f"https://www.amazon.in/{title.replace(' ', '-').lower()[:50]}/dp/{asin}"
+    }
+
+def parse_product_page(html, asin):
     """
-    ROBUST VERSION: Uses Scrape.do Proxy API + BeautifulSoup Parsing.
+    Selective extraction: only the handful of elements we need are parsed
+    (features/html_extract.py), not the whole 1 MB+ page.
+    """
+    # A. Title
+    title_tag = find_element(html, "span", {"id": "productTitle"})
+    title = title_tag.get_text().strip() if title_tag else f"Amazon Product {asin}"
+
+    # B. Brand
+    brand = "SEVENXT"
+    byline = find_element(html, "a", {"id": "bylineInfo"})
+    if byline:
+        # Usually says "Visit the Sony Store"
+        text = byline.get_text().replace("Visit the", "").replace("Store", "").strip()
+        if text: brand = text
+
+    # C. HD Image: Hi-Res URLs sit in a JSON attribute on the main image
+    img_url = "https://via.placeholder.com/800"
+    img_div = find_element(html, "div", {"id": "imgTagWrapperId"})
+    if img_div:
+        img_tag = img_div.find("img")
+        if img_tag and 'data-a-dynamic-image' in img_tag.attrs:
+            try:
+                # {"url": [width, height], ...}; the last key is usually the largest image
+                img_url = list(json.loads(img_tag['data-a-dynamic-image']).keys())[-1]
+            except: pass
+
+    # Landing Image Fallback
+    if "placeholder" in img_url:
+        landing_img = find_element(html, "img", {"id": "landingImage"})
+        if landing_img:
+            img_url = _clean_landing_image(landing_img.get('src'))
+
+    # D. Description (Bullet Points)
+    bullets = []
+    feature_div = find_element(html, "div", {"id": "feature-bullets"})
+    if feature_div:
+        for li in feature_div.find_all("li"):
+            # Remove "Show more" buttons or hidden text
+            if "a-declarative" not in li.get('class', []):
+                text = li.get_text().strip()
+                if text: bullets.append(text)
+
+    description = " ".join(bullets[:5]) # Top 5 bullets
+    if not description:
+        # Fallback to meta description
+        meta = find_element(html, "meta", {"name": "description"})
+        if meta: description = meta['content']
+
+    return _details(asin, title, brand, img_url, description)
+
+def parse_product_page_soup(html, asin):
+    """
+    Previous full-tree BeautifulSoup parse, kept as the reference for
+    benchmarks/bench_product_page.py (both must return the same dict).
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    title_tag = soup.find("span", {"id": "productTitle"})
+    title = title_tag.get_text().strip() if title_tag else f"Amazon Product {asin}"
+
+    brand = "SEVENXT"
+    byline = soup.find("a", {"id": "bylineInfo"})
+    if byline:
+        text = byline.get_text().replace("Visit the", "").replace("Store", "").strip()
+        if text: brand = text
+
+    img_url = "https://via.placeholder.com/800"
+    img_div = soup.find("div", {"id": "imgTagWrapperId"})
+    if img_div:
+        img_tag = img_div.find("img")
+        if img_tag and 'data-a-dynamic-image' in img_tag.attrs:
+            try:
+                img_url = list(json.loads(img_tag['data-a-dynamic-image']).keys())[-1]
+            except: pass
+
+    if "placeholder" in img_url:
+        landing_img = soup.find("img", {"id": "landingImage"})
+        if landing_img:
+            img_url = _clean_landing_image(landing_img.get('src'))
+
+    bullets = []
+    feature_div = soup.find("div", {"id": "feature-bullets"})
+    if feature_div:
+        for li in feature_div.find_all("li"):
+            if "a-declarative" not in li.get('class', []):
+                text = li.get_text().strip()
+                if text: bullets.append(text)
+
+    description = " ".join(bullets[:5])
+    if not description:
+        meta = soup.find("meta", {"name": "description"})
+        if meta: description = meta['content']
+
+    return _details(asin, title, brand, img_url, description)
+
+def fetch_details(asin, parse=parse_product_page):
+    """
+    One Scrape.do fetch + parse (the details cache's miss path).
+    parse(html, asin) can be swapped, e.g. to run in a worker process.
     """
     api_token = os.getenv("SCRAPE_DO_TOKEN")
     if not api_token:
         return {"error": "Critical: SCRAPE_DO_TOKEN missing in .env"}
 
+    print(f"📡 Fetching Amazon Page for ASIN: {asin} via Scrape.do...")
+    read_info = {}
+    html, error = fetch_product_page(asin, api_token, info=read_info)
+    if error: return {"error": error}
+
+    # 2. Parse only the elements we need
+    details = parse(html, asin)
+    missing = sorted(set(REQUIRED_TARGETS) - set(read_info.get("found", [])))
+    if read_info.get("stop") == "budget" and missing:
+        # Cut off before these arrived: their fields may be placeholders, so don't cache it
+        details.update(partial=True, missing=missing)
+        print(f"⚠️ Partial page for ASIN {asin}: byte budget hit before {', '.join(missing)}.")
+    print(f"✅ Data Ready: {details['title'][:20]}... | Image Extracted.")
+    return details
+
+def get_product_details(amazon_url, refresh=False):
+    """
+    ROBUST VERSION: Uses Scrape.do Proxy API + selective HTML extraction.
+    Results are cached per ASIN (features/details_cache.py): a repeat lookup costs no
+    proxy credit, and simultaneous lookups of one ASIN share a single fetch.
+    refresh=True bypasses the cached copy.
+    """
     asin = extract_asin(amazon_url)
     if not asin: return {"error": "Invalid Amazon Link."}
 
-    print(f"📡 Fetching Amazon Page for ASIN: {asin} via Scrape.do...")
-
     try:
-        # 1. Construct Scrape.do URL
-        # We target the clean DP link to minimize noise
-        target_url = f"https://www.amazon.in/dp/{asin}"
-        encoded_url = urllib.parse.quote(target_url)
-        
-        # Scrape.do API Endpoint
-        # render=false (Cheaper, 1 credit) usually works for Amazon product text
-        proxy_url = f"http://api.scrape.do?token={api_token}&url={encoded_url}"
-
-        response = requests.get(proxy_url, timeout=60)
-        
-        if response.status_code != 200:
-            return {"error": f"Scrape.do Failed: {response.status_code} - {response.text[:100]}"}
-
-        # 2. Parse HTML with BeautifulSoup
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # --- DATA EXTRACTION LOGIC ---
-
-        # A. Title
-        title_tag = soup.find("span", {"id": "productTitle"})
-        title = title_tag.get_text().strip() if title_tag else f"Amazon Product {asin}"
-
-        # B. Brand
-        brand = "SEVENXT"
-        byline = soup.find("a", {"id": "bylineInfo"})
-        if byline:
-            # Usually says "Visit the Sony Store"
-            text = byline.get_text().replace("Visit the", "").replace("Store", "").strip()
-            if text: brand = text
-
-        # C. HD Image (The Hard Part)
-        # Amazon hides Hi-Res images in a JSON object inside a script tag
-        img_url = "https://via.placeholder.com/800"
-        
-        # Method 1: Dynamic Image Data (Best Quality)
-        img_div = soup.find("div", {"id": "imgTagWrapperId"})
-        if img_div:
-            img_tag = img_div.find("img")
-            if img_tag and 'data-a-dynamic-image' in img_tag.attrs:
-                try:
-                    # It's a JSON dictionary: {"url": [width, height], ...}
-                    img_data = json.loads(img_tag['data-a-dynamic-image'])
-                    # The last key is usually the largest image
-                    img_url = list(img_data.keys())[-1]
-                    print("   ✅ Found HD Image via Dynamic JSON")
-                except: pass
-        
-        # Method 2: Landing Image Fallback
-        if "placeholder" in img_url:
-            landing_img = soup.find("img", {"id": "landingImage"})
-            if landing_img:
-                img_url = landing_img.get('src')
-                # Strip resizing code if present (e.g. ._AC_XY200_.jpg)
-                img_url = re.sub(r'\._AC_.*?_\.', '.', img_url)
-
-        # D. Description (Bullet Points)
-        bullets = []
-        feature_div = soup.find("div", {"id": "feature-bullets"})
-        if feature_div:
-            for li in feature_div.find_all("li"):
-                # Remove "Show more" buttons or hidden text
-                if "a-declarative" not in li.get('class', []):
-                    text = li.get_text().strip()
-                    if text: bullets.append(text)
-        
-        description = " ".join(bullets[:5]) # Top 5 bullets
-        if not description:
-            # Fallback to meta description
-            meta = soup.find("meta", {"name": "description"})
-            if meta: description = meta['content']
-
-        print(f"✅ Data Ready: {title[:20]}... | Image Extracted.")
-
-        return {
-            "status": "success",
-            "asin": asin,
-            "title": title,
-            "brand": brand,
-            "image_url": img_url, 
-            "description": description,
-            "seo_url": f"https://www.amazon.in/{title.replace(' ', '-').lower()[:50]}/dp/{asin}"
-        }
+        details, source = DETAILS_CACHE.get_or_fetch(asin, lambda: fetch_details(asin), refresh=refresh)
+        if source in ("memory", "disk"):
+            print(f"⚡ Details cache hit ({source}) for ASIN: {asin}")
+        if details.get("status") == "success":
+            details["cached"] = source != "fetched"
+        return details
 
     except Exception as e:
         print(f"❌ Error: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
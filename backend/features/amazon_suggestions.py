@@ -1,106 +1,274 @@
-import pandas as pd
-import time
 import requests
 import os
+import json
+import time
 import urllib.parse
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from .rate_limit import TokenBucket
+from .suggestion_cache import FRESH_DAYS, SUGGESTION_CACHE, normalize_prefix
+from .completion_router import COMPLETION_ROUTER, RouteFailed
+from .marketplaces import MARKETPLACES, get_marketplace, parse_marketplaces
+from .report_export import ReportWriter, report_filename
+from .ingest import detect_keyword_layout, iter_values
+
+# --- CONCURRENCY & RATE LIMITS ---
+# Keywords are fetched by a bounded worker pool. Each route has its own token bucket
+# (process-wide), so total time follows the rate limit instead of the sum of latencies.
+# Direct requests are limited per completion host (see marketplaces.py), so a fan-out
+# over several marketplaces runs them side by side.
+FETCH_WORKERS = int(os.getenv("SUGGEST_WORKERS", "8"))
+CHECKPOINT_ROWS = int(os.getenv("SUGGEST_CHECKPOINT_ROWS", "50"))  # keywords per checkpoint (bulk jobs)
+PROXY_LIMITER = TokenBucket(float(os.getenv("SUGGEST_PROXY_RPS", "5")))
+
+PROXY_ROUTE = "scrape.do"
 
 class AmazonSuggestionEngine:
-    def __init__(self, upload_folder):
+    def __init__(self, upload_folder, workers=FETCH_WORKERS):
         self.upload_folder = upload_folder
+        self.workers = max(1, workers)
         self.scrape_do_token = os.getenv("SCRAPE_DO_TOKEN")
         self.session = requests.Session()
+        # Connection pool sized for the worker pool (default is 10), per completion host
+        adapter = HTTPAdapter(pool_connections=len(MARKETPLACES) + 1, pool_maxsize=self.workers * len(MARKETPLACES))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
 
-    def fetch_suggestions(self, search_term):
+    def fetch_suggestions(self, search_term, marketplace=None):
+        """Suggestions for a term ([] when Amazon had none or no route could answer)."""
+        suggestions = self.lookup(search_term, marketplace)
+        return suggestions if suggestions is not None else []
+
+    def lookup(self, search_term, marketplace=None):
         """
-        Tries to fetch suggestions from Amazon API.
-        Fallback: Uses Scrape.do proxy if direct request is blocked.
+        Tries to fetch suggestions from Amazon API (default marketplace unless given).
+        Fallback: Uses Scrape.do proxy if direct request is blocked (or while the direct
+        route's circuit breaker is open).
+        Answers are read through the shared suggestion cache; failures are not cached.
+        Returns None (not []) when no route produced an answer.
         """
-        base_url = "https://completion.amazon.com/api/2017/suggestions"
+        market = marketplace if hasattr(marketplace, 'mid') else get_marketplace(marketplace)
+        base_url = market.suggestions_url
         params = {
             'page-type': 'Search',
-            'lop': 'en_US',
+            'lop': market.lop,
             'site-variant': 'desktop',
             'client-info': 'amazon-search-ui',
-            'mid': 'ATVPDKIKX0DER',
+            'mid': market.mid,
             'alias': 'aps',
             'suggestion-type': 'KEYWORD',
             'prefix': search_term,
         }
 
-        # 1. Try Direct Request (Fastest)
-        try:
-            response = self.session.get(base_url, params=params, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                return [item['value'] for item in data.get('suggestions', [])]
-        except:
-            pass
-
-        # 2. Fallback: Scrape.do (If blocked)
-        if self.scrape_do_token:
+        cached = SUGGESTION_CACHE.get(base_url, params['mid'], search_term)
+        if cached is not None:
+            return cached
+
+        def parse(response):
+            if response.status_code != 200:
+                raise RouteFailed(f"HTTP {response.status_code}")
+            data = response.json()
+            return [item['value'] for item in data.get('suggestions', [])]
+
+        # 1. Direct Request (Fastest, no credits)
+        def direct():
+            return parse(self.session.get(base_url, params=params, timeout=5))
+
+        # 2. Scrape.do (If blocked)
+        def proxy():
+            # Construct the full Amazon URL and pass it to Scrape.do
+            amazon_url = f"{base_url}?{urllib.parse.urlencode(params)}"
+            proxy_url = f"http://api.scrape.do?token={self.scrape_do_token}&url={urllib.parse.quote(amazon_url)}"
             try:
-                # Construct the full Amazon URL and pass it to Scrape.do
-                amazon_url = f"{base_url}?{urllib.parse.urlencode(params)}"
-                proxy_url = f"http://api.scrape.do?token={self.scrape_do_token}&url={urllib.parse.quote(amazon_url)}"
-                
-                response = requests.get(proxy_url, timeout=15)
-                if response.status_code == 200:
-                    data = response.json()
-                    return [item['value'] for item in data.get('suggestions', [])]
+                return parse(self.session.get(proxy_url, timeout=15))
             except Exception as e:
                 print(f"Proxy Error: {e}")
+                raise
+
+        # The router skips whichever route is currently failing (e.g. our IP is blocked)
+        routes = {market.direct_route: direct}
+        if self.scrape_do_token: routes[PROXY_ROUTE] = proxy
+        suggestions = COMPLETION_ROUTER.call(routes, limiters={market.direct_route: market.limiter, PROXY_ROUTE: PROXY_LIMITER})
+        if suggestions is None:
+            return None
+
+        SUGGESTION_CACHE.put(base_url, params['mid'], search_term, suggestions)
+        return suggestions
 
-        return []
+    @staticmethod
+    def _build_row(product, answers):
+        """answers: {marketplace code: suggestions}. One marketplace keeps the classic columns."""
+        # Structure Data
+        row = {'Input Product': product}
+        for code, suggestions in answers.items():
+            prefix = f"{code}_" if len(answers) > 1 else ""
+            for i, sugg in enumerate(suggestions[:10]): # Top 10
+                row[f'{prefix}Keyword_{i+1}'] = sugg
 
-    def process_file(self, input_path):
-        """Reads Excel, fetches keywords, saves report."""
+            # Fill 'All_Keywords' combined column
+            row[f'{prefix}All_Keywords'] = " | ".join(suggestions)
+        return row
+
+    @staticmethod
+    def _report_columns(markets):
+        columns = ['Input Product']
+        for market in markets:
+            prefix = f"{market.code}_" if len(markets) > 1 else ""
+            columns += [f'{prefix}Keyword_{n}' for n in range(1, 11)] + [f'{prefix}All_Keywords']
+        return columns
+
+    @staticmethod
+    def _load_checkpoint(path, lookups_done):
+        """[(row index, code, suggestions)] fetched before a restart (only the first lookups_done were confirmed)."""
+        done = []
         try:
-            df = pd.read_excel(input_path)
-            # Auto-detect column: Takes the first column regardless of name
-            product_col = df.columns[0]
-            products = df[product_col].dropna().tolist()
-
-            results = []
-            print(f"🔄 Processing {len(products)} keywords...")
-
-            for idx, product in enumerate(products):
-                # Fetch
-                suggestions = self.fetch_suggestions(str(product))
-                
-                # Structure Data
-                row = {'Input Product': product}
-                for i, sugg in enumerate(suggestions[:10]): # Top 10
-                    row[f'Keyword_{i+1}'] = sugg
-                
-                # Fill 'All_Keywords' combined column
-                row['All_Keywords'] = " | ".join(suggestions)
-                
-                results.append(row)
-                
-                # Respectful delay
-                time.sleep(0.2) 
-
-            # Create Output File
+            with open(path, 'r', encoding='utf-8') as fh:
+                for line in fh:
+                    if len(done) >= lookups_done: break
+                    entry = json.loads(line)
+                    done.append((entry['i'], entry['m'], entry['s']))
+        except (OSError, ValueError, KeyError):
+            return []
+        # Rewrite so the file holds exactly the confirmed lookups before appending again
+        with open(path, 'w', encoding='utf-8') as fh:
+            for i, code, suggestions in done:
+                fh.write(json.dumps({'i': i, 'm': code, 's': suggestions}) + "\n")
+        return done
+
+    def process_file(self, input_path, job=None, incremental=True, fresh_days=FRESH_DAYS, marketplaces=None,
+                     report_format=None):
+        """
+        Reads the keyword sheet (xlsx/csv, see features/ingest.py), fetches keywords, saves report.
+        marketplaces: e.g. "US,IN". Several marketplaces are queried side by side for each
+        keyword and get their own column group (US_Keyword_1, IN_Keyword_1, ...).
+        Incremental: lookups answered within `fresh_days` (suggestion cache) are reused and
+        only new or stale ones are fetched; output keeps the input order.
+        As a background job (job=JobContext) fetched lookups are checkpointed every
+        CHECKPOINT_ROWS keywords and a resumed job continues after the last checkpoint.
+        Rows are streamed to the report (xlsx/csv/parquet) as soon as they and every row
+        before them are answered, so finished rows aren't held until the end.
+        """
+        log = job.log if job is not None else []
+        def say(message):
+            print(message)
+            if job is not None: log.append(message)
+
+        writer = None
+        try:
+            markets = parse_marketplaces(marketplaces)
+            # Keyword column: named like keyword/product/title, else the first one
+            products = list(iter_values(detect_keyword_layout(input_path), "keyword"))
+            total = len(products) * len(markets)
+
+            # answers[i][code] -> suggestions
+            answers = [{} for _ in products]
+            checkpoint_path = job.scratch_path("rows.jsonl") if job is not None else None
+            fetched = 0
+            if job is not None and job.resumed and job.state.get("rows_done"):
+                for i, code, suggestions in self._load_checkpoint(checkpoint_path, job.state["rows_done"]):
+                    answers[i][code] = suggestions
+                    fetched += 1
+                say(f"♻️ Resuming after {fetched} fetched lookups.")
+            elif checkpoint_path:
+                open(checkpoint_path, 'w').close()
+
+            # Reuse fresh lookups from previous runs (every fetched answer is in the cache)
+            reused = 0
+            if incremental:
+                for market in markets:
+                    fresh = SUGGESTION_CACHE.get_many(market.suggestions_url, market.mid,
+                                                      {str(p) for p in products}, fresh_days * 86400)
+                    for i, product in enumerate(products):
+                        key = normalize_prefix(product)
+                        if market.code in answers[i] or key not in fresh: continue
+                        answers[i][market.code] = fresh[key]
+                        reused += 1
+                say(f"♻️ Reused {reused} unchanged lookups (fetched within {fresh_days:g} days).")
+
+            # Create Output File (rows are written in input order as they complete)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_filename = f"Amazon_Suggestions_{timestamp}.xlsx"
+            output_filename = report_filename(f"Amazon_Suggestions_{timestamp}", report_format)
             output_path = os.path.join(self.upload_folder, output_filename)
+            writer = ReportWriter(output_path, self._report_columns(markets))
+            next_row = 0
+
+            def write_ready():
+                nonlocal next_row
+                while next_row < len(products) and all(m.code in answers[next_row] for m in markets):
+                    # Marketplace columns in the requested order
+                    writer.write_row(self._build_row(products[next_row], {m.code: answers[next_row][m.code] for m in markets}))
+                    answers[next_row] = None
+                    next_row += 1
+                writer.flush()
+
+            # Row-major order: each keyword's marketplaces are in flight together
+            pending = [(i, m) for i in range(len(products)) for m in markets if m.code not in answers[i]]
+            workers = self.workers * len(markets)
+            say(f"🔄 Processing {len(pending)} lookups on {', '.join(m.code for m in markets)} ({workers} workers)...")
+            cache_before = SUGGESTION_CACHE.stats()
+            started = time.monotonic()
+            batch_size = CHECKPOINT_ROWS * len(markets)
+
+            # Fetch concurrently in checkpoint-sized batches
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for start in range(0, len(pending), batch_size):
+                    batch = pending[start:start + batch_size]
+                    batch_answers = list(pool.map(lambda task: self.fetch_suggestions(str(products[task[0]]), task[1]), batch))
+                    for (i, market), suggestions in zip(batch, batch_answers):
+                        answers[i][market.code] = suggestions
+                    write_ready()
+                    if job is None: continue
+
+                    with open(checkpoint_path, 'a', encoding='utf-8') as fh:
+                        for (i, market), suggestions in zip(batch, batch_answers):
+                            fh.write(json.dumps({'i': i, 'm': market.code, 's': suggestions}) + "\n")
+                    fetched += len(batch)
+                    job.state["rows_done"] = fetched
+                    remaining = len(pending) - start - len(batch)
+                    elapsed = time.monotonic() - started
+                    rate = (start + len(batch)) / elapsed if elapsed else 0.0
+                    eta = remaining / rate if rate else None
+                    job.progress(total - remaining, total, stage="fetching",
+                                 rate=round(rate, 2), eta_seconds=round(eta) if eta is not None else None)
+                    job.checkpoint()
+
+            write_ready()
+            writer.close()
+
+            cache_after = SUGGESTION_CACHE.stats()
+            cache_hits = cache_after['hits'] - cache_before['hits']
+            cache_misses = cache_after['misses'] - cache_before['misses']
+            say(f"🧠 Suggestion cache: {cache_hits} hits, {cache_misses} misses")
+            for route in COMPLETION_ROUTER.stats():
+                say(f"🛣️ {route['route']}: {route['state']}, {route['success_rate']:.0%} ok, "
+                    f"{route['avg_latency_ms']:.0f} ms avg, {route['skipped']} skipped")
+
+            if checkpoint_path and os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+            say(f"✅ Generated {writer.rows_written} rows ({reused} lookups reused, {len(pending)} fetched)")
 
-            pd.DataFrame(results).to_excel(output_path, index=False)
-            
             return {
                 "success": True,
-                "message": f"Generated {len(results)} rows",
-                "file_url": f"/download/{output_filename}"
+                "message": f"Generated {writer.rows_written} rows ({reused} lookups reused from previous runs)",
+                "file_url": f"/download/{output_filename}",
+                "reused": reused,
+                "fetched": len(pending),
+                "marketplaces": [m.code for m in markets],
+                "cache": {"hits": cache_hits, "misses": cache_misses}
             }
 
         except Exception as e:
+            if writer is not None: writer.abort()
             return {"success": False, "error": str(e)}
 
 # Wrapper function for the server
-def run_suggestion_scraper(filepath, upload_folder):
+def run_suggestion_scraper(filepath, upload_folder, job=None, incremental=True, fresh_days=FRESH_DAYS, marketplaces=None,
+                           report_format=None):
     engine = AmazonSuggestionEngine(upload_folder)
-    return engine.process_file(filepath)
\ No newline at end of file
+    return engine.process_file(filepath, job=job, incremental=incremental, fresh_days=fresh_days, marketplaces=marketplaces,
+                               report_format=report_format)
\ No newline at end of file
@@ -0,0 +1,95 @@
+import os
+import atexit
+import asyncio
+import threading
+
+import httpx
+
+# --- SHARED ASYNC RUNTIME (one event loop thread + one pooled HTTP client) ---
+# The Groq callers are async, but they are called from sync Flask handlers and jobs.
+# Running each call through asyncio.run() built a new event loop per request and a new
+# httpx.AsyncClient that was never closed: a fresh TLS handshake to api.groq.com every
+# time, and leaked sockets. Instead, one daemon thread runs a long-lived loop, handlers
+# hand it coroutines with run_async() and block on the result, and every caller shares
+# http_client(): a keep-alive pool that reuses connections across requests. Both are
+# closed at interpreter exit.
+
+HTTP_TIMEOUT = float(os.getenv("ASYNC_HTTP_TIMEOUT_S", "60"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_KEEPALIVE = int(os.getenv("ASYNC_HTTP_KEEPALIVE", "10"))
+
+
+class AsyncRuntime:
+    def __init__(self, timeout=HTTP_TIMEOUT, max_connections=HTTP_MAX_CONNECTIONS, keepalive=HTTP_KEEPALIVE):
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=keepalive)
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        """Starts the loop thread (and the client, created on it). Caller holds the lock."""
+        # A forked worker inherits the objects but not the thread: start over there
+        if self._loop is not None and self._pid == os.getpid(): return
+        ready = threading.Event()
+        loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            ready.set()
+            loop.run_forever()
+
+        self._loop, self._pid = loop, os.getpid()
+        self._thread = threading.Thread(target=run, name="async-runtime", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    @property
+    def loop(self):
+        with self._lock:
+            self._start()
+            return self._loop
+
+    def client(self):
+        """The shared httpx.AsyncClient; only use it from coroutines run on this runtime."""
+        with self._lock:
+            self._start()
+            return self._client
+
+    def run(self, coro, timeout=None):
+        """Runs coro on the loop thread and blocks until it finishes (its exception is re-raised)."""
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("run_async() called from the runtime loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def close(self):
+        with self._lock:
+            loop, thread, client = self._loop, self._thread, self._client
+            self._loop = self._thread = self._client = None
+        if loop is None or self._pid != os.getpid(): return
+        try:
+            if client is not None:
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(5)
+        except Exception as e:
+            print(f"⚠️ Async HTTP client close failed: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        if not loop.is_running(): loop.close()
+
+
+# Shared by every request handler in this process
+RUNTIME = AsyncRuntime()
+atexit.register(RUNTIME.close)
+
+
+def run_async(coro, timeout=None):
+    return RUNTIME.run(coro, timeout)
+
+
+def http_client():
+    return RUNTIME.client()
@@ -4,10 +4,11 @@ import json
 from typing import List
 
 class GroqAPI:
-    def __init__(self):
+    def __init__(self, client=None):
         self.api_key = os.getenv("GROQ_API_KEY")
         self.base_url = "https://api.groq.com/openai/v1/chat/completions"
-        self.client = httpx.AsyncClient(timeout=120.0)
+        # Pass the shared pooled client (features/async_runtime.py); standalone use gets its own
+        self.client = client or httpx.AsyncClient(timeout=120.0)
 
     def _sanitize_json(self, raw_text):
         """Clean markdown wrappers"""
@@ -68,7 +69,8 @@ class GroqAPI:
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": 0.1 # Lowest temp for maximum obedience
-                }
+                },
+                timeout=120.0
             )
             result = response.json()
             raw_content = result["choices"][0]["message"]["content"]
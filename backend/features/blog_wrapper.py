@@ -3,6 +3,8 @@ import sys
 import asyncio
 from dotenv import load_dotenv
 
+from .async_runtime import http_client, run_async
+
 # --- 1. FORCE LOAD .ENV FROM BACKEND ROOT ---
 # Get the absolute path to the 'backend' folder
 current_file_path = os.path.abspath(__file__)             # features/blog_wrapper.py
@@ -35,7 +37,7 @@ async def run_automation_logic(title, description, platforms, forced_image=None,
     log.append(f"🚀 Job Started: {title}")
     
     # 1. Generate
-    groq = GroqAPI()
+    groq = GroqAPI(client=http_client())
     keywords = [k.strip() for k in description.split(',')] if (description and ',' in description) else [title]
     
     log.append(f"🤖 Generating Content for Brand: {brand_name}...")
@@ -87,7 +89,8 @@ async def run_automation_logic(title, description, platforms, forced_image=None,
         log.append("📡 Publishing to WordPress...")
         # Note: We pass product_link here if you want to use it as a canonical or source, 
         # but usually we just publish content. 
-        wp_link = publisher.distribute("wordpress", final_title, final_content, creds)
+        # Publishing is blocking (requests): keep it off the shared event loop
+        wp_link = await asyncio.to_thread(publisher.distribute, "wordpress", final_title, final_content, creds)
         
         if wp_link:
             log.append(f"✅ WP Success: {wp_link}")
@@ -101,7 +104,7 @@ async def run_automation_logic(title, description, platforms, forced_image=None,
         if platform == "WordPress": continue
         
         log.append(f"📡 Sending {platform} to Automation...")
-        res = publisher.distribute(platform, final_title, final_content, creds)
+        res = await asyncio.to_thread(publisher.distribute, platform, final_title, final_content, creds)
         if res: log.append(f"✅ Sent: {platform}")
         else: log.append(f"❌ Failed: {platform}")
 
@@ -121,4 +124,4 @@ async def run_automation_logic(title, description, platforms, forced_image=None,
 
 # UPDATED: Accepts the new arguments
 def start_blog_automation(title, description, platforms, forced_image=None, product_link=None, brand_name="SEVENXT"):
-    return asyncio.run(run_automation_logic(title, description, platforms, forced_image, product_link, brand_name))
\ No newline at end of file
+    return run_async(run_automation_logic(title, description, platforms, forced_image, product_link, brand_name))
\ No newline at end of file
@@ -0,0 +1,194 @@
+import os
+import re
+import sys
+import atexit
+import threading
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from .amazon_details import extract_asin, fetch_details, parse_product_page
+from .details_cache import DETAILS_CACHE
+from .ingest import detect_layout, iter_values
+from .report_export import ReportWriter, report_filename
+from . import parse_worker
+
+# --- BULK PRODUCT DETAILS ---
+# Loads details for a whole list of ASINs/links in one request. Page fetches are I/O
+# bound and run on a bounded thread pool (BULK_DETAILS_WORKERS at once, so wall time
+# scales with that limit); the HTML parsing is CPU bound and goes to a small process
+# pool so fetch threads don't queue behind each other on the GIL. Every lookup still
+# goes through the details cache (repeat ASINs are free, concurrent ones coalesced),
+# and a failed ASIN becomes an error row instead of stopping the batch.
+
+FETCH_WORKERS = int(os.getenv("BULK_DETAILS_WORKERS", "8"))
+PARSE_WORKERS = int(os.getenv("BULK_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))  # 0 = parse in the fetch thread
+MAX_TARGETS = int(os.getenv("BULK_DETAILS_MAX", "1000"))
+
+REPORT_COLUMNS = ["Input", "ASIN", "Status", "Title", "Brand", "Image URL", "Description", "SEO URL", "Cached", "Error"]
+
+_ASIN_RE = re.compile(r"^[A-Z0-9]{10}$")
+
+_parse_pool = None
+_pool_lock = threading.Lock()
+
+
+# --- TARGETS ---
+def to_asin(value):
+    """Bare ASIN or any Amazon product link -> ASIN, else None."""
+    text = str(value).strip()
+    if _ASIN_RE.match(text.upper()): return text.upper()
+    return extract_asin(text)
+
+
+def parse_targets(values):
+    """[(input, asin or None)] in order; repeated ASINs are kept once."""
+    targets, seen = [], set()
+    for value in values:
+        text = str(value).strip()
+        if not text: continue
+        asin = to_asin(text)
+        if asin in seen: continue
+        if asin: seen.add(asin)
+        targets.append((text, asin))
+    return targets
+
+
+def read_targets(path):
+    """Targets from an uploaded sheet: the ASIN/URL/link column, else the first one."""
+    layout = detect_layout(path, ("asin",), fallback={"asin": 0}, scan=1)
+    return parse_targets(iter_values(layout, "asin"))
+
+
+# --- PARSE POOL ---
+class _ParseWorkerProcess(multiprocessing.context.SpawnProcess):
+    """
+    Spawned worker whose __main__ is features/parse_worker.py. A plain spawn child
+    re-imports the parent's __main__ (server.py under `python server.py`), running its
+    startup code in every worker. __main__ is swapped only while the child's start-up
+    data is captured, under a lock.
+    """
+    _start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            main = sys.modules["__main__"]
+            sys.modules["__main__"] = parse_worker
+            try:
+                super().start()
+            finally:
+                sys.modules["__main__"] = main
+
+
+class _ParseContext(multiprocessing.context.SpawnContext):
+    Process = _ParseWorkerProcess
+
+
+def _get_parse_pool():
+    global _parse_pool
+    if PARSE_WORKERS <= 0: return None
+    with _pool_lock:
+        if _parse_pool is None:
+            # spawn: forking a threaded web server is unsafe (and Windows only has spawn)
+            _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=_ParseContext())
+        return _parse_pool
+
+
+def _reset_parse_pool():
+    global _parse_pool
+    with _pool_lock:
+        if _parse_pool is not None: _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
+
+@atexit.register
+def _shutdown_parse_pool():
+    if _parse_pool is not None: _parse_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_in_pool(html, asin):
+    pool = _get_parse_pool()
+    if pool is None: return parse_product_page(html, asin)
+    try:
+        return pool.submit(parse_product_page, html, asin).result()
+    except (BrokenProcessPool, RuntimeError):
+        # A worker died (e.g. killed for memory) or another thread just reset the pool:
+        # start a fresh pool next time, parse this one here
+        _reset_parse_pool()
+        return parse_product_page(html, asin)
+
+
+# --- FETCHING ---
+def _lookup(index, text, asin, refresh):
+    row = {"index": index, "input": text, "asin": asin}
+    if not asin:
+        return dict(row, status="error", error="Invalid Amazon link or ASIN")
+    try:
+        details, source = DETAILS_CACHE.get_or_fetch(asin, lambda: fetch_details(asin, parse=_parse_in_pool), refresh=refresh)
+    except Exception as e:
+        return dict(row, status="error", error=str(e))
+    if details.get("status") != "success":
+        return dict(row, status="error", error=details.get("error", "Unknown error"))
+    return dict(row, **details, cached=source != "fetched")
+
+
+def iter_bulk_details(targets, workers=FETCH_WORKERS, refresh=False):
+    """Yields one result dict per target as soon as it's ready (not in input order; see "index")."""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(_lookup, i, text, asin, refresh) for i, (text, asin) in enumerate(targets)]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Consumer gone (e.g. the client closed the stream): don't start the rest
+            for future in futures: future.cancel()
+
+
+def _report_row(result):
+    return {
+        "Input": result["input"],
+        "ASIN": result["asin"],
+        "Status": result["status"],
+        "Title": result.get("title"),
+        "Brand": result.get("brand"),
+        "Image URL": result.get("image_url"),
+        "Description": result.get("description"),
+        "SEO URL": result.get("seo_url"),
+        "Cached": result.get("cached"),
+        "Error": result.get("error"),
+    }
+
+
+def write_bulk_report(targets, upload_folder, report_format=None, job=None, refresh=False, workers=FETCH_WORKERS):
+    """Runs a batch into Amazon_Details_<ts>.<fmt> (input order). Returns a summary with file_url."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_filename = report_filename(f"Amazon_Details_{timestamp}", report_format)
+    output_path = os.path.join(upload_folder, output_filename)
+
+    ok = failed = cached = 0
+    ready, next_index = {}, 0
+    with ReportWriter(output_path, REPORT_COLUMNS) as out:
+        for done, result in enumerate(iter_bulk_details(targets, workers, refresh), start=1):
+            if result["status"] == "success":
+                ok += 1
+                cached += bool(result.get("cached"))
+            else:
+                failed += 1
+                if job is not None: job.log.append(f"⚠️ {result['input']}: {result['error']}")
+            # Rows finish out of order; write each once everything before it is written
+            ready[result["index"]] = result
+            while next_index in ready:
+                out.write_row(_report_row(ready.pop(next_index)))
+                next_index += 1
+            if job is not None: job.progress(done, len(targets), stage="fetching")
+        out.flush()
+
+    return {
+        "success": True,
+        "message": f"Loaded {ok} of {len(targets)} products ({cached} from cache, {failed} failed)",
+        "file_url": f"/download/{output_filename}",
+        "ok": ok,
+        "failed": failed,
+        "cached": cached,
+    }
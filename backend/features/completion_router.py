@@ -0,0 +1,173 @@
+import os
+import time
+import threading
+from collections import deque
+
+# --- COMPLETION ROUTER (direct vs Scrape.do) ---
+# Amazon completion calls can go out directly or through the Scrape.do proxy. Each route
+# has a circuit breaker and a rolling window of outcomes (success + latency). Calls go to
+# healthy routes in the caller's preferred order. After FAILURE_THRESHOLD failures in a row
+# (or a success rate under MIN_SUCCESS_RATE over the window) a route is skipped for
+# COOLDOWN_SECONDS, so a blocked IP stops costing a full timeout per keyword. Once the
+# cool-down is over, a single probe call is let through; if it succeeds, the route is
+# used again with a fresh window. When every route is open, a call waits for the earliest
+# cool-down (or for the probe in flight) instead of giving up without trying anything:
+# an empty answer would be stored as that keyword's result.
+
+FAILURE_THRESHOLD = int(os.getenv("ROUTE_FAILURE_THRESHOLD", "3"))
+COOLDOWN_SECONDS = float(os.getenv("ROUTE_COOLDOWN_SECONDS", "60"))
+WINDOW = 50                 # outcomes kept per route
+MIN_SAMPLES = 10            # outcomes needed before the success rate can trip a route
+MIN_SUCCESS_RATE = 0.5
+MAX_WAIT_SECONDS = float(os.getenv("ROUTE_MAX_WAIT_SECONDS", "180"))   # a call gives up after this
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class RouteFailed(Exception):
+    """Raised by a route call when the route itself failed (blocked, bad status, bad payload)."""
+
+
+class _Route:
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.outcomes = deque(maxlen=WINDOW)   # (ok, seconds)
+        self.calls = 0
+        self.failures = 0
+        self.skipped = 0
+
+    def success_rate(self):
+        if not self.outcomes: return 1.0
+        return sum(1 for ok, _ in self.outcomes if ok) / len(self.outcomes)
+
+    def avg_latency(self):
+        if not self.outcomes: return 0.0
+        return sum(s for _, s in self.outcomes) / len(self.outcomes)
+
+
+class CompletionRouter:
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, cooldown_seconds=COOLDOWN_SECONDS, max_wait=MAX_WAIT_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.max_wait = max_wait
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)   # a probe finished
+
+    def _route(self, name):
+        if name not in self._routes: self._routes[name] = _Route(name)
+        return self._routes[name]
+
+    def _plan_locked(self, names, count_skips=True):
+        """Routes to try, in order, for one call. A due half-open probe goes first so it always runs."""
+        probes, healthy = [], []
+        now = time.monotonic()
+        for name in names:
+            route = self._route(name)
+            if route.state == OPEN and now - route.opened_at >= self.cooldown_seconds:
+                route.state = HALF_OPEN
+            if route.state == HALF_OPEN:
+                # Only one probe in flight; everyone else keeps skipping the route
+                if route.probing:
+                    route.skipped += count_skips
+                    continue
+                route.probing = True
+                probes.append(route)
+            elif route.state == OPEN:
+                route.skipped += count_skips
+            else:
+                healthy.append(route)
+        return probes + healthy
+
+    def _plan(self, names):
+        """Like _plan_locked, but waits while every route is open or being probed by another call."""
+        if not names: return []
+        deadline = time.monotonic() + self.max_wait
+        first = True
+        with self._lock:
+            while True:
+                plan = self._plan_locked(names, count_skips=first)
+                if plan: return plan
+                first = False
+                now = time.monotonic()
+                if now >= deadline: return []
+                # Earliest cool-down end; a finished probe wakes us up sooner
+                due = [r.opened_at + self.cooldown_seconds for r in map(self._route, names) if r.state == OPEN]
+                self._changed.wait(min([deadline] + due) - now)
+
+    def _record(self, route, ok, seconds):
+        with self._lock:
+            route.calls += 1
+            if route.probing: self._changed.notify_all()
+            route.probing = False
+            if ok:
+                route.consecutive_failures = 0
+                if route.state != CLOSED:
+                    print(f"🟢 Route '{route.name}' recovered.")
+                    route.outcomes.clear()
+                route.state = CLOSED
+                route.outcomes.append((ok, seconds))
+                return
+            route.outcomes.append((ok, seconds))
+            route.failures += 1
+            route.consecutive_failures += 1
+            flaky = len(route.outcomes) >= MIN_SAMPLES and route.success_rate() < MIN_SUCCESS_RATE
+            if route.state == HALF_OPEN or flaky or route.consecutive_failures >= self.failure_threshold:
+                if route.state != OPEN:
+                    print(f"🔴 Route '{route.name}' tripped; skipping it for {self.cooldown_seconds:.0f}s.")
+                route.state = OPEN
+                route.opened_at = time.monotonic()
+
+    def call(self, routes, limiters=None):
+        """
+        routes: ordered {name: fn} (preferred route first). fn() returns the answer, returns
+        None when the route worked but had nothing to offer (try the next one), or raises
+        on failure. Returns the first answer, or None when no route produced one. While every
+        route is open, waits (up to max_wait) for one to come off its cool-down.
+        limiters: optional {name: TokenBucket}, acquired before the call (not timed).
+        """
+        limiters = limiters or {}
+        plan = self._plan(list(routes))
+        unused = list(plan)
+        try:
+            for route in plan:
+                if route.name in limiters: limiters[route.name].acquire()
+                started = time.perf_counter()
+                try:
+                    result, ok = routes[route.name](), True
+                except Exception:
+                    result, ok = None, False
+                self._record(route, ok, time.perf_counter() - started)
+                unused.remove(route)
+                if result is not None:
+                    return result
+            return None
+        finally:
+            # Probes planned but never run (an earlier route answered): let the next call probe them
+            self._release(unused)
+
+    def _release(self, routes):
+        with self._lock:
+            released = [r for r in routes if r.probing]
+            for route in released: route.probing = False
+            if released: self._changed.notify_all()
+
+    def stats(self):
+        with self._lock:
+            return [{
+                "route": r.name,
+                "state": r.state,
+                "calls": r.calls,
+                "failures": r.failures,
+                "skipped": r.skipped,
+                "success_rate": round(r.success_rate(), 2),
+                "avg_latency_ms": round(r.avg_latency() * 1000, 1),
+            } for r in self._routes.values()]
+
+
+# Shared by every feature that calls the Amazon completion API in this process
+COMPLETION_ROUTER = CompletionRouter()
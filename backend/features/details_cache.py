@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# --- PRODUCT DETAILS CACHE (ASIN -> details dict) ---
+# A product page fetch goes through Scrape.do (one credit, up to 60 s). Successful
+# results are kept per ASIN in a small in-memory LRU in front of a SQLite file, both
+# bounded by the same TTL, so a repeat lookup is answered in milliseconds for free and
+# survives restarts. Concurrent misses for one ASIN are coalesced (single-flight): the
+# first caller fetches, everyone else arriving meanwhile waits for that result.
+# Errors are handed to the waiting callers but never cached.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.getenv("DETAILS_CACHE_PATH", os.path.join(BACKEND_DIR, 'cache', 'product_details.sqlite3'))
+TTL_SECONDS = float(os.getenv("DETAILS_CACHE_TTL_HOURS", "24")) * 3600
+MEMORY_ENTRIES = int(os.getenv("DETAILS_CACHE_ENTRIES", "1000"))
+MAX_ROWS = int(os.getenv("DETAILS_CACHE_MAX_ROWS", "50000"))
+PRUNE_EVERY = 200  # writes between size checks
+
+
+class _Flight:
+    """One in-progress fetch that later callers for the same ASIN wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DetailsCache:
+    def __init__(self, path=CACHE_PATH, ttl_seconds=TTL_SECONDS, max_entries=MEMORY_ENTRIES, max_rows=MAX_ROWS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._memory = OrderedDict()   # asin -> (details, fetched_at), most recent last
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _connect(self):
+        """Opens the database on first use. Caller holds the lock."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS details ("
+                " asin TEXT PRIMARY KEY, value TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_details_fetched ON details (fetched_at)")
+            self._conn = conn
+        return self._conn
+
+    # --- MEMORY LRU ---
+    def _remember(self, asin, details, fetched_at):
+        """Caller holds the lock."""
+        self._memory[asin] = (details, fetched_at)
+        self._memory.move_to_end(asin)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, asin):
+        """(details, "memory" | "disk") when cached and fresh, else (None, None). Caller holds the lock."""
+        now = time.time()
+        entry = self._memory.get(asin)
+        if entry:
+            if now - entry[1] <= self.ttl_seconds:
+                self._memory.move_to_end(asin)
+                self.memory_hits += 1
+                return entry[0], "memory"
+            del self._memory[asin]
+
+        try:
+            row = self._connect().execute(
+                "SELECT value, fetched_at FROM details WHERE asin = ?", (asin,)
+            ).fetchone()
+            if row and now - row[1] <= self.ttl_seconds:
+                details = json.loads(row[0])
+                self._remember(asin, details, row[1])
+                self.disk_hits += 1
+                return details, "disk"
+        except (sqlite3.Error, ValueError) as e:
+            print(f"⚠️ Details cache read failed: {e}")
+        return None, None
+
+    def get(self, asin):
+        with self._lock:
+            details, _ = self._lookup(asin)
+        return dict(details) if details is not None else None
+
+    def put(self, asin, details):
+        fetched_at = time.time()
+        with self._lock:
+            self._remember(asin, dict(details), fetched_at)
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO details (asin, value, fetched_at) VALUES (?, ?, ?)",
+                        (asin, json.dumps(details), fetched_at),
+                    )
+                self._writes += 1
+                if self._writes % PRUNE_EVERY == 0:
+                    self._prune(conn)
+            except sqlite3.Error as e:
+                print(f"⚠️ Details cache write failed: {e}")
+
+    def _prune(self, conn):
+        """Drops expired rows, then the oldest ones above max_rows. Caller holds the lock."""
+        with conn:
+            conn.execute("DELETE FROM details WHERE fetched_at < ?", (time.time() - self.ttl_seconds,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM details").fetchone()
+            if count > self.max_rows:
+                conn.execute(
+                    "DELETE FROM details WHERE asin IN"
+                    " (SELECT asin FROM details ORDER BY fetched_at LIMIT ?)",
+                    (count - self.max_rows,),
+                )
+
+    # --- SINGLE-FLIGHT ---
+    def get_or_fetch(self, asin, fetch, refresh=False):
+        """
+        Returns (details, source) with source "memory", "disk", "fetched" or "coalesced".
+        fetch() -> details dict; only results with status "success" that aren't partial are stored.
+        refresh=True skips the cached copy (but still joins a fetch already in flight).
+        """
+        with self._lock:
+            if not refresh:
+                details, source = self._lookup(asin)
+                if details is not None:
+                    return dict(details), source
+            flight = self._flights.get(asin)
+            leader = flight is None
+            if leader:
+                flight = self._flights[asin] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None: raise flight.error
+            return dict(flight.result), "coalesced"
+
+        try:
+            flight.result = fetch()
+            if flight.result.get("status") == "success" and not flight.result.get("partial"):
+                self.put(asin, flight.result)
+            return dict(flight.result), "fetched"
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(asin, None)
+            flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights),
+                "memory_entries": len(self._memory),
+            }
+
+
+# Shared by every request handler in this process
+DETAILS_CACHE = DetailsCache()
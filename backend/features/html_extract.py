@@ -0,0 +1,232 @@
+import re
+from html.parser import HTMLParser
+
+# --- SELECTIVE HTML EXTRACTION ---
+# Product pages are often over 1 MB, but we read about five elements from them.
+# Instead of building a tree for the whole document, find_element() jumps straight to
+# the target's opening tag (a C-level regex search over the raw text) and runs the
+# stdlib tokenizer over that element only, stopping as soon as it closes. The result
+# is a small Element tree with the BeautifulSoup calls we use (find, find_all, get,
+# get_text), so extraction code reads the same as before. A candidate only counts when
+# it is a real opening tag: not inside a comment or a <script>/<style> body, and with
+# quoted attribute values (which may contain "<" or ">") skipped over.
+
+FEED_CHUNK = 16 * 1024
+MAX_TAG_CHARS = 64 * 1024       # how far back from an attribute to look for its tag's "<"
+
+# Elements that never have a closing tag
+VOID_TAGS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input",
+                       "link", "meta", "param", "source", "track", "wbr"))
+# BeautifulSoup's get_text() leaves these out as well
+_SKIP_TEXT_TAGS = frozenset(("script", "style", "template"))
+
+
+class Element:
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(self, tag, attrs, parent=None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []      # Elements and text strings, in document order
+        self.parent = parent
+
+    def get(self, name, default=None):
+        if name == "class":
+            # Multi-valued like BeautifulSoup: "a b" -> ["a", "b"]
+            value = self.attrs.get("class")
+            return value.split() if value is not None else default
+        return self.attrs.get(name, default)
+
+    def __getitem__(self, name):
+        return self.attrs[name]
+
+    def _matches(self, tag, attrs):
+        if tag is not None and self.tag != tag: return False
+        return all(self.attrs.get(k) == v for k, v in attrs.items())
+
+    def iter(self):
+        """Descendant elements, depth first."""
+        for child in self.children:
+            if isinstance(child, Element):
+                yield child
+                yield from child.iter()
+
+    def find_all(self, tag=None, attrs=None):
+        return [el for el in self.iter() if el._matches(tag, attrs or {})]
+
+    def find(self, tag=None, attrs=None):
+        return next((el for el in self.iter() if el._matches(tag, attrs or {})), None)
+
+    def get_text(self):
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            elif node.tag not in _SKIP_TEXT_TAGS:
+                stack.extend(reversed(node.children))
+        return "".join(parts)
+
+    def __repr__(self):
+        return f"<{self.tag} {self.attrs}>"
+
+
+class _Closed(Exception):
+    """Raised inside the parser once the root element has ended."""
+
+
+class _SubtreeParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = None
+        self._open = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k: ("" if v is None else v) for k, v in attrs}
+        parent = self._open[-1] if self._open else None
+        element = Element(tag, attrs, parent)
+        if parent is not None:
+            parent.children.append(element)
+        elif self.root is None:
+            self.root = element
+        else:
+            raise _Closed()
+        if tag in VOID_TAGS:
+            if element is self.root: raise _Closed()
+        else:
+            self._open.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        # Close up to the matching open tag (tolerates unclosed children); ignore strays
+        for depth in range(len(self._open) - 1, -1, -1):
+            if self._open[depth].tag == tag:
+                del self._open[depth:]
+                break
+        if self.root is not None and not self._open:
+            raise _Closed()
+
+    def handle_data(self, data):
+        if self._open:
+            self._open[-1].children.append(data)
+
+
+def _attr_pattern(name, value):
+    # Attribute names are case-insensitive in HTML, values are not
+    return re.compile(r'\s(?i:%s)\s*=\s*(["\']?)%s\1(?=[\s/>])' % (re.escape(name), re.escape(value)))
+
+
+# An opening tag up to its ">" (or the end of the text, for a tag still arriving);
+# quoted values are skipped whole
+_OPEN_TAG_RE = re.compile(r"""<([a-zA-Z][a-zA-Z0-9:-]*)(?=[\s/>]|\Z)(?:[^>"']+|"[^"]*(?:"|\Z)|'[^']*(?:'|\Z))*(?:>|\Z)""")
+
+
+def _in_comment(html, pos, first_comment):
+    """first_comment: position of the document's first "<!--" (-1 if none), found once per search."""
+    if first_comment < 0 or first_comment >= pos: return False
+    start = html.rfind("<!--", first_comment, pos)
+    return html.find("-->", start + 4, pos) < 0
+
+
+def _in_raw_text(html, pos):
+    """True if pos is inside a <script>/<style> body (markup there is just text)."""
+    lowered = html[max(0, pos - 256 * 1024):pos].lower()
+    for tag in ("script", "style"):
+        if lowered.rfind(f"<{tag}") > lowered.rfind(f"</{tag}"): return True
+    return False
+
+
+def _tag_start(html, pos):
+    """(start, tag name) of the opening tag whose attributes contain pos, or (-1, None)."""
+    start = pos
+    while True:
+        start = html.rfind("<", max(0, pos - MAX_TAG_CHARS), start)
+        if start < 0: return -1, None
+        tag = _OPEN_TAG_RE.match(html, start)
+        # A "<" in text or a quoted value (even a whole tag there) ends before pos: keep looking
+        if tag is None or tag.end() <= pos: continue
+        return start, tag.group(1).lower()
+
+
+def _parse_at(html, start, partial=True):
+    """(root element, closed). partial=False leaves an element cut off by the end of the text unparsed."""
+    parser = _SubtreeParser()
+    try:
+        for pos in range(start, len(html), FEED_CHUNK):
+            parser.feed(html[pos:pos + FEED_CHUNK])
+        if partial: parser.close()
+    except _Closed:
+        return parser.root, True
+    return parser.root, False
+
+
+def _candidates(html, tag, attrs, pos=0, partial=True):
+    """(attribute match position, element, closed) for every opening <tag> naming attrs[0] from pos."""
+    key, value = next(iter(attrs.items()))
+    first_comment = html.find("<!--")
+    for match in _attr_pattern(key, value).finditer(html, pos):
+        # The match must sit inside an opening tag of the right name
+        start, name = _tag_start(html, match.start())
+        if name != tag.lower() or _in_comment(html, start, first_comment) or _in_raw_text(html, start): continue
+        element, closed = _parse_at(html, start, partial)
+        yield match.start(), element, closed
+
+
+def find_element(html, tag, attrs):
+    """
+    First <tag> whose attributes include `attrs` (e.g. {"id": "productTitle"}), parsed on
+    its own; None if absent. Equivalent to BeautifulSoup(html).find(tag, attrs) for
+    well-formed elements. The first attribute is used to locate candidates.
+    """
+    for _, element, _ in _candidates(html, tag, attrs):
+        if element is not None and element._matches(tag, attrs):
+            return element
+    return None
+
+
+class IncrementalExtractor:
+    """
+    Watches a document that arrives in pieces for a set of target elements.
+    targets: {name: [(tag, attrs), ...]}; any one alternative satisfies the name, once
+    its closing tag has arrived. Each feed() only rescans text not searched before.
+    """
+    OVERLAP = 512   # re-searched tail, for an opening tag split across two pieces
+
+    def __init__(self, targets):
+        self.targets = targets
+        self.found = set()
+        self._parts = []
+        self._scan_from = {}
+
+    @property
+    def text(self):
+        if len(self._parts) > 1: self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    @property
+    def complete(self):
+        return len(self.found) == len(self.targets)
+
+    def _scan(self, html, tag, attrs, pos):
+        """(found, where to resume searching)."""
+        for at, element, closed in _candidates(html, tag, attrs, pos, partial=False):
+            if not closed: return False, at   # still arriving: look at it again next time
+            if element._matches(tag, attrs): return True, at
+        return False, max(pos, len(html) - self.OVERLAP)
+
+    def feed(self, text):
+        self._parts.append(text)
+        html = self.text
+        for name, alternatives in self.targets.items():
+            if name in self.found: continue
+            for i, (tag, attrs) in enumerate(alternatives):
+                hit, self._scan_from[(name, i)] = self._scan(html, tag, attrs, self._scan_from.get((name, i), 0))
+                if hit:
+                    self.found.add(name)
+                    break
+        return self.complete
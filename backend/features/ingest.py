@@ -0,0 +1,244 @@
+import os
+import csv
+
+import pandas as pd
+import openpyxl
+
+# --- SPREADSHEET INGEST (uploads -> typed column chunks) ---
+# One reader for every uploaded sheet (order files, keyword lists, crawl seeds).
+# The format is sniffed from the file's first bytes rather than trusted from its name,
+# header detection scans only the first SCAN_ROWS rows, and the body is read with a
+# streaming engine that only materializes the columns a feature asked for:
+# XLSX through openpyxl read_only rows bounded to those columns, CSV through chunked
+# pandas reads with usecols. Memory stays flat regardless of the upload size.
+
+SCAN_ROWS = 20
+CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", os.getenv("SKU_ORDER_CHUNK_ROWS", "50000")))
+
+# Header names are matched by substring, case-insensitively
+ROLE_PATTERNS = {
+    "sku": ("sku",),
+    "qty": ("qty", "quantity"),
+    "keyword": ("keyword", "product", "search term", "query", "seed", "title", "name"),
+    "asin": ("asin", "url", "link"),
+}
+# "number" roles come out as floats (NaN when blank/invalid); everything else as text
+ROLE_TYPES = {"qty": "number"}
+
+_XLSX_MAGIC = b"PK\x03\x04"
+_XLS_MAGIC = b"\xd0\xcf\x11\xe0"
+
+
+class SheetLayout:
+    """Where the data lives in an upload: format, header row and {role: column index}."""
+
+    def __init__(self, path, fmt, columns, header_row=None, delimiter=",", encoding="utf-8-sig"):
+        self.path = path
+        self.fmt = fmt                  # xlsx | xls | csv
+        self.columns = columns          # {"sku": 0, "qty": 3}
+        self.header_row = header_row    # 0-based row index, None = no header
+        self.delimiter = delimiter
+        self.encoding = encoding
+
+    @property
+    def has_header(self):
+        return self.header_row is not None
+
+    @property
+    def data_start(self):
+        return 0 if self.header_row is None else self.header_row + 1
+
+    def __repr__(self):
+        return f"SheetLayout({self.fmt}, header_row={self.header_row}, columns={self.columns})"
+
+
+# --- SNIFFING ---
+def _sniff_encoding(sample):
+    for encoding in ("utf-8-sig", "cp1252"):
+        try:
+            sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError as e:
+            # The sample may end mid-character
+            if e.reason == "unexpected end of data": return encoding
+    return "latin-1"
+
+
+def sniff_format(path):
+    """("xlsx" | "xls" | "csv", csv delimiter, text encoding) from the file's first bytes."""
+    with open(path, "rb") as fh:
+        sample = fh.read(64 * 1024)
+    if sample.startswith(_XLSX_MAGIC):
+        return "xlsx", None, None
+    if sample.startswith(_XLS_MAGIC):
+        return "xls", None, None
+
+    encoding = _sniff_encoding(sample)
+    text = sample.decode(encoding, errors="ignore")
+    if len(sample) == 64 * 1024: text = text.rsplit("\n", 1)[0]  # drop the cut-off last line
+    try:
+        delimiter = csv.Sniffer().sniff(text, delimiters=",;\t|").delimiter
+    except csv.Error:
+        delimiter = ","
+    return "csv", delimiter, encoding
+
+
+def _cell_text(value):
+    if value is None: return ""
+    # Excel stores numeric codes as floats (12345.0); keep them as "12345"
+    if isinstance(value, float) and value.is_integer(): return str(int(value))
+    return str(value).strip()
+
+
+def scan_rows(path, fmt, delimiter=",", encoding="utf-8-sig", limit=SCAN_ROWS):
+    """First `limit` rows as lists of strings (only these are read for header detection)."""
+    if fmt == "csv":
+        rows = []
+        with open(path, "r", encoding=encoding, newline="") as fh:
+            for row in csv.reader(fh, delimiter=delimiter):
+                rows.append([c.strip() for c in row])
+                if len(rows) >= limit: break
+        return rows
+    if fmt == "xls":
+        df = pd.read_excel(path, header=None, nrows=limit, dtype=object)
+        return [[_cell_text(None if pd.isna(v) else v) for v in row] for row in df.itertuples(index=False, name=None)]
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        return [[_cell_text(v) for v in row] for row in wb.worksheets[0].iter_rows(max_row=limit, values_only=True)]
+    finally:
+        wb.close()
+
+
+# --- HEADER / COLUMN DETECTION ---
+def _match_roles(row, roles):
+    names = [c.lower() for c in row]
+    found = {}
+    for role in roles:
+        patterns = ROLE_PATTERNS[role]
+        idx = next((i for i, name in enumerate(names)
+                    if i not in found.values() and any(p in name for p in patterns)), None)
+        if idx is not None: found[role] = idx
+    return found
+
+
+def detect_layout(path, roles, fallback=None, scan=SCAN_ROWS, fallback_header=False):
+    """
+    Finds the header row and the column of every role (first role = anchor).
+    Row 0 is the header if it names the anchor; every other role must then be present
+    too, else None ("columns missing"). Title/preamble rows are skipped: a later row
+    within `scan` is the header if it names *every* role.
+    No header found -> `fallback` positions ({role: index}), or None without one;
+    fallback_header=True still treats row 0 as a (non-matching) header row.
+    """
+    fmt, delimiter, encoding = sniff_format(path)
+    rows = scan_rows(path, fmt, delimiter or ",", encoding or "utf-8-sig", limit=scan)
+    layout = lambda columns, header_row: SheetLayout(path, fmt, columns, header_row,
+                                                     delimiter or ",", encoding or "utf-8-sig")
+
+    for i, row in enumerate(rows):
+        found = _match_roles(row, roles)
+        if i == 0 and roles[0] in found:
+            return layout(found, 0) if len(found) == len(roles) else None
+        if len(found) == len(roles):
+            return layout(found, i)
+
+    if fallback is None: return None
+    return layout(dict(fallback), 0 if fallback_header and rows else None)
+
+
+# --- READING ---
+def _excel_value(role, value):
+    if ROLE_TYPES.get(role) == "number": return value
+    if value is None or (isinstance(value, float) and value != value): return None
+    return _cell_text(value)
+
+
+def _to_number(values):
+    series = pd.Series(values, dtype=object)
+    try:
+        return series.astype("float64")   # fast path: every cell is numeric or blank
+    except (ValueError, TypeError):
+        return pd.to_numeric(series, errors="coerce")
+
+
+def _typed_frame(columns):
+    frame = {}
+    for role, values in columns.items():
+        if ROLE_TYPES.get(role) == "number":
+            frame[role] = _to_number(values).reset_index(drop=True)
+        else:
+            frame[role] = pd.Series(values, dtype=object).reset_index(drop=True)
+    return pd.DataFrame(frame)
+
+
+def iter_chunks(layout, chunksize=CHUNK_ROWS):
+    """
+    Yields DataFrames with one column per role (text roles as str/None, number roles as
+    float/NaN), chunksize rows at a time. Columns not in the layout are never materialized.
+    """
+    roles = list(layout.columns)
+    positions = [layout.columns[r] for r in roles]
+
+    if layout.fmt == "csv":
+        reader = pd.read_csv(
+            layout.path, header=None, skiprows=layout.data_start, usecols=sorted(set(positions)),
+            dtype=str, sep=layout.delimiter, encoding=layout.encoding, chunksize=chunksize,
+        )
+        for chunk in reader:
+            chunk = chunk.reindex(columns=positions)
+            values = {}
+            for role, pos in zip(roles, positions):
+                if ROLE_TYPES.get(role) == "number":
+                    values[role] = chunk[pos]
+                    continue
+                col = chunk[pos].str.strip().astype(object)
+                values[role] = col.where(col.notna(), None)
+            yield _typed_frame(values)
+        return
+
+    if layout.fmt == "xls":
+        # Legacy binary workbooks can't be streamed; read just the needed columns
+        df = pd.read_excel(layout.path, header=None, skiprows=layout.data_start, usecols=sorted(set(positions)), dtype=object)
+        df = df.reindex(columns=positions)
+        for start in range(0, len(df), chunksize):
+            part = df.iloc[start:start + chunksize]
+            yield _typed_frame({r: [_excel_value(r, v) for v in part[p]] for r, p in zip(roles, positions)})
+        return
+
+    wb = openpyxl.load_workbook(layout.path, read_only=True, data_only=True)
+    try:
+        # Only the span of needed columns is read from each row
+        first = min(positions)
+        width = max(positions) - first + 1
+        offsets = [p - first for p in positions]
+        columns = {r: [] for r in roles}
+        rows = wb.worksheets[0].iter_rows(min_row=layout.data_start + 1, min_col=first + 1,
+                                          max_col=first + width, values_only=True)
+        for row in rows:
+            if len(row) < width: row = tuple(row) + (None,) * (width - len(row))
+            for role, offset in zip(roles, offsets):
+                columns[role].append(_excel_value(role, row[offset]))
+            if len(columns[roles[0]]) >= chunksize:
+                yield _typed_frame(columns)
+                columns = {r: [] for r in roles}
+        if columns[roles[0]]:
+            yield _typed_frame(columns)
+    finally:
+        wb.close()
+
+
+def iter_values(layout, role, chunksize=CHUNK_ROWS):
+    """Non-empty values of one role column, in sheet order."""
+    for chunk in iter_chunks(layout, chunksize):
+        for value in chunk[role]:
+            if value is None or value != value or value == "": continue
+            yield value
+
+
+def detect_keyword_layout(path):
+    """
+    Keyword lists (bulk suggestions, crawl seeds): the column whose header names a
+    keyword/product, else the first one. Row 1 is always treated as the header.
+    """
+    return detect_layout(path, ("keyword",), fallback={"keyword": 0}, scan=1, fallback_header=True)
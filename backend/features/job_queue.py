@@ -0,0 +1,299 @@
+import os
+import json
+import time
+import uuid
+import threading
+import traceback
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# --- BACKGROUND JOB QUEUE ---
+# Long tasks (SKU print runs, ...) are enqueued and return a job ID right away.
+# Each job kind has its own bounded worker pool. Every job is mirrored to a small JSON
+# file so status polling works from any process and unfinished jobs are picked up
+# again after a restart. Recovery is an explicit startup call: the first process to
+# take the store's lock file recovers, any other process sharing the store (more
+# WSGI workers, spawned helper processes) skips it. A finished job is dropped from memory
+# (status polling reads its JSON file) and its scratch files are deleted; job files older
+# than KEEP_DAYS are pruned at startup and then about once an hour.
+
+QUEUED, RUNNING, DONE, ERROR = "queued", "running", "done", "error"
+SAVE_INTERVAL_SECONDS = 1.0
+LOCK_FILE = ".recover.lock"
+KEEP_DAYS = float(os.getenv("JOB_KEEP_DAYS", "7"))
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _lock_exclusive(fh):
+    """Non-blocking exclusive lock on an open file; held until the process exits."""
+    try:
+        if os.name == "nt":
+            import msvcrt
+            fh.seek(0)   # every process must lock the same byte
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _process_alive(pid):
+    if not pid or pid == os.getpid(): return False
+    # Windows has no signal-0 probe (os.kill would terminate) and runs a single server process
+    if os.name == "nt": return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobContext:
+    """Handed to job handlers: live log list, progress reporting and resumable state."""
+
+    def __init__(self, queue, job):
+        self._queue = queue
+        self._job = job
+
+    @property
+    def job_id(self):
+        return self._job["id"]
+
+    @property
+    def payload(self):
+        return self._job["payload"]
+
+    @property
+    def log(self):
+        return self._job["log"]
+
+    @property
+    def state(self):
+        """Handler-owned dict persisted with the job (what is already done, for resumes)."""
+        return self._job["state"]
+
+    @property
+    def resumed(self):
+        return self._job["attempts"] > 1
+
+    def progress(self, done, total=None, stage=None, **extra):
+        """extra: any other JSON values to show with the progress (rate, ETA, ...)."""
+        progress = self._job["progress"]
+        progress["done"] = done
+        if total is not None: progress["total"] = total
+        if stage is not None: progress["stage"] = stage
+        progress.update(extra)
+        self._queue._save(self._job)
+
+    def checkpoint(self):
+        self._queue._save(self._job, force=True)
+
+    def scratch_path(self, suffix):
+        """Path next to the job's store file for bulky handler data (e.g. finished rows)."""
+        return os.path.join(self._queue.store_dir, f"{self.job_id}.{suffix}")
+
+
+class JobQueue:
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self._jobs = {}
+        self._handlers = {}
+        self._executors = {}
+        self._last_save = {}
+        self._lock = threading.Lock()
+        self._store_lock = None   # open lock file once this process owns recovery
+        self._recovery_tried = False
+        self._last_prune = 0.0
+
+    def register(self, kind, handler, max_workers=1):
+        """handler(ctx) -> result dict. max_workers bounds how many jobs of this kind run at once."""
+        self._handlers[kind] = handler
+        self._executors[kind] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"job-{kind}")
+
+    # --- STORE ---
+    def _path(self, job_id):
+        return os.path.join(self.store_dir, f"{job_id}.json")
+
+    def _save(self, job, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_save.get(job["id"], 0) < SAVE_INTERVAL_SECONDS:
+            return
+        self._last_save[job["id"]] = now
+        snapshot = dict(job, log=list(job["log"]), progress=dict(job["progress"]))
+        tmp_path = f"{self._path(job['id'])}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(snapshot, fh, default=str)
+            os.replace(tmp_path, self._path(job["id"]))
+        except OSError as e:
+            print(f"⚠️ Job store write failed ({job['id']}): {e}")
+
+    def _drop_scratch(self, job_id):
+        """Deletes a job's scratch files (resume checkpoints are useless once it has finished)."""
+        prefix = f"{job_id}."
+        for name in os.listdir(self.store_dir):
+            if name.startswith(prefix) and name != f"{job_id}.json":
+                try: os.remove(os.path.join(self.store_dir, name))
+                except OSError: pass
+
+    def prune(self, keep_days=KEEP_DAYS):
+        """Deletes finished job files (and any leftover scratch files) older than keep_days. Returns how many jobs."""
+        self._last_prune = time.monotonic()
+        cutoff = time.time() - keep_days * 86400
+        removed = 0
+        for name in os.listdir(self.store_dir):
+            path = os.path.join(self.store_dir, name)
+            try:
+                if name.startswith(".") or os.path.getmtime(path) >= cutoff: continue
+                if name.endswith(".json"):
+                    job = self._load(name[:-5])
+                    if job and job["status"] in (QUEUED, RUNNING): continue
+                    removed += 1
+                elif os.path.exists(os.path.join(self.store_dir, name.split(".", 1)[0] + ".json")):
+                    continue   # scratch file of a job still on record
+                os.remove(path)
+            except OSError:
+                pass
+        if removed:
+            print(f"🧹 Pruned {removed} finished job(s) older than {keep_days:g} days.")
+        return removed
+
+    def _load(self, job_id):
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    # --- API ---
+    def submit(self, kind, payload):
+        if kind not in self._handlers: raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": QUEUED,
+            "payload": payload,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "attempts": 0,
+            "progress": {"done": 0, "total": None, "stage": "queued"},
+            "log": [],
+            "state": {},
+            "result": None,
+            "error": None,
+            "owner_pid": os.getpid(),   # process whose executor holds the job
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+        self._save(job, force=True)
+        self._executors[kind].submit(self._run, job_id)
+        return job_id
+
+    def _run(self, job_id):
+        job = self._jobs[job_id]
+        job["status"] = RUNNING
+        job["started_at"] = _now()
+        job["attempts"] += 1
+        job["progress"]["stage"] = "running"
+        self._save(job, force=True)
+
+        try:
+            result = self._handlers[job["kind"]](JobContext(self, job))
+            job["result"] = result
+            job["status"] = DONE
+            job["progress"]["stage"] = "done"
+        except Exception as e:
+            traceback.print_exc()
+            job["error"] = str(e)
+            job["log"].append(f"❌ Job failed: {e}")
+            job["status"] = ERROR
+            job["progress"]["stage"] = "error"
+        job["finished_at"] = _now()
+        self._save(job, force=True)
+        # Served from its file from now on; only running jobs stay in memory
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        self._drop_scratch(job_id)
+        if time.monotonic() - self._last_prune >= PRUNE_INTERVAL_SECONDS:
+            self.prune()
+
+    def get(self, job_id, since=0):
+        """Snapshot of a job (log lines from index `since` on), or None if unknown."""
+        job = self._jobs.get(job_id) or self._load(job_id)
+        if job is None: return None
+        log = list(job["log"])
+        return {
+            "job_id": job["id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+            "attempts": job["attempts"],
+            "progress": dict(job["progress"]),
+            "log": log[since:],
+            "log_offset": since,
+            "log_total": len(log),
+            "result": job["result"],
+            "error": job["error"],
+        }
+
+    def wait(self, job_id, poll_seconds=0.5):
+        """Blocks until the job has finished and returns its final snapshot (None if unknown)."""
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in (DONE, ERROR): return job
+            time.sleep(poll_seconds)
+
+    def _own_store(self):
+        """Takes the store's recovery lock. False if another process holds it."""
+        fh = open(os.path.join(self.store_dir, LOCK_FILE), "a+")
+        if not _lock_exclusive(fh):
+            fh.close()
+            return False
+        self._store_lock = fh
+        return True
+
+    def recover(self):
+        """
+        Re-enqueues jobs left queued or running by a previous process. Returns how many.
+        Call once at startup, after every kind is registered; only the process holding
+        the store lock recovers, and jobs whose owner process is still alive are left alone.
+        """
+        if self._recovery_tried: return 0
+        self._recovery_tried = True
+        if not self._own_store():
+            print("♻️ Job recovery skipped: another process owns the job store.")
+            return 0
+        self.prune()
+        recovered = 0
+        for name in sorted(os.listdir(self.store_dir)):
+            if not name.endswith(".json"): continue
+            job = self._load(name[:-5])
+            if not job or job["status"] not in (QUEUED, RUNNING): continue
+            if job["kind"] not in self._handlers or job["id"] in self._jobs: continue
+            if _process_alive(job.get("owner_pid")): continue
+
+            if job["status"] == RUNNING:
+                job["log"].append("♻️ Server restarted mid-job. Resuming...")
+            job["status"] = QUEUED
+            job["owner_pid"] = os.getpid()
+            with self._lock:
+                self._jobs[job["id"]] = job
+            self._save(job, force=True)
+            self._executors[job["kind"]].submit(self._run, job["id"])
+            recovered += 1
+        if recovered:
+            print(f"♻️ Recovered {recovered} unfinished job(s).")
+        return recovered
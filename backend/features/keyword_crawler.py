@@ -0,0 +1,202 @@
+import os
+import json
+import string
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from .amazon_suggestions import AmazonSuggestionEngine
+from .suggestion_cache import normalize_prefix
+from .marketplaces import get_marketplace
+from .report_export import ReportWriter, report_filename
+from .ingest import detect_keyword_layout, iter_values
+
+# --- LONG-TAIL KEYWORD CRAWLER (alphabet expansion) ---
+# Each seed is queried as-is, then as "seed a".."seed z", "seed 0".."seed 9" and, at
+# depth 2, one more character ("seed ab", ...). Every suggestion goes into a prefix trie,
+# so the same keyword found by several branches is kept once (with a combined score).
+# A query that returned fewer than MAX_SUGGESTIONS results, or nothing new, is exhausted:
+# it has no deeper branch worth paying for, so it leaves the frontier and its depth-2
+# children are skipped. A failed lookup is not an empty answer: it is retried once and,
+# if it still fails, stays on the frontier. Requests go through
+# AmazonSuggestionEngine.lookup (cache, circuit breakers, rate limits) on the engine's
+# worker pool.
+
+EXPANSION_CHARS = string.ascii_lowercase + string.digits
+MAX_SUGGESTIONS = 10          # the completion API's page size: fewer means "that's all"
+MAX_DEPTH = 2
+DEPTH_WEIGHTS = (1.0, 0.5, 0.25)
+FETCH_RETRIES = 1             # extra tries for a lookup no route could answer
+
+
+class _Node:
+    __slots__ = ("children", "keyword", "score", "order")
+
+    def __init__(self):
+        self.children = {}
+        self.keyword = None       # original text when a keyword ends here
+        self.score = 0.0
+        self.order = 0
+
+
+class KeywordTrie:
+    def __init__(self):
+        self.root = _Node()
+        self.size = 0
+
+    def _walk(self, text, create=False):
+        node = self.root
+        for ch in text:
+            child = node.children.get(ch)
+            if child is None:
+                if not create: return None
+                child = node.children[ch] = _Node()
+            node = child
+        return node
+
+    def add(self, keyword, score):
+        """Adds (or re-scores) a keyword. Returns True if it was new."""
+        node = self._walk(normalize_prefix(keyword), create=True)
+        is_new = node.keyword is None
+        if is_new:
+            node.keyword = keyword
+            node.order = self.size
+            self.size += 1
+        node.score += score
+        return is_new
+
+    def __contains__(self, keyword):
+        node = self._walk(normalize_prefix(keyword))
+        return node is not None and node.keyword is not None
+
+    def ranked(self):
+        """[(keyword, score)] best first; ties keep discovery order."""
+        found, stack = [], [self.root]
+        while stack:
+            node = stack.pop()
+            if node.keyword is not None: found.append(node)
+            stack.extend(node.children.values())
+        found.sort(key=lambda n: (-n.score, n.order))
+        return [(n.keyword, round(n.score, 3)) for n in found]
+
+
+class KeywordCrawler:
+    def __init__(self, engine, depth=1, marketplace=None):
+        self.engine = engine
+        self.depth = max(0, min(int(depth), MAX_DEPTH))
+        self.marketplace = get_marketplace(marketplace)
+        self.requests = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def _fetch_all(self, pool, queries):
+        """{query: suggestions, or None if no route answered after the retries}."""
+        answers = {}
+        pending = queries
+        for _ in range(1 + FETCH_RETRIES):
+            results = list(pool.map(lambda q: self.engine.lookup(q, self.marketplace), pending))
+            self.requests += len(pending)
+            answers.update(zip(pending, results))
+            pending = [q for q, suggestions in zip(pending, results) if suggestions is None]
+            if not pending: break
+        return answers
+
+    def _run_level(self, pool, trie, queries, level):
+        """Fetches one level of queries. Returns the ones worth expanding further."""
+        answers = self._fetch_all(pool, queries)
+        expandable = []
+        for query in queries:
+            suggestions = answers[query]
+            if suggestions is None:
+                # Unknown, not empty: keep the branch rather than lose it
+                self.failed += 1
+                expandable.append(query)
+                continue
+            new = 0
+            for pos, keyword in enumerate(suggestions):
+                # Higher in the list and closer to the seed counts more
+                new += trie.add(keyword, DEPTH_WEIGHTS[level] / (pos + 1))
+            if len(suggestions) < MAX_SUGGESTIONS or new == 0:
+                if level < self.depth: self.skipped += len(EXPANSION_CHARS)
+            else:
+                expandable.append(query)
+        return expandable
+
+    def crawl(self, seed, pool):
+        """Ranked [(keyword, score)] for one seed."""
+        seed = " ".join(str(seed).split())
+        trie = KeywordTrie()
+        frontier = self._run_level(pool, trie, [seed], 0) if seed else []
+        # Level 1 expands the seed with a separator ("seed a"); deeper levels extend the last word
+        for level in range(1, self.depth + 1):
+            if not frontier: break
+            queries = [f"{base} {ch}" if level == 1 else f"{base}{ch}" for base in frontier for ch in EXPANSION_CHARS]
+            frontier = self._run_level(pool, trie, queries, level)
+        return trie.ranked()
+
+    def crawl_file(self, input_path, job=None, report_format=None):
+        """Crawls every seed of the sheet (keyword column, else the first one). Seeds finished before a restart are reused."""
+        log = job.log if job is not None else []
+        def say(message):
+            print(message)
+            if job is not None: log.append(message)
+
+        try:
+            seeds = list(iter_values(detect_keyword_layout(input_path), "keyword"))
+
+            done = {}
+            checkpoint_path = job.scratch_path("crawl.jsonl") if job is not None else None
+            if job is not None and job.resumed and job.state.get("seeds_done"):
+                with open(checkpoint_path, 'r', encoding='utf-8') as fh:
+                    for line in fh:
+                        try: entry = json.loads(line)
+                        except ValueError: break  # torn last line
+                        done[entry['i']] = entry['ranked']
+                say(f"♻️ Resuming after {len(done)} crawled seeds.")
+            elif checkpoint_path:
+                open(checkpoint_path, 'w').close()
+
+            say(f"🕸️ Crawling {len(seeds) - len(done)} seeds on {self.marketplace.code} (depth {self.depth}, {self.engine.workers} workers)...")
+            with ThreadPoolExecutor(max_workers=self.engine.workers) as pool:
+                for i, seed in enumerate(seeds):
+                    if i in done: continue
+                    done[i] = self.crawl(seed, pool)
+                    say(f"🔎 '{seed}': {len(done[i])} keywords ({self.requests} requests so far, {self.skipped} branches pruned, "
+                        f"{self.failed} failed lookups)")
+                    if job is None: continue
+                    with open(checkpoint_path, 'a', encoding='utf-8') as fh:
+                        fh.write(json.dumps({'i': i, 'ranked': done[i]}) + "\n")
+                    job.state["seeds_done"] = len(done)
+                    job.progress(len(done), len(seeds), stage="crawling")
+                    job.checkpoint()
+
+            # Create Output File
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_filename = report_filename(f"Amazon_Keyword_Crawl_{timestamp}", report_format)
+            output_path = os.path.join(self.engine.upload_folder, output_filename)
+            with ReportWriter(output_path, ['Seed', 'Rank', 'Keyword', 'Score'], column_types={'Rank': 'int64', 'Score': 'float64'}) as out:
+                for i, seed in enumerate(seeds):
+                    for rank, (keyword, score) in enumerate(done.pop(i), start=1):
+                        out.write_row({'Seed': seed, 'Rank': rank, 'Keyword': keyword, 'Score': score})
+            rows = out.rows_written
+            if checkpoint_path and os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+            say(f"✅ {rows} keywords from {len(seeds)} seeds ({self.requests} requests, {self.skipped} branches pruned, "
+                f"{self.failed} failed lookups)")
+
+            return {
+                "success": True,
+                "message": f"Crawled {len(seeds)} seeds into {rows} keywords",
+                "file_url": f"/download/{output_filename}",
+                "requests": self.requests,
+                "pruned": self.skipped,
+                "failed": self.failed,
+            }
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+
+# Wrapper function for the server
+def run_keyword_crawl(filepath, upload_folder, depth=1, job=None, marketplace=None, report_format=None):
+    crawler = KeywordCrawler(AmazonSuggestionEngine(upload_folder), depth=depth, marketplace=marketplace)
+    return crawler.crawl_file(filepath, job=job, report_format=report_format)
@@ -1,14 +1,22 @@
 import os
 import requests
-import httpx
 import json
 import asyncio
 import urllib.parse
-import pandas as pd
 from datetime import datetime
 from typing import List, Dict
 from dotenv import load_dotenv
 
+from ..suggestion_cache import SUGGESTION_CACHE
+from ..completion_router import COMPLETION_ROUTER, RouteFailed
+from ..amazon_suggestions import PROXY_LIMITER, PROXY_ROUTE
+from ..marketplaces import get_marketplace, parse_marketplaces
+from ..report_export import report_filename, write_report
+from ..async_runtime import http_client, run_async
+
+# Marketplaces whose live suggestions feed the strategy (e.g. "IN,US"; fanned out concurrently)
+TREND_MARKETPLACES = os.getenv("TREND_MARKETPLACES", "IN")
+
 current_file_path = os.path.abspath(__file__)
 features_dir = os.path.dirname(current_file_path)
 backend_dir = os.path.dirname(features_dir)
@@ -21,7 +29,7 @@ class HybridKeywordGenerator:
         self.groq_key = os.getenv("GROQ_API_KEY")
         self.scrape_do_token = os.getenv("SCRAPE_DO_TOKEN")
         self.groq_url = "https://api.groq.com/openai/v1/chat/completions"
-        self.client = httpx.AsyncClient(timeout=60.0)
+        self.client = http_client()  # shared keep-alive pool (features/async_runtime.py)
         
         # Path setup
         this_file_folder = os.path.dirname(os.path.abspath(__file__))
@@ -116,40 +124,88 @@ class HybridKeywordGenerator:
             print(f"⚠️ Filter Error: {e}. Using raw trends.")
             return trends # Fallback to raw list if AI fails
 
-    async def fetch_real_time_trends(self, clean_query: str) -> List[str]:
+    async def fetch_real_time_trends(self, clean_query: str, marketplace: str = "IN") -> List[str]:
+        # requests is blocking: run it off the event loop so marketplaces can overlap
+        return await asyncio.to_thread(self._fetch_trends_sync, clean_query, get_marketplace(marketplace))
+
+    async def fetch_market_trends(self, clean_query: str, marketplaces=TREND_MARKETPLACES) -> Dict[str, List[str]]:
+        """{code: trends} with every marketplace queried at the same time."""
+        markets = parse_marketplaces(marketplaces)
+        results = await asyncio.gather(*(self.fetch_real_time_trends(clean_query, m.code) for m in markets))
+        return {m.code: trends for m, trends in zip(markets, results)}
+
+    def _fetch_trends_sync(self, clean_query, market):
+        # Answers are cached under the endpoint that gave them: bulk suggestions read the
+        # suggestions API key and must not get psy-ab results from it
+        endpoint_internal, mid = market.suggestions_url, market.mid
+        endpoint_global = f"https://{market.completion_host}/search/complete?client=psy-ab"
+        for endpoint in (endpoint_internal, endpoint_global):
+            cached = SUGGESTION_CACHE.get(endpoint, mid, clean_query)
+            if cached:
+                print(f"🧠 [Cache] {len(cached)} {market.code} signals for: '{clean_query}'")
+                return cached
+
         encoded_query = urllib.parse.quote(clean_query)
-        print(f"📡 Fetching Market Data for: '{clean_query}'...")
+        print(f"📡 Fetching {market.code} Market Data for: '{clean_query}'...")
         
-        url_internal = f"https://completion.amazon.in/api/2017/suggestions?mid=A21TJRUUN4KGV&alias=aps&prefix={encoded_query}"
-        url_global = f"https://completion.amazon.in/search/complete?client=psy-ab&q={encoded_query}"
+        url_internal = f"{endpoint_internal}?mid={mid}&alias=aps&prefix={encoded_query}"
+        url_global = f"{endpoint_global}&q={encoded_query}"
+        answered_by = {url_internal: endpoint_internal, url_global: endpoint_global}
+        source = [endpoint_internal]
 
-        suggestions = []
-        
-        if self.scrape_do_token:
+        def fetch(url, **kwargs):
+            response = requests.get(url, **kwargs)
+            if response.status_code != 200:
+                raise RouteFailed(f"HTTP {response.status_code}")
+            return self._parse_response(response.json()) or None
+
+        def proxy():
+            # Either URL answering counts as the route working
+            error, answered = None, False
             for target_url in [url_internal, url_global]:
+                proxy_url = f"http://api.scrape.do?token={self.scrape_do_token}&url={urllib.parse.quote(target_url)}"
                 try:
-                    proxy_url = f"http://api.scrape.do?token={self.scrape_do_token}&url={urllib.parse.quote(target_url)}"
-                    response = requests.get(proxy_url, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        suggestions = self._parse_response(data)
-                        if suggestions:
-                            print(f"✅ [Scrape.do] Captured {len(suggestions)} signals.")
-                            return suggestions
-                except: pass
-
-        try:
-            headers = {'User-Agent': 'Mozilla/5.0', 'Accept': 'application/json'}
-            response = requests.get(url_internal, headers=headers, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                suggestions = self._parse_response(data)
+                    suggestions = fetch(proxy_url, timeout=10)
+                except Exception as e:
+                    error = e
+                    continue
+                answered = True
                 if suggestions:
-                    print(f"✅ [Local-Direct] Captured {len(suggestions)} signals.")
+                    print(f"✅ [Scrape.do] Captured {len(suggestions)} signals.")
+                    source[0] = answered_by[target_url]
                     return suggestions
-        except: pass
+            if not answered: raise error
+            return None
 
-        return []
+        def direct():
+            headers = {'User-Agent': 'Mozilla/5.0', 'Accept': 'application/json'}
+            suggestions = fetch(url_internal, headers=headers, timeout=5)
+            if suggestions:
+                print(f"✅ [Local-Direct] Captured {len(suggestions)} signals.")
+                source[0] = endpoint_internal
+            return suggestions
+
+        # Scrape.do first, then direct; routes that keep failing are skipped for a while
+        routes = {PROXY_ROUTE: proxy} if self.scrape_do_token else {}
+        routes[market.direct_route] = direct
+        suggestions = COMPLETION_ROUTER.call(routes, limiters={market.direct_route: market.limiter, PROXY_ROUTE: PROXY_LIMITER})
+        if not suggestions:
+            return []
+
+        SUGGESTION_CACHE.put(source[0], mid, clean_query, suggestions)
+        return suggestions
+
+    @staticmethod
+    def _merge_trends(market_trends):
+        """Round-robin merge (every marketplace's #1, then #2, ...) with duplicates dropped."""
+        merged, seen = [], set()
+        lists = list(market_trends.values())
+        for rank in range(max(map(len, lists), default=0)):
+            for trends in lists:
+                if rank < len(trends) and trends[rank] and trends[rank].lower() not in seen:
+                    seen.add(trends[rank].lower())
+                    merged.append(trends[rank])
+        return merged
 
     def _parse_response(self, data):
         try:
@@ -160,14 +216,14 @@ class HybridKeywordGenerator:
         except: pass
         return []
 
-    async def generate_advanced_strategy(self, product_name: str, asin: str, specs: str) -> Dict:
+    async def generate_advanced_strategy(self, product_name: str, asin: str, specs: str, report_format: str = None) -> Dict:
         if not self.groq_key: return {"error": "Missing GROQ_API_KEY"}
 
         # 1. AI PRE-PROCESSING
         seed_keyword = await self.extract_seed_keyword(product_name)
         
-        # 2. GET RAW TRENDS
-        raw_trends = await self.fetch_real_time_trends(seed_keyword)
+        # 2. GET RAW TRENDS (all configured marketplaces at once, merged best-first)
+        raw_trends = self._merge_trends(await self.fetch_market_trends(seed_keyword))
         
         # 3. AI SMART FILTERING (The New Robust Layer)
         safe_trends = await self._ai_verify_trends(product_name, raw_trends, specs)
@@ -259,10 +315,9 @@ class HybridKeywordGenerator:
                     "source_color": source_color
                 })
 
-            df = pd.DataFrame(final_data)
-            filename = f"SevenXT_SEO_{asin}_{int(datetime.now().timestamp())}.xlsx"
+            filename = report_filename(f"SevenXT_SEO_{asin}_{int(datetime.now().timestamp())}", report_format)
             file_path = os.path.join(self.uploads_dir, filename)
-            df.to_excel(file_path, index=False)
+            write_report(file_path, final_data, columns=["strategy", "keyword", "url", "source", "source_color"])
             
             return {
                 "data": final_data,
@@ -274,6 +329,6 @@ class HybridKeywordGenerator:
             print(f"❌ CRITICAL PYTHON ERROR: {str(e)}")
             return {"error": f"Internal Error: {str(e)}"}
 
-def get_hybrid_keywords(product, asin, specs):
+def get_hybrid_keywords(product, asin, specs, report_format=None):
     gen = HybridKeywordGenerator()
-    return asyncio.run(gen.generate_advanced_strategy(product, asin, specs))
\ No newline at end of file
+    return run_async(gen.generate_advanced_strategy(product, asin, specs, report_format=report_format))
\ No newline at end of file
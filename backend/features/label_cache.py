@@ -0,0 +1,123 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- LABEL RENDER CACHE ---
+# Each label's printer-ready ZPL export is read and compiled once: the payload is split
+# around its quantity (^PQ) so a repeat print is only "join with the new quantity + send".
+# Entries live in a byte-bounded LRU and are dropped when the export's mtime/size
+# changes and its content hash no longer matches.
+
+# Printer-ready exports that can sit next to a .lbl template (same file stem)
+RENDERED_EXTENSIONS = ('.zpl', '.prn')
+
+CACHE_MAX_BYTES = int(float(os.getenv("LABEL_CACHE_MB", "64")) * 1024 * 1024)
+CACHE_MAX_ENTRIES = int(os.getenv("LABEL_CACHE_ENTRIES", "5000"))
+
+_PQ_RE = re.compile(rb'\^PQ\d*')
+
+
+class LabelRenderError(Exception):
+    pass
+
+
+def find_rendered_label(label_path):
+    """Returns the .zpl/.prn export saved next to the .lbl template, or None."""
+    stem = os.path.splitext(label_path)[0]
+    for ext in RENDERED_EXTENSIONS:
+        for candidate in (stem + ext, stem + ext.upper()):
+            if os.path.isfile(candidate): return candidate
+    return None
+
+
+class CompiledLabel:
+    """A ZPL payload split around its quantity fields: render(qty) just joins the parts."""
+
+    def __init__(self, source_path, data, mtime_ns, size):
+        self.source_path = source_path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = hashlib.sha1(data).digest()
+        if not _PQ_RE.search(data):
+            # No ^PQ in the export: add one to every label format
+            data = data.replace(b'^XZ', b'^PQ1^XZ')
+        self.parts = _PQ_RE.split(data)
+        self.nbytes = sum(len(p) for p in self.parts)
+
+    def render(self, qty):
+        return (b'^PQ' + str(int(qty)).encode()).join(self.parts)
+
+
+class LabelRenderCache:
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, max_entries=CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _evict(self):
+        while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.nbytes
+
+    def _store(self, label_path, compiled):
+        old = self._entries.pop(label_path, None)
+        if old: self._bytes -= old.nbytes
+        self._entries[label_path] = compiled
+        self._bytes += compiled.nbytes
+        self._evict()
+
+    def get(self, label_path):
+        """Returns the CompiledLabel for a .lbl template, compiling it on first use or after it changed."""
+        source = find_rendered_label(label_path)
+        if not source:
+            raise LabelRenderError(f"No ZPL export (.zpl/.prn) next to {os.path.basename(label_path)}")
+        st = os.stat(source)
+
+        with self._lock:
+            cached = self._entries.get(label_path)
+            if cached and cached.source_path == source and cached.mtime_ns == st.st_mtime_ns and cached.size == st.st_size:
+                self._entries.move_to_end(label_path)
+                self.hits += 1
+                return cached
+
+        with open(source, 'rb') as fh:
+            data = fh.read()
+
+        with self._lock:
+            if cached and cached.source_path == source and cached.digest == hashlib.sha1(data).digest():
+                # Touched but identical content: keep the compiled entry
+                cached.mtime_ns, cached.size = st.st_mtime_ns, st.st_size
+                self._entries.move_to_end(label_path)
+                self.hits += 1
+                return cached
+
+            if cached: self.invalidations += 1
+            self.misses += 1
+            compiled = CompiledLabel(source, data, st.st_mtime_ns, st.st_size)
+            if compiled.nbytes <= self.max_bytes:
+                self._store(label_path, compiled)
+            return compiled
+
+    def render(self, label_path, qty):
+        return self.get(label_path).render(qty)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+# Shared by every print backend in this process
+LABEL_CACHE = LabelRenderCache()
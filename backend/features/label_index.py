@@ -0,0 +1,249 @@
+import os
+import re
+import json
+import hashlib
+import heapq
+import threading
+from collections import Counter
+
+# --- LABEL INDEX (Token -> Label Files) ---
+# Replaces the "listdir + regex every file" scan that used to run once per order row.
+# The index maps every whole alphanumeric token of a .lbl filename (lowercased) to the
+# files containing it. A SKU lookup only verifies the files sharing its rarest token
+# with the original strict regex, so the matching rules are exactly the same as before.
+# A trigram index over the same filenames powers "did you mean" suggestions for SKUs
+# that have no exact match (it never changes what counts as a match). Candidates come
+# from the SKU's rarer trigrams only: a trigram shared by thousands of labels ("sp0" in
+# SP-000123) picks nothing out and used to make each suggestion cost a full count over
+# those postings. The best SUGGEST_MAX_CANDIDATES are then scored on all the SKU's trigrams.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BACKEND_DIR, 'cache')
+INDEX_VERSION = 2
+SUGGESTION_COUNT = int(os.getenv("SKU_SUGGESTIONS", "3"))
+SUGGEST_MAX_POSTINGS = int(os.getenv("SKU_SUGGEST_MAX_POSTINGS", "1000"))   # trigrams in more labels are skipped
+SUGGEST_MAX_CANDIDATES = 100
+
+_TOKEN_RE = re.compile(r'[a-zA-Z0-9]+')
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def strict_sku_pattern(sku):
+    """Whole-word, case-insensitive matcher used for every label lookup."""
+    # Lookbehind/Lookahead ensures "SP-ATP6w" is a distinct word
+    return re.compile(r'(?<![a-zA-Z0-9])' + re.escape(sku) + r'(?![a-zA-Z0-9])', re.IGNORECASE)
+
+
+def matches_whole_word(sku, filename):
+    """Same result as strict_sku_pattern(sku).search(filename), without compiling a regex per SKU."""
+    if not (sku.isascii() and filename.isascii()):
+        return strict_sku_pattern(sku).search(filename) is not None
+
+    needle, haystack = sku.lower(), filename.lower()
+    start = haystack.find(needle)
+    while start != -1:
+        end = start + len(needle)
+        if (start == 0 or not haystack[start - 1].isalnum()) and (end == len(haystack) or not haystack[end].isalnum()):
+            return True
+        start = haystack.find(needle, start + 1)
+    return False
+
+
+def _tokens(text):
+    return {t.lower() for t in _TOKEN_RE.findall(text)}
+
+
+def _trigrams(text):
+    """Trigrams of the lowercase alphanumerics only, so "SP-ATP6" and "sp atp6" look the same."""
+    squashed = _NON_ALNUM_RE.sub('', text.lower())
+    if len(squashed) < 3: return {squashed} if squashed else set()
+    return {squashed[i:i + 3] for i in range(len(squashed) - 2)}
+
+
+def _list_labels(folder):
+    return [f for f in os.listdir(folder) if f.lower().endswith(".lbl")]
+
+
+def _signature(filenames):
+    return hashlib.sha1("\n".join(sorted(filenames)).encode("utf-8")).hexdigest()
+
+
+def _index_path(folder):
+    folder_key = hashlib.sha1(os.path.abspath(folder).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f"label_index_{folder_key}.json")
+
+
+class LabelIndex:
+    def __init__(self, folder, filenames, mtime_ns, signature, postings=None, trigrams=None):
+        self.folder = folder
+        self.filenames = filenames
+        self.mtime_ns = mtime_ns
+        self.signature = signature
+        self.postings = postings if postings is not None else self._build_postings(filenames)
+        self.trigrams = trigrams if trigrams is not None else self._build_trigrams(filenames)
+        # Lowercase alphanumerics of each name: a trigram is in a name iff it is a substring here
+        self._squashed = [_NON_ALNUM_RE.sub('', os.path.splitext(f)[0].lower()) for f in filenames]
+        self._gram_counts = [len(_trigrams(os.path.splitext(f)[0])) for f in filenames]
+        self._memo = {}
+        self._suggest_memo = {}
+
+    @staticmethod
+    def _build_postings(filenames):
+        postings = {}
+        for pos, filename in enumerate(filenames):
+            for token in _tokens(filename):
+                postings.setdefault(token, []).append(pos)
+        return postings
+
+    @staticmethod
+    def _build_trigrams(filenames):
+        trigrams = {}
+        for pos, filename in enumerate(filenames):
+            for gram in _trigrams(os.path.splitext(filename)[0]):
+                trigrams.setdefault(gram, []).append(pos)
+        return trigrams
+
+    @classmethod
+    def build(cls, folder, filenames=None, mtime_ns=None):
+        if mtime_ns is None: mtime_ns = os.stat(folder).st_mtime_ns
+        if filenames is None: filenames = _list_labels(folder)
+        return cls(folder, filenames, mtime_ns, _signature(filenames))
+
+    # --- DISK PERSISTENCE ---
+    @classmethod
+    def load(cls, folder):
+        try:
+            with open(_index_path(folder), "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION: return None
+        return cls(folder, data["filenames"], data["mtime_ns"], data["signature"], data["postings"], data["trigrams"])
+
+    def save(self):
+        path = _index_path(self.folder)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump({
+                    "version": INDEX_VERSION,
+                    "folder": os.path.abspath(self.folder),
+                    "mtime_ns": self.mtime_ns,
+                    "signature": self.signature,
+                    "filenames": self.filenames,
+                    "postings": self.postings,
+                    "trigrams": self.trigrams,
+                }, fh)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Label index not saved: {e}")
+
+    # --- LOOKUP ---
+    def lookup(self, sku):
+        """
+        Returns (absolute_path, filename) for the first label containing the SKU
+        as a whole word, or (None, None). Same rules as the old directory scan.
+        """
+        target_sku = str(sku).strip()
+        if not target_sku: return None, None
+
+        memo_key = target_sku.lower()
+        if memo_key in self._memo: return self._memo[memo_key]
+
+        sku_tokens = _tokens(target_sku)
+
+        if sku_tokens:
+            # Every token of the SKU must be a whole token of a matching filename,
+            # so only the files sharing its rarest token can possibly match.
+            postings = [self.postings.get(t, []) for t in sku_tokens]
+            candidates = min(postings, key=len)
+        else:
+            # SKU made only of symbols: nothing to index on, scan everything.
+            candidates = range(len(self.filenames))
+
+        result = (None, None)
+        for pos in candidates:
+            filename = self.filenames[pos]
+            if matches_whole_word(target_sku, filename):
+                result = (os.path.join(self.folder, filename), filename)
+                break
+
+        self._memo[memo_key] = result
+        return result
+
+    def resolve_many(self, skus):
+        """Resolves a batch of SKUs in one pass. Returns {sku: (absolute_path, filename)}."""
+        return {sku: self.lookup(sku) for sku in set(skus)}
+
+    # --- NEAR-MISS SUGGESTIONS ---
+    def suggest(self, sku, k=SUGGESTION_COUNT):
+        """
+        Top-k label filenames closest to a SKU by trigram overlap (for SKU NOT FOUND rows).
+        Score favours labels containing most of the SKU's trigrams, then shorter names.
+        """
+        memo_key = (str(sku).strip().lower(), k)
+        if memo_key in self._suggest_memo: return self._suggest_memo[memo_key]
+
+        grams = _trigrams(str(sku))
+        if not grams or k <= 0: return []
+
+        # Candidates from the selective trigrams (the rarest one if all are common)
+        postings = sorted((self.trigrams[g] for g in grams if g in self.trigrams), key=len)
+        selective = [p for p in postings if len(p) <= SUGGEST_MAX_POSTINGS] or postings[:1]
+        counts = Counter()
+        for posting in selective:
+            counts.update(posting)
+        candidates = [pos for pos, _ in counts.most_common(SUGGEST_MAX_CANDIDATES)]
+
+        def score(pos):
+            squashed = self._squashed[pos]
+            common = sum(gram in squashed for gram in grams)
+            recall = common / len(grams)
+            precision = common / max(self._gram_counts[pos], 1)
+            return 0.8 * recall + 0.2 * precision, recall
+
+        # Ties keep folder order
+        scored = heapq.nlargest(k, ((score(pos), -pos) for pos in candidates))
+        # Require a real overlap, not a single shared trigram in a long SKU
+        result = [self.filenames[-neg] for (_, recall), neg in scored if recall >= 0.3]
+        self._suggest_memo[memo_key] = result
+        return result
+
+
+def get_label_index(folder):
+    """
+    Returns an up-to-date LabelIndex for the folder (None if the folder is missing).
+    Reuses the in-memory or on-disk index while the folder's mtime and file list
+    are unchanged, otherwise rebuilds and saves it.
+    """
+    try:
+        mtime_ns = os.stat(folder).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _lock:
+        index = _indexes.get(folder)
+        if index is None:
+            index = LabelIndex.load(folder)
+        if index is not None and index.mtime_ns == mtime_ns:
+            _indexes[folder] = index
+            return index
+
+        # Folder touched: only rebuild if the set of labels actually changed
+        try:
+            filenames = _list_labels(folder)
+        except FileNotFoundError:
+            return None
+
+        if index is not None and index.signature == _signature(filenames):
+            index.mtime_ns = mtime_ns
+        else:
+            index = LabelIndex.build(folder, filenames, mtime_ns)
+            print(f"🗂️ Label index built: {len(filenames)} labels.")
+        index.save()
+        _indexes[folder] = index
+        return index
@@ -0,0 +1,56 @@
+import os
+
+from .rate_limit import TokenBucket
+
+# --- AMAZON MARKETPLACE REGISTRY ---
+# One entry per storefront we sell in: its marketplace ID (mid), completion host and
+# language. Suggestion and trend lookups take a marketplace instead of hard-coding one.
+# Each completion host gets its own direct-request token bucket, so fanning out across
+# marketplaces doesn't slow any single one down.
+
+DIRECT_RPS = float(os.getenv("SUGGEST_DIRECT_RPS", "5"))
+
+
+class Marketplace:
+    def __init__(self, code, mid, domain, lop):
+        self.code = code
+        self.mid = mid
+        self.domain = domain            # storefront, e.g. amazon.in
+        self.lop = lop
+        self.completion_host = f"completion.{domain}"
+        self.direct_route = f"direct:{self.completion_host}"
+        self.limiter = TokenBucket(DIRECT_RPS)
+
+    @property
+    def suggestions_url(self):
+        return f"https://{self.completion_host}/api/2017/suggestions"
+
+    def __repr__(self):
+        return f"Marketplace({self.code}, {self.mid})"
+
+
+MARKETPLACES = {
+    "US": Marketplace("US", "ATVPDKIKX0DER", "amazon.com", "en_US"),
+    "IN": Marketplace("IN", "A21TJRUUN4KGV", "amazon.in", "en_IN"),
+}
+
+DEFAULT_MARKETPLACE = os.getenv("SUGGEST_MARKETPLACE", "US")
+
+
+def get_marketplace(code=None):
+    code = (code or DEFAULT_MARKETPLACE).strip().upper()
+    if code not in MARKETPLACES:
+        raise ValueError(f"Unknown marketplace '{code}' (known: {', '.join(MARKETPLACES)})")
+    return MARKETPLACES[code]
+
+
+def parse_marketplaces(value, default=None):
+    """'US,IN' (or a list) -> [Marketplace], duplicates dropped, order kept."""
+    if not value: return [get_marketplace(default)]
+    codes = value.split(",") if isinstance(value, str) else value
+    markets = []
+    for code in codes:
+        if not str(code).strip(): continue
+        market = get_marketplace(code)
+        if market not in markets: markets.append(market)
+    return markets or [get_marketplace(default)]
@@ -0,0 +1,5 @@
+# Entry module for the bulk-details parse processes (bulk_details._get_parse_pool).
+# Spawned workers re-import their parent's __main__ before running any task; the pool
+# points them at this module instead of the app's (server.py), so a parse worker only
+# loads the parser and never builds the Flask app, the job queue or its startup hooks.
+from .amazon_details import parse_product_page  # noqa: F401 (loaded ahead of the first task)
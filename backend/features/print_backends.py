@@ -0,0 +1,266 @@
+import os
+import time
+import socket
+import subprocess
+from datetime import datetime
+
+from .label_cache import LABEL_CACHE
+
+# --- 1. SAFE IMPORTS FOR HYBRID CLOUD/LOCAL SUPPORT ---
+# This prevents the server from crashing on Linux (Render) where these libraries don't exist.
+try:
+    import win32gui
+    import win32con
+    import pyautogui
+    PRINTING_AVAILABLE = True
+except ImportError:
+    # If we are on Linux/Render, these will fail. We catch the error here.
+    win32gui = None
+    win32con = None
+    pyautogui = None
+    PRINTING_AVAILABLE = False
+    print("⚠️ Host is Linux/Cloud: Physical printing disabled.")
+
+# --- PATH TO ZEBRA (Only used by the GUI backend) ---
+ZEBRA_EXE = r"C:\Program Files (x86)\Zebra Technologies\ZebraDesigner 2\bin\Design.exe"
+
+
+# --- 2. LABEL RENDERING (ZPL) ---
+def render_label(label_path, qty):
+    """
+    ZebraDesigner .lbl files are not printer data: send the exported ZPL with the quantity applied.
+    Compiled payloads come from the shared render cache, so repeat SKUs skip the disk read.
+    """
+    return LABEL_CACHE.render(label_path, qty)
+
+
+# --- 3. BACKENDS ---
+class PrintBackend:
+    """A print backend sends one label file with a quantity. print_label() raises on failure."""
+    name = "base"
+    available = True
+    # True when print_label() returned only after the labels came out of the printer,
+    # so its duration is real printing time (the scheduler learns speeds from it)
+    confirms_completion = False
+    seconds_per_label = None    # configured speed; None = scheduler default
+
+    def print_label(self, label_path, qty):
+        raise NotImplementedError
+
+    def health_check(self):
+        return self.available
+
+    def describe(self):
+        return self.name
+
+
+class PreviewBackend(PrintBackend):
+    """Cloud / disabled mode: nothing is printed, the report only shows what WOULD be printed."""
+    name = "preview"
+    available = False
+
+    def print_label(self, label_path, qty):
+        pass
+
+
+class ZebraDesignerBackend(PrintBackend):
+    """Legacy fallback: drives the ZebraDesigner GUI with pyautogui (Windows only, ~25s per label)."""
+    name = "zebra_gui"
+    available = PRINTING_AVAILABLE
+
+    def __init__(self, zebra_exe=ZEBRA_EXE):
+        self.zebra_exe = zebra_exe
+
+    def print_label(self, label_path, qty):
+        subprocess.Popen([self.zebra_exe, label_path])
+        time.sleep(12)
+        force_window_focus("ZebraDesigner")
+        time.sleep(1)
+        pyautogui.hotkey('ctrl', 'p')
+        time.sleep(2)
+        pyautogui.typewrite(str(qty))
+        time.sleep(0.5)
+        pyautogui.press('enter')
+        time.sleep(0.5)
+        pyautogui.hotkey('alt', 'p')
+        time.sleep(8)
+        os.system("taskkill /f /im Design.exe")
+        time.sleep(2)
+
+
+class PrinterStatusError(RuntimeError):
+    """The printer reported a condition that stops printing (paper/ribbon out, paused, head open)."""
+
+
+def parse_host_status(data):
+    """
+    Zebra ~HS reply (three <STX>...<ETX> strings) -> dict. Fields used: formats waiting in
+    the receive buffer, labels remaining in the batch, and the stop conditions.
+    """
+    strings = [part.split(b"\x03", 1)[0].decode("ascii", "replace").split(",") for part in data.split(b"\x02")[1:]]
+    if len(strings) < 2 or len(strings[0]) < 6 or len(strings[1]) < 9:
+        raise ValueError(f"Unexpected ~HS reply: {data[:80]!r}")
+    first, second = strings[0], strings[1]
+    return {
+        "paper_out": first[1] == "1",
+        "paused": first[2] == "1",
+        "formats_in_buffer": int(first[4]),
+        "head_up": second[2] == "1",
+        "ribbon_out": second[3] == "1",
+        "labels_remaining": int(second[8]),
+    }
+
+
+class RawSocketBackend(PrintBackend):
+    """
+    Sends ZPL straight to a network printer (raw TCP, port 9100). After the payload it polls
+    the printer's host status (~HS) until the receive buffer and the label batch are empty,
+    so print_label() returns when the labels are out, not when the bytes left the socket.
+    ~HS is answered ahead of queued data, so an idle reply only counts once the printer has
+    shown this job (buffered or printing), or after STATUS_SETTLE_SECONDS without seeing it.
+    A device that doesn't answer ~HS is treated as fire-and-forget (configured speed).
+    """
+    name = "raw"
+    STATUS_POLL_SECONDS = 0.2
+    STATUS_TIMEOUT = 2.0   # ~HS is answered at once, even mid-print
+    STATUS_SETTLE_SECONDS = 1.0   # idle replies before the job shows up may predate it
+
+    def __init__(self, host, port=9100, timeout=10.0, seconds_per_label=None):
+        self.host = host
+        self.port = int(port)
+        self.timeout = timeout
+        self.seconds_per_label = seconds_per_label
+        self.confirms_completion = True   # until the printer fails to answer ~HS
+
+    def _host_status(self, conn):
+        data = b""
+        while data.count(b"\x03") < 3:
+            chunk = conn.recv(1024)
+            if not chunk: raise OSError("Printer closed the connection during a status query")
+            data += chunk
+        return parse_host_status(data)
+
+    def _wait_until_printed(self, conn, qty):
+        if not self.confirms_completion: return
+        # Generous bound: a printer that stops making progress fails the job
+        deadline = time.monotonic() + self.timeout + qty * (self.seconds_per_label or 1.0) * 3
+        settled = time.monotonic() + self.STATUS_SETTLE_SECONDS
+        seen = False
+        conn.settimeout(min(self.timeout, self.STATUS_TIMEOUT))
+        while True:
+            conn.sendall(b"~HS")
+            try:
+                status = self._host_status(conn)
+            except socket.timeout:
+                print(f"⚠️ {self.describe()} does not answer ~HS: print times are estimated")
+                self.confirms_completion = False
+                return
+            stopped = [k for k in ("paper_out", "ribbon_out", "head_up", "paused") if status[k]]
+            if stopped:
+                raise PrinterStatusError(f"Printer stopped ({', '.join(stopped)}); job may be partly printed")
+            if status["formats_in_buffer"] or status["labels_remaining"]:
+                seen = True
+            elif seen or time.monotonic() >= settled:
+                return
+            if time.monotonic() > deadline:
+                raise PrinterStatusError(f"Timed out waiting for {status['labels_remaining']} label(s) to print")
+            time.sleep(self.STATUS_POLL_SECONDS)
+
+    def print_label(self, label_path, qty):
+        payload = render_label(label_path, qty)
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as conn:
+            conn.sendall(payload)
+            self._wait_until_printed(conn, qty)
+
+    def health_check(self):
+        try:
+            with socket.create_connection((self.host, self.port), timeout=min(self.timeout, 2.0)):
+                return True
+        except OSError:
+            return False
+
+    def describe(self):
+        return f"raw://{self.host}:{self.port}"
+
+
+class SpoolDirectoryBackend(PrintBackend):
+    """Drops rendered ZPL jobs into a folder watched by a print spooler."""
+    name = "spool"
+
+    def __init__(self, spool_dir):
+        self.spool_dir = spool_dir
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def print_label(self, label_path, qty):
+        payload = render_label(label_path, qty)
+        stem = os.path.splitext(os.path.basename(label_path))[0]
+        job_name = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{stem}.zpl"
+        tmp_path = os.path.join(self.spool_dir, f".{job_name}.tmp")
+        with open(tmp_path, 'wb') as fh:
+            fh.write(payload)
+        # Atomic rename so the spooler never picks up a half-written job
+        os.replace(tmp_path, os.path.join(self.spool_dir, job_name))
+
+    def health_check(self):
+        return os.path.isdir(self.spool_dir) and os.access(self.spool_dir, os.W_OK)
+
+    def describe(self):
+        return f"spool://{self.spool_dir}"
+
+
+def force_window_focus(window_name):
+    if not PRINTING_AVAILABLE: return # Skip on cloud
+
+    def callback(hwnd, _):
+        if win32gui.IsWindowVisible(hwnd):
+            title = win32gui.GetWindowText(hwnd)
+            if window_name.lower() in title.lower():
+                try:
+                    win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+                    win32gui.SetForegroundWindow(hwnd)
+                except: pass
+    try:
+        win32gui.EnumWindows(callback, None)
+    except Exception:
+        pass
+
+
+def get_print_backend():
+    """
+    Backend selected by SKU_PRINT_BACKEND:
+      zebra_gui (default on Windows), raw (SKU_PRINTER_HOST / SKU_PRINTER_PORT),
+      spool (SKU_SPOOL_DIR), preview (default on Cloud).
+    """
+    choice = os.getenv("SKU_PRINT_BACKEND", "zebra_gui" if PRINTING_AVAILABLE else "preview").strip().lower()
+
+    if choice == "raw":
+        host = os.getenv("SKU_PRINTER_HOST")
+        if host:
+            return RawSocketBackend(host, os.getenv("SKU_PRINTER_PORT", "9100"))
+        print("⚠️ SKU_PRINT_BACKEND=raw but SKU_PRINTER_HOST is not set. Falling back.")
+    elif choice == "spool":
+        spool_dir = os.getenv("SKU_SPOOL_DIR")
+        if spool_dir:
+            return SpoolDirectoryBackend(spool_dir)
+        print("⚠️ SKU_PRINT_BACKEND=spool but SKU_SPOOL_DIR is not set. Falling back.")
+    elif choice == "preview":
+        return PreviewBackend()
+
+    return ZebraDesignerBackend() if PRINTING_AVAILABLE else PreviewBackend()
+
+
+def get_printer_pool():
+    """
+    Printers used for SKU jobs. SKU_PRINTERS="host1:9100,host2:9100@1.5" builds a pool of
+    raw-socket printers (optional @seconds-per-label: the speed assumed until ~HS confirmations
+    measure it, or for good if the printer doesn't answer ~HS); otherwise the pool is the
+    single backend from get_print_backend().
+    """
+    pool = []
+    for entry in os.getenv("SKU_PRINTERS", "").split(","):
+        entry = entry.strip()
+        if not entry: continue
+        address, _, speed = entry.partition("@")
+        host, _, port = address.partition(":")
+        pool.append(RawSocketBackend(host, port or 9100, seconds_per_label=float(speed) if speed else None))
+    return pool or [get_print_backend()]
@@ -0,0 +1,231 @@
+import os
+import time
+import threading
+from collections import deque
+
+from .label_cache import LabelRenderError
+
+# --- PRINT SCHEDULER (Printer Pool) ---
+# Spreads resolved (label, quantity) jobs over every healthy printer in the pool.
+# Jobs wait in a shared backlog; each printer holds at most QUEUE_DEPTH of them, and the
+# next job goes to the printer with the least estimated pending work
+# (queued labels x seconds-per-label). Failed jobs are requeued on another printer.
+# A printer's seconds-per-label starts at its configured speed and is only learned from
+# jobs whose backend confirmed completion (raw printers answering ~HS): for the others,
+# print_label() returns once the data is handed off, which says nothing about print time.
+
+SECONDS_PER_LABEL = float(os.getenv("SKU_SECONDS_PER_LABEL", "1.0"))
+JOB_OVERHEAD_SECONDS = 0.5
+MAX_ATTEMPTS = 3
+QUEUE_DEPTH = 2
+
+
+class PrintJob:
+    def __init__(self, label_path, label_file, qty, ref=None, job_id=None):
+        self.job_id = job_id
+        self.label_path = label_path
+        self.label_file = label_file
+        self.qty = int(qty)
+        self.ref = ref              # caller's handle (e.g. report row positions)
+        self.status = "QUEUED"
+        self.printer = None
+        self.attempts = 0
+        self.errors = []
+        self.failed_on = set()
+
+
+class PrinterStats:
+    def __init__(self, name):
+        self.name = name
+        self.jobs = 0
+        self.labels = 0
+        self.failures = 0
+        self.busy_seconds = 0.0
+        self.estimated = False    # some busy time is estimated (printer didn't confirm completion)
+        self.healthy = True
+
+    def as_dict(self):
+        per_minute = (self.labels / self.busy_seconds * 60) if self.busy_seconds else 0.0
+        return {
+            "printer": self.name,
+            "healthy": self.healthy,
+            "jobs": self.jobs,
+            "labels": self.labels,
+            "failures": self.failures,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "labels_per_minute": round(per_minute, 1),
+            "timing": "estimated" if self.estimated else "measured",
+        }
+
+
+class _PrinterSlot:
+    def __init__(self, backend):
+        self.backend = backend
+        self.queue = deque()
+        self.pending_seconds = 0.0
+        self.seconds_per_label = backend.seconds_per_label or SECONDS_PER_LABEL
+        self.stats = PrinterStats(backend.describe())
+
+    def estimate(self, job):
+        return JOB_OVERHEAD_SECONDS + job.qty * self.seconds_per_label
+
+
+class PrintScheduler:
+    def __init__(self, backends, max_attempts=MAX_ATTEMPTS, queue_depth=QUEUE_DEPTH):
+        self.slots = [_PrinterSlot(b) for b in backends]
+        self.max_attempts = max_attempts
+        self.queue_depth = queue_depth
+        self._cond = threading.Condition()
+        self._backlog = deque()
+        self._remaining = 0
+        self._active = []
+        self._on_done = None
+        self._completed = deque()           # finished jobs not yet reported to on_done
+        self._callback_lock = threading.Lock()
+
+    # --- ASSIGNMENT ---
+    def _fill(self):
+        """Moves backlog jobs onto printers with free queue room. Caller holds the lock."""
+        if not self._active:
+            while self._backlog:
+                self._finish(self._backlog.popleft(), "ERROR", "No healthy printer left in the pool")
+            return
+
+        while self._backlog:
+            job = self._backlog[0]
+            room = [s for s in self._active if len(s.queue) < self.queue_depth]
+            # A requeued job avoids the printer that just failed it when there is a choice
+            preferred = [s for s in room if s.stats.name not in job.failed_on] or room
+            if not preferred: break
+            slot = min(preferred, key=lambda s: s.pending_seconds + s.estimate(job))
+            self._backlog.popleft()
+            job.printer = slot.stats.name
+            slot.queue.append(job)
+            slot.pending_seconds += slot.estimate(job)
+        self._cond.notify_all()
+
+    def _assign(self, job, exclude=None):
+        if exclude is not None: job.failed_on.add(exclude.stats.name)
+        self._backlog.appendleft(job)
+        self._fill()
+
+    def _finish(self, job, status, error=None):
+        job.status = status
+        if error: job.errors.append(error)
+        self._remaining -= 1
+        self._completed.append(job)
+        self._cond.notify_all()
+
+    def _report_done(self):
+        """Calls on_done for finished jobs outside the scheduler lock, one at a time, in finish order."""
+        if not self._on_done: return
+        with self._callback_lock:
+            while True:
+                with self._cond:
+                    if not self._completed: return
+                    job = self._completed.popleft()
+                self._on_done(job)
+
+    def _retire(self, slot):
+        """Printer failed its health check: drop it and hand its queue to the others."""
+        if slot in self._active: self._active.remove(slot)
+        slot.stats.healthy = False
+        self._backlog.extendleft(reversed(slot.queue))
+        slot.queue.clear()
+        slot.pending_seconds = 0.0
+        self._fill()
+
+    # --- WORKERS ---
+    def _worker(self, slot):
+        while True:
+            # A slow callback (e.g. saving resume state) must not hold up the other printers
+            self._report_done()
+            with self._cond:
+                while not slot.queue and self._remaining > 0 and slot in self._active:
+                    self._cond.wait()
+                if not slot.queue or slot not in self._active:
+                    return
+                job = slot.queue.popleft()
+
+            started = time.perf_counter()
+            error = None
+            try:
+                slot.backend.print_label(job.label_path, job.qty)
+            except Exception as e:
+                error = e
+            elapsed = time.perf_counter() - started
+
+            healthy = True if error is None or isinstance(error, LabelRenderError) else slot.backend.health_check()
+
+            confirmed = slot.backend.confirms_completion
+
+            with self._cond:
+                slot.pending_seconds = max(0.0, slot.pending_seconds - slot.estimate(job))
+                job.attempts += 1
+
+                if error is None:
+                    slot.stats.jobs += 1
+                    slot.stats.labels += job.qty
+                    if confirmed:
+                        slot.stats.busy_seconds += elapsed
+                        # Learn this printer's real speed (EWMA) for the next assignments
+                        observed = max(0.0, elapsed - JOB_OVERHEAD_SECONDS) / max(job.qty, 1)
+                        slot.seconds_per_label = 0.7 * slot.seconds_per_label + 0.3 * observed
+                    else:
+                        slot.stats.busy_seconds += slot.estimate(job)
+                        slot.stats.estimated = True
+                    self._finish(job, "PRINTED")
+                    self._fill()
+                    continue
+
+                slot.stats.busy_seconds += elapsed
+                slot.stats.failures += 1
+                message = f"{slot.stats.name}: {error}"
+                if not healthy:
+                    self._retire(slot)
+
+                if isinstance(error, LabelRenderError) or job.attempts >= self.max_attempts:
+                    self._finish(job, "ERROR", message)
+                    self._fill()
+                else:
+                    job.errors.append(message)
+                    self._assign(job, exclude=slot)
+
+                if not healthy:
+                    return
+
+    # --- RUN ---
+    def run(self, jobs, on_done=None):
+        """
+        Prints every job across the pool and blocks until all are PRINTED or ERROR.
+        on_done(job) is called as each job finishes (progress / resume bookkeeping), from
+        one thread at a time and never while the scheduler lock is held.
+        """
+        jobs = list(jobs)
+        if not jobs: return jobs
+        self._on_done = on_done
+        self._completed.clear()
+
+        # Health check up-front: unreachable printers never receive work
+        for slot in self.slots:
+            slot.stats.healthy = slot.backend.health_check()
+        self._active = [s for s in self.slots if s.stats.healthy]
+        self._remaining = len(jobs)
+
+        with self._cond:
+            # Biggest jobs first keeps the pool balanced (longest-processing-time rule)
+            self._backlog.extend(sorted(jobs, key=lambda j: j.qty, reverse=True))
+            self._fill()
+
+        threads = [threading.Thread(target=self._worker, args=(s,), daemon=True) for s in list(self._active)]
+        for t in threads: t.start()
+
+        with self._cond:
+            while self._remaining > 0:
+                self._cond.wait()
+        for t in threads: t.join()
+        self._report_done()
+        return jobs
+
+    def stats(self):
+        return [s.stats.as_dict() for s in self.slots]
@@ -0,0 +1,42 @@
+import time
+import threading
+
+# --- TOKEN BUCKET RATE LIMITER ---
+# Shared by worker threads: each request takes one token, tokens refill at `rate` per second
+# and up to `burst` can be saved up. Total throughput follows the rate, not request latency.
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst) if burst else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Takes a token if one is available right now."""
+        if self.rate <= 0: return True
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self):
+        """Blocks until a token is available (rate <= 0 means unlimited)."""
+        if self.rate <= 0: return
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
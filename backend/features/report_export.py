@@ -0,0 +1,182 @@
+import os
+import csv
+import math
+
+import openpyxl
+
+# Optional: Parquet output needs pyarrow (not required for XLSX/CSV)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# --- STREAMING REPORT EXPORT ---
+# Every downloadable report (Print_Report, Amazon_Suggestions, SevenXT_SEO, ...) is written
+# row by row instead of DataFrame -> to_excel at the end. XLSX goes through openpyxl's
+# write-only mode (rows are streamed to a temp file, never held as cells), CSV through the
+# csv module and Parquet as pyarrow row groups. Memory stays flat with the row count and
+# flush() pushes buffered rows to disk while a job is still running.
+
+FORMATS = ("xlsx", "csv", "parquet")
+DEFAULT_FORMAT = os.getenv("REPORT_FORMAT", "xlsx")
+PARQUET_BATCH_ROWS = 10000
+
+
+class ReportFormatError(ValueError):
+    pass
+
+
+def resolve_format(fmt=None):
+    fmt = (fmt or DEFAULT_FORMAT).strip().lower().lstrip(".")
+    if fmt == "xls": fmt = "xlsx"
+    if fmt not in FORMATS:
+        raise ReportFormatError(f"Unknown report format '{fmt}' (use {', '.join(FORMATS)})")
+    if fmt == "parquet" and not PARQUET_AVAILABLE:
+        raise ReportFormatError("Parquet export needs pyarrow (pip install pyarrow)")
+    return fmt
+
+
+def report_filename(stem, fmt=None):
+    return f"{stem}.{resolve_format(fmt)}"
+
+
+def _clean(value):
+    """NaN/NA -> empty cell; numpy scalars -> plain Python."""
+    if value is None: return None
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        try: value = value.item()
+        except (ValueError, AttributeError): pass
+    if isinstance(value, float) and math.isnan(value): return None
+    if value.__class__.__name__ in ("NAType", "NaTType"): return None
+    return value
+
+
+class ReportWriter:
+    """
+    with ReportWriter(path, columns) as out:
+        out.write_row({...}) / out.write_rows(rows) / out.write_frame(df)
+    Format comes from `fmt` or the path's extension. Keys not in `columns` are ignored and
+    missing ones left empty; without `columns` the first row's keys are used. Rows may also
+    be lists in column order, which needs `columns` (there are no keys to take them from).
+    """
+
+    def __init__(self, path, columns=None, fmt=None, column_types=None):
+        self.path = path
+        self.fmt = resolve_format(fmt or os.path.splitext(path)[1])
+        self.columns = list(columns) if columns is not None else None
+        self.column_types = column_types or {}   # Parquet only: {"Quantity": "int64"}, default string
+        self.rows_written = 0
+        self._tmp_path = f"{path}.part"
+        self._buffer = []
+        self._sink = None
+        self._fh = None
+
+    # --- LIFECYCLE ---
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _open(self):
+        dirname = os.path.dirname(self.path)
+        if dirname: os.makedirs(dirname, exist_ok=True)
+        if self.fmt == "xlsx":
+            self._sink = openpyxl.Workbook(write_only=True)
+            self._sheet = self._sink.create_sheet()
+            self._sheet.append(self.columns)
+        elif self.fmt == "csv":
+            # BOM so Excel opens UTF-8 (emoji, accents) correctly
+            self._fh = open(self._tmp_path, "w", newline="", encoding="utf-8-sig")
+            self._sink = csv.writer(self._fh)
+            self._sink.writerow(self.columns)
+        else:
+            types = {"int64": pa.int64(), "float64": pa.float64(), "string": pa.string()}
+            self._schema = pa.schema([(c, types[self.column_types.get(c, "string")]) for c in self.columns])
+            self._sink = pq.ParquetWriter(self._tmp_path, self._schema)
+
+    # --- WRITING ---
+    def write_row(self, row):
+        if self.columns is None:
+            if not isinstance(row, dict):
+                raise ValueError("ReportWriter needs `columns` to write list rows")
+            self.columns = list(row.keys())
+        if self._sink is None:
+            self._open()
+        values = [_clean(row.get(c)) for c in self.columns] if isinstance(row, dict) else [_clean(v) for v in row]
+        self.rows_written += 1
+
+        if self.fmt == "xlsx":
+            self._sheet.append(values)
+        elif self.fmt == "csv":
+            self._sink.writerow(values)
+        else:
+            self._buffer.append(values)
+            if len(self._buffer) >= PARQUET_BATCH_ROWS: self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    def write_frame(self, df):
+        """Appends a DataFrame chunk (columns matched by name)."""
+        if self.columns is None:
+            self.columns = list(df.columns)
+        positions = [df.columns.get_loc(c) if c in df.columns else None for c in self.columns]
+        for values in df.itertuples(index=False, name=None):
+            self.write_row([values[p] if p is not None else None for p in positions])
+
+    def flush(self):
+        """Pushes buffered rows to disk (a CSV is readable up to here while the job runs)."""
+        if self._sink is None: return
+        if self.fmt == "csv":
+            self._fh.flush()
+        elif self.fmt == "parquet" and self._buffer:
+            columns = list(zip(*self._buffer))
+            arrays = []
+            for field, values in zip(self._schema, columns):
+                if pa.types.is_string(field.type):
+                    values = [None if v is None else str(v) for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            self._sink.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+            self._buffer = []
+
+    def close(self):
+        """Finishes the file (atomically: readers never see a half-written workbook)."""
+        if self._sink is None:
+            if self.columns is None: self.columns = []
+            self._open()
+        self.flush()
+        if self.fmt == "xlsx":
+            self._sink.save(self._tmp_path)
+        elif self.fmt == "csv":
+            self._fh.close()
+        else:
+            self._sink.close()
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        try:
+            if self._fh is not None: self._fh.close()
+            if self.fmt == "parquet" and self._sink is not None: self._sink.close()
+        except Exception:
+            pass
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def write_report(path, rows, columns=None, fmt=None, column_types=None):
+    """One-shot helper: streams an iterable of row dicts (or a DataFrame) to `path`."""
+    with ReportWriter(path, columns, fmt, column_types) as out:
+        if hasattr(rows, "itertuples"):
+            out.write_frame(rows)
+        else:
+            out.write_rows(rows)
+    return path
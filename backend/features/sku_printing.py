@@ -1,200 +1,286 @@
 import os
-import glob
+import shutil
+import tempfile
 import pandas as pd
-import time
-import subprocess
-import re
+import numpy as np
 from datetime import datetime
 
-# --- 1. SAFE IMPORTS FOR HYBRID CLOUD/LOCAL SUPPORT ---
-# This prevents the server from crashing on Linux (Render) where these libraries don't exist.
-try:
-    import win32print
-    import win32gui
-    import win32con
-    import pyautogui
-    PRINTING_AVAILABLE = True
-except ImportError:
-    # If we are on Linux/Render, these will fail. We catch the error here.
-    win32print = None
-    win32gui = None
-    win32con = None
-    pyautogui = None
-    PRINTING_AVAILABLE = False
-    print("⚠️ Host is Linux/Cloud: Physical printing disabled.")
+from .label_index import get_label_index
+from .print_backends import PRINTING_AVAILABLE, get_printer_pool
+from .print_scheduler import PrintJob, PrintScheduler
+from .label_cache import LABEL_CACHE
+from .report_export import ReportWriter, report_filename
+from .ingest import detect_layout, iter_chunks
+
+# --- 1. PRINT BACKENDS ---
+# Windows/GUI detection and the printer backends live in print_backends.py.
+# PRINTING_AVAILABLE is still True only on the local Windows app (reports open locally there).
 
 # --- 2. HYPER-STRICT SEARCH LOGIC ---
 def find_label_file(sku, label_folder_absolute):
     """
     Finds the label ONLY if the exact Input SKU exists as a whole word.
     NO prefix stripping. NO partial matching.
+    Lookups go through the persistent label index (rebuilt when the folder changes).
     """
-    target_sku = str(sku).strip()
-    if not target_sku: return None, None
-    
-    # Escape characters (e.g., dots or brackets in SKU)
-    safe_sku = re.escape(target_sku)
+    index = get_label_index(label_folder_absolute)
+    if index is None: return None, None
+    return index.lookup(sku)
 
-    try:
-        all_files = [f for f in os.listdir(label_folder_absolute) if f.lower().endswith(".lbl")]
-    except FileNotFoundError:
-        return None, None
+# Print_Report columns (the internal Label Path is never exported)
+REPORT_COLUMNS = ["SKU Input", "Label File", "Quantity", "Status", "Time", "Suggestions", "Print Job"]
+
+def resolve_order_skus(sku_series, qty_series, label_folder_absolute, print_enabled=PRINTING_AVAILABLE):
+    """
+    Batch stage: normalizes the SKU/Qty columns, drops zero or invalid quantities,
+    resolves every unique SKU once and returns the report DataFrame
+    (SKU Input, Label File, Quantity, Status, Time, Suggestions + internal Label Path).
+    """
+    skus = sku_series.astype(str).str.strip()
+    qtys = pd.to_numeric(qty_series, errors='coerce').replace([np.inf, -np.inf], np.nan).fillna(0)
+    qtys = qtys.astype('int64')
+
+    keep = qtys > 0
+    skus, qtys = skus[keep], qtys[keep]
+
+    index = get_label_index(label_folder_absolute)
+    resolved = index.resolve_many(skus.unique()) if index is not None else {}
+    paths = skus.map({sku: hit[0] for sku, hit in resolved.items() if hit[0]})
+    filenames = skus.map({sku: hit[1] for sku, hit in resolved.items() if hit[1]})
+    found = paths.notna()
 
-    # REGEX: Lookbehind/Lookahead ensures "SP-ATP6w" is a distinct word
-    pattern = re.compile(r'(?<![a-zA-Z0-9])' + safe_sku + r'(?![a-zA-Z0-9])', re.IGNORECASE)
+    # Near-miss suggestions (trigram index) for SKUs with no exact label
+    hints = {sku: ", ".join(index.suggest(sku)) for sku, hit in resolved.items() if not hit[0]} if index is not None else {}
 
-    for filename in all_files:
-        if pattern.search(filename):
-            return os.path.join(label_folder_absolute, filename), filename
+    report = pd.DataFrame({
+        "SKU Input": skus.values,
+        "Label File": filenames.fillna("NOT FOUND").values,
+        "Quantity": qtys.values,
+        "Status": np.where(found, "QUEUED" if print_enabled else "CLOUD_PREVIEW", "MISSING"),
+        "Time": datetime.now().strftime("%H:%M:%S"),
+        "Suggestions": skus.map(hints).fillna("").values,
+        "Label Path": paths.values,
+    })
+    return report
 
-    return None, None
+# --- 3. STREAMING ORDER READER ---
+ORDER_CHUNK_ROWS = int(os.getenv("SKU_ORDER_CHUNK_ROWS", "50000"))
 
-def force_window_focus(window_name):
-    if not PRINTING_AVAILABLE: return # Skip on cloud
+def detect_order_layout(filepath):
+    """
+    Scans only the first rows to find the SKU/Qty columns (see features/ingest.py).
+    Returns a SheetLayout (no header: Col A=SKU, Col B=Qty) or None if the columns are missing.
+    """
+    return detect_layout(filepath, ("sku", "qty"), fallback={"sku": 0, "qty": 1})
+
+def iter_order_chunks(layout, chunksize=ORDER_CHUNK_ROWS):
+    """Yields DataFrames with just two columns (sku as text, qty as number), chunksize rows at a time."""
+    return iter_chunks(layout, chunksize)
+
+# --- 4. PRINT DISPATCH ---
+def _collect_report_rows(report, log, processed_files, label_jobs, print_enabled):
+    """
+    Logs every resolved row of a report chunk and folds it into the print job of its label
+    (duplicate SKUs/labels share one job with the summed quantity). Returns matched row count.
+    """
+    items_processed = 0
+    job_ids = []
     
-    def callback(hwnd, _):
-        if win32gui.IsWindowVisible(hwnd):
-            title = win32gui.GetWindowText(hwnd)
-            if window_name.lower() in title.lower():
-                try:
-                    win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                    win32gui.SetForegroundWindow(hwnd)
-                except: pass
+    rows = zip(report["SKU Input"], report["Label File"], report["Quantity"], report["Label Path"], report["Suggestions"])
+    for sku, filename, qty, abs_path, hint in rows:
+        if pd.notna(abs_path):
+            log.append(f"✅ Match: {sku} -> {filename}")
+            processed_files.append(f"FILE_ICON:{filename}|{qty}")
+            items_processed += 1
+
+            job = label_jobs.get(abs_path)
+            if job is None:
+                job = label_jobs[abs_path] = PrintJob(abs_path, filename, 0, ref=0, job_id=f"J{len(label_jobs) + 1}")
+            job.qty += int(qty)
+            job.ref += 1  # report rows sharing this job
+            job_ids.append(job.job_id)
+
+            if not print_enabled:
+                # On Cloud, we just log that we would have printed it
+                log.append(f"   ℹ️ [Cloud] Skipped physical print for {qty} copies.")
+
+        else:
+            # STRICT FAIL
+            log.append(f"   ❌ SKU NOT FOUND: {sku}")
+            if hint: log.append(f"      💡 Closest labels: {hint}")
+            job_ids.append("")
+
+    # Per-row traceability: every report row points at the job that printed it
+    report["Print Job"] = job_ids
+    return items_processed
+
+def _print_jobs(jobs, printers, log, job=None):
+    """Runs the coalesced jobs on the printer pool (each job's status then applies to all of its report rows)."""
+    if not jobs: return []
+
+    # Resumed background job: never send a label twice. Printed labels are appended to a
+    # scratch file, one line each, rather than rewriting the job JSON (and its log) per label.
+    printed_path = job.scratch_path("printed.txt") if job is not None else None
+    already_printed = set()
+    if printed_path and job.resumed and os.path.exists(printed_path):
+        with open(printed_path, "r", encoding="utf-8") as fh:
+            already_printed.update(line.rstrip("\n") for line in fh if line.strip())
+    pending = []
+    for print_job in jobs:
+        if print_job.label_path in already_printed:
+            print_job.status = "PRINTED"
+            log.append(f"   ⏭️ Already printed before restart: {print_job.label_file}")
+        else:
+            pending.append(print_job)
+
+    finished = [len(jobs) - len(pending)]
+    printed_log = open(printed_path, "a" if job.resumed else "w", encoding="utf-8") if printed_path else None
+
+    def on_done(print_job):
+        if job is None: return
+        if print_job.status == "PRINTED":
+            printed_log.write(print_job.label_path + "\n")
+            printed_log.flush()
+        finished[0] += 1
+        job.progress(finished[0], len(jobs), stage="printing")
+
+    scheduler = PrintScheduler(printers)
+    log.append(f"🖨️ Printing {len(pending)} jobs on {len(printers)} printer(s)...")
     try:
-        win32gui.EnumWindows(callback, None)
-    except Exception:
-        pass
+        scheduler.run(pending, on_done=on_done)
+    finally:
+        if printed_log: printed_log.close()
+
+    for print_job in jobs:
+        if print_job.status != "PRINTED":
+            log.append(f"   ⚠️ Print Error: {print_job.label_file} -> {'; '.join(print_job.errors)}")
 
-def process_order_file(filepath, label_folder_absolute):
-    log = []
+    printer_stats = scheduler.stats()
+    for stat in printer_stats:
+        health = "" if stat["healthy"] else " (OFFLINE)"
+        log.append(f"   📊 {stat['printer']}{health}: {stat['jobs']} jobs, {stat['labels']} labels, "
+                   f"{stat['failures']} failures, {stat['labels_per_minute']} labels/min"
+                   f"{' (estimated)' if stat['timing'] == 'estimated' else ''}")
+    cache = LABEL_CACHE.stats()
+    if cache["hits"] or cache["misses"]:
+        log.append(f"   🧠 Label cache: {cache['entries']} templates, {cache['hits']} hits, {cache['misses']} compiles")
+    return printer_stats
+
+def process_order_file(filepath, label_folder_absolute, printers=None, job=None, report_format=None):
+    """
+    Reads an order sheet, resolves every SKU to its label and prints through the printer pool.
+    When run as a background job (job=JobContext) the log and progress are live on the job,
+    and labels printed before a restart are skipped on resume.
+    report_format: xlsx (default), csv or parquet.
+    """
+    log = job.log if job is not None else []
     processed_files = []
-    report_data = []
+    if printers is None: printers = get_printer_pool()
+    print_enabled = any(p.available for p in printers)
+    printers = [p for p in printers if p.available]
     
     log.append(f"Processing: {os.path.basename(filepath)}")
     
     # --- CLOUD CHECK ---
-    if not PRINTING_AVAILABLE:
+    if print_enabled:
+        log.append(f"🖨️ Printers: {', '.join(p.describe() for p in printers)}")
+    else:
         log.append("⚠️ SERVER NOTICE: Physical printing is disabled on Cloud Hosting.")
         log.append("ℹ️ This feature only works on the Local Windows App.")
         # We continue just to parse the file and show what WOULD have happened
     
-    # Read Data
+    # Identify Columns (header scan on the first row only)
     try:
-        if filepath.endswith('.csv'): df = pd.read_csv(filepath)
-        else: df = pd.read_excel(filepath, engine='openpyxl')
-        df.columns = df.columns.str.strip()
-        
-        # Check Headers
-        col_names = [str(c).lower() for c in df.columns]
-        if not any('sku' in c for c in col_names):
-            log.append("⚠️ No headers found. Assuming Col A=SKU, Col B=Qty")
-            if filepath.endswith('.csv'): df = pd.read_csv(filepath, header=None)
-            else: df = pd.read_excel(filepath, engine='openpyxl', header=None)
-            df.rename(columns={0: 'TargetSKU', 1: 'TargetQty'}, inplace=True)
-            
+        layout = detect_order_layout(filepath)
     except Exception as e:
-        return {"log": [f"❌ Error: {str(e)}"], "printed_images": []}
+        log.append(f"❌ Error: {str(e)}")
+        return {"log": log, "printed_images": []}
 
-    # Identify Columns
-    cols = [c.lower() for c in df.columns]
-    sku_col = next((c for c in df.columns if 'sku' in c.lower()), None)
-    qty_col = next((c for c in df.columns if 'qty' in c.lower() or 'quantity' in c.lower()), None)
-    
-    if not sku_col or not qty_col:
-         return {"log": ["❌ FATAL: Columns Missing."], "printed_images": []}
+    if layout is None:
+        log.append("❌ FATAL: Columns Missing.")
+        return {"log": log, "printed_images": []}
+    if not layout.has_header:
+        log.append("⚠️ No headers found. Assuming Col A=SKU, Col B=Qty")
+    elif layout.header_row:
+        log.append(f"ℹ️ Headers found on row {layout.header_row + 1} (rows above skipped)")
 
-    # --- PATH TO ZEBRA (Only used if printing is available) ---
-    zebra_exe = r"C:\Program Files (x86)\Zebra Technologies\ZebraDesigner 2\bin\Design.exe"
+    # Report goes to Downloads on Local (opened when done), or Uploads on Cloud
+    if PRINTING_AVAILABLE:
+        downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
+        open_file = True
+    else:
+        downloads_path = "uploads"
+        open_file = False
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    try:
+        report_name = report_filename(f"Print_Report_{timestamp}", report_format)
+        full_save_path = os.path.join(downloads_path, report_name)
+        writer = ReportWriter(full_save_path, REPORT_COLUMNS, column_types={"Quantity": "int64"})
+    except Exception as e:
+        log.append(f"⚠️ Report Error: {str(e)}")
+        writer = full_save_path = None
 
+    # Read Data in chunks -> batch resolution -> print.
+    # Without printing, each chunk's report rows are final and streamed straight out.
+    # With printing, statuses are only known after the run, so chunks wait on disk.
     items_processed = 0
-    
-    for index, row in df.iterrows():
-        sku = str(row[sku_col]).strip()
-        try: qty = int(row[qty_col])
-        except: qty = 0
-            
-        if qty <= 0: continue
-
-        # --- STRICT SEARCH CALL ---
-        abs_path, filename = find_label_file(sku, label_folder_absolute)
-        
-        if abs_path:
-            log.append(f"✅ Match: {sku} -> {filename}")
-            processed_files.append(f"FILE_ICON:{filename}|{qty}")
-            items_processed += 1
-            
-            report_data.append({
-                "SKU Input": sku,
-                "Label File": filename,
-                "Quantity": qty,
-                "Status": "QUEUED" if PRINTING_AVAILABLE else "CLOUD_PREVIEW",
-                "Time": datetime.now().strftime("%H:%M:%S")
-            })
-
-            # --- PHYSICAL PRINTING (WINDOWS ONLY) ---
-            if PRINTING_AVAILABLE:
-                try:
-                    subprocess.Popen([zebra_exe, abs_path])
-                    time.sleep(12) 
-                    force_window_focus("ZebraDesigner")
-                    time.sleep(1)
-                    pyautogui.hotkey('ctrl', 'p')
-                    time.sleep(2)
-                    pyautogui.typewrite(str(qty))
-                    time.sleep(0.5)
-                    pyautogui.press('enter')
-                    time.sleep(0.5)
-                    pyautogui.hotkey('alt', 'p') 
-                    time.sleep(8)
-                    os.system("taskkill /f /im Design.exe")
-                    time.sleep(2)
-                    report_data[-1]["Status"] = "PRINTED"
-                except Exception as e:
-                    log.append(f"   ⚠️ Print Error: {str(e)}")
-                    report_data[-1]["Status"] = "ERROR"
-            else:
-                # On Cloud, we just log that we would have printed it
-                log.append(f"   ℹ️ [Cloud] Skipped physical print for {qty} copies.")
+    chunks_read = 0
+    spill_dir = tempfile.mkdtemp(prefix="print_report_") if print_enabled else None
+    label_jobs = {}
+    rows_read = 0
+    try:
+        for chunk in iter_order_chunks(layout):
+            report = resolve_order_skus(chunk["sku"], chunk["qty"], label_folder_absolute, print_enabled)
+            items_processed += _collect_report_rows(report, log, processed_files, label_jobs, print_enabled)
+            if spill_dir:
+                report.to_pickle(os.path.join(spill_dir, f"{chunks_read}.pkl"))
+            elif writer is not None:
+                writer.write_frame(report)
+            chunks_read += 1
+            rows_read += len(chunk)
+            if job is not None: job.progress(rows_read, stage="reading")
+    except Exception as e:
+        if not chunks_read:
+            log.append(f"❌ Error: {str(e)}")
+            if writer is not None: writer.abort()
+            if spill_dir: shutil.rmtree(spill_dir, ignore_errors=True)
+            return {"log": log, "printed_images": []}
+        log.append(f"❌ Read Error (stopped early): {str(e)}")
 
-        else:
-            # STRICT FAIL
-            log.append(f"   ❌ SKU NOT FOUND: {sku}")
-            report_data.append({
-                "SKU Input": sku,
-                "Label File": "NOT FOUND",
-                "Quantity": qty,
-                "Status": "MISSING",
-                "Time": datetime.now().strftime("%H:%M:%S")
-            })
+    # --- COALESCE: one job per label file, quantities summed ---
+    jobs = list(label_jobs.values())
+    if items_processed:
+        log.append(f"🧮 Coalesced {items_processed} matched rows into {len(jobs)} print jobs.")
+
+    # --- PHYSICAL PRINTING (spread over the printer pool) ---
+    printer_stats = _print_jobs(jobs, printers, log, job) if print_enabled else []
 
     log.append(f"{'='*30}")
     log.append(f"🏁 Processed {items_processed} rows.")
     
-    # Report Generation (Save to Downloads on Local, or Uploads on Cloud)
+    # Report Generation
     try:
-        if PRINTING_AVAILABLE:
-            downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
-            # Opens file locally
-            open_file = True
-        else:
-            # On cloud, save to the app's upload folder (or tmp)
-            downloads_path = "uploads" 
-            if not os.path.exists(downloads_path): os.makedirs(downloads_path)
-            open_file = False
-
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        report_name = f"Print_Report_{timestamp}.xlsx"
-        full_save_path = os.path.join(downloads_path, report_name)
-        
-        df_report = pd.DataFrame(report_data)
-        df_report.to_excel(full_save_path, index=False)
-        
-        log.append(f"📄 Report saved: {report_name}")
-        
-        if open_file:
-            os.startfile(full_save_path)
-            
+        if writer is not None:
+            if spill_dir:
+                status_by_path = {path: print_job.status for path, print_job in label_jobs.items()}
+                for n in range(chunks_read):
+                    report = pd.read_pickle(os.path.join(spill_dir, f"{n}.pkl"))
+                    report["Status"] = report["Label Path"].map(status_by_path).fillna(report["Status"])
+                    writer.write_frame(report)
+            writer.close()
+            log.append(f"📄 Report saved: {report_name}")
     except Exception as e:
         log.append(f"⚠️ Report Error: {str(e)}")
+        writer.abort()
+        full_save_path = None
+    finally:
+        if spill_dir: shutil.rmtree(spill_dir, ignore_errors=True)
+
+    # The report is saved at this point: failing to open it must not discard it
+    if open_file and full_save_path:
+        try:
+            os.startfile(full_save_path)
+        except OSError as e:
+            log.append(f"⚠️ Could not open report: {e}")
     
-    return {"log": log, "printed_images": processed_files}
\ No newline at end of file
+    return {"log": log, "printed_images": processed_files, "printer_stats": printer_stats, "report_path": full_save_path}
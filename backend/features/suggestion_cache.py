@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# --- AUTOCOMPLETE SUGGESTION CACHE ---
+# Completion API answers are cached on disk in SQLite, keyed by endpoint + marketplace
+# (mid) + normalized prefix. Bulk suggestions and the keyword generator read through the
+# same cache, so repeating a seed term costs no request or Scrape.do credit until the
+# entry is older than the TTL. Bulk re-runs (incremental mode) accept older answers, up to
+# FRESH_DAYS, through get_many(max_age=...), so rows are kept for the longer of the two.
+# Every PRUNE_EVERY writes, rows past that age are dropped and the table is trimmed back
+# to MAX_ROWS (oldest entries first).
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.getenv("SUGGEST_CACHE_PATH", os.path.join(BACKEND_DIR, 'cache', 'suggestions.sqlite3'))
+TTL_SECONDS = float(os.getenv("SUGGEST_CACHE_TTL_HOURS", "24")) * 3600
+MAX_ROWS = int(os.getenv("SUGGEST_CACHE_MAX_ROWS", "200000"))
+FRESH_DAYS = float(os.getenv("SUGGEST_FRESH_DAYS", "7"))   # incremental bulk runs reuse answers this old
+PRUNE_EVERY = 500  # writes between size checks
+QUERY_BATCH = 500  # keys per SELECT ... IN (...)
+
+
+def normalize_prefix(prefix):
+    """Case and whitespace don't change the completion results."""
+    return " ".join(str(prefix).lower().split())
+
+
+class SuggestionCache:
+    def __init__(self, path=CACHE_PATH, ttl_seconds=TTL_SECONDS, max_rows=MAX_ROWS, keep_seconds=FRESH_DAYS * 86400):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self.keep_seconds = max(ttl_seconds, keep_seconds)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def _connect(self):
+        """Opens the database on first use. Caller holds the lock."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS suggestions ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_suggestions_fetched ON suggestions (fetched_at)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(endpoint, mid, prefix):
+        return f"{endpoint}|{mid}|{normalize_prefix(prefix)}"
+
+    def get(self, endpoint, mid, prefix):
+        """Cached suggestion list, or None when missing or older than the TTL."""
+        key = self.make_key(endpoint, mid, prefix)
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT value, fetched_at FROM suggestions WHERE key = ?", (key,)
+                ).fetchone()
+                if row and time.time() - row[1] <= self.ttl_seconds:
+                    self.hits += 1
+                    return json.loads(row[0])
+                if row: self.expired += 1
+                self.misses += 1
+        except (sqlite3.Error, ValueError) as e:
+            print(f"⚠️ Suggestion cache read failed: {e}")
+        return None
+
+    def get_many(self, endpoint, mid, prefixes, max_age):
+        """{normalized prefix: suggestions} for every prefix answered within max_age seconds."""
+        keys = {self.make_key(endpoint, mid, p): normalize_prefix(p) for p in prefixes}
+        found = {}
+        key_list = list(keys)
+        try:
+            with self._lock:
+                conn = self._connect()
+                for start in range(0, len(key_list), QUERY_BATCH):
+                    batch = key_list[start:start + QUERY_BATCH]
+                    rows = conn.execute(
+                        f"SELECT key, value FROM suggestions WHERE key IN ({','.join('?' * len(batch))})"
+                        " AND fetched_at >= ?",
+                        (*batch, time.time() - max_age),
+                    ).fetchall()
+                    for key, value in rows:
+                        found[keys[key]] = json.loads(value)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"⚠️ Suggestion cache read failed: {e}")
+        return found
+
+    def put(self, endpoint, mid, prefix, suggestions):
+        key = self.make_key(endpoint, mid, prefix)
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO suggestions (key, value, fetched_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(list(suggestions)), time.time()),
+                    )
+                self._writes += 1
+                if self._writes % PRUNE_EVERY == 0:
+                    self._prune(conn)
+        except sqlite3.Error as e:
+            print(f"⚠️ Suggestion cache write failed: {e}")
+
+    def _prune(self, conn):
+        """Drops rows past keep_seconds, then the oldest ones above max_rows. Caller holds the lock."""
+        with conn:
+            conn.execute("DELETE FROM suggestions WHERE fetched_at < ?", (time.time() - self.keep_seconds,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM suggestions").fetchone()
+            if count > self.max_rows:
+                conn.execute(
+                    "DELETE FROM suggestions WHERE key IN"
+                    " (SELECT key FROM suggestions ORDER BY fetched_at LIMIT ?)",
+                    (count - self.max_rows,),
+                )
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "expired": self.expired}
+
+
+# Shared by every feature that calls the completion API in this process
+SUGGESTION_CACHE = SuggestionCache()
@@ -1,6 +1,8 @@
 import os
+import json
+import time
 import mimetypes
-from flask import Flask, request, jsonify, send_file, render_template, send_from_directory
+from flask import Flask, request, jsonify, send_file, render_template, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 from functools import wraps  # Import for security decorator
 
@@ -13,8 +15,14 @@ from features.sku_printing import process_order_file
 from features.blog_wrapper import start_blog_automation
 from features.keyword_gen.ai_keywords import get_hybrid_keywords
 from features.blog_posting.core.generate_blog import search_trending_topics
-from features.amazon_details import get_product_details
+from features.amazon_details import STREAM_STATS, get_product_details
+from features.details_cache import DETAILS_CACHE
+from features.bulk_details import MAX_TARGETS, iter_bulk_details, parse_targets, read_targets, write_bulk_report
 from features.amazon_suggestions import run_suggestion_scraper
+from features.keyword_crawler import run_keyword_crawl
+from features.marketplaces import parse_marketplaces
+from features.report_export import ReportFormatError, resolve_format
+from features.job_queue import JobQueue
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 CORS(app)
@@ -24,9 +32,77 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
 IMAGE_FOLDER_ABSOLUTE = os.path.join(BASE_DIR, 'static', 'labels')
 
+JOBS_FOLDER = os.path.join(BASE_DIR, 'cache', 'jobs')
+
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# --- Background Jobs (long print runs don't hold the HTTP request open) ---
+JOBS = JobQueue(JOBS_FOLDER)
+
+def _public_url(path):
+    """Absolute URL for a /download/... path (HTTPS behind the Render proxy)."""
+    final_url = request.host_url.rstrip('/') + path
+    if request.headers.get('X-Forwarded-Proto') == 'https':
+        final_url = final_url.replace('http://', 'https://')
+    return final_url
+
+def _with_public_urls(job):
+    """Job snapshot with absolute download links in its result."""
+    if job.get('result'):
+        result = dict(job['result'])
+        for key in ('report_url', 'file_url'):
+            if result.get(key): result[key] = _public_url(result[key])
+        job['result'] = result
+    return job
+
+def _wants_async():
+    """True when the client sent 'Prefer: respond-async' and polls the job itself."""
+    return 'respond-async' in request.headers.get('Prefer', '').lower()
+
+def _report_format(data=None):
+    """Report format from ?format=, a form field or the JSON body (xlsx, csv, parquet)."""
+    fmt = request.args.get('format') or request.form.get('format') or (data or {}).get('format')
+    return resolve_format(fmt)
+
+def _sku_print_job(job):
+    result = process_order_file(job.payload['filepath'], IMAGE_FOLDER_ABSOLUTE, job=job,
+                                report_format=job.payload.get('report_format'))
+    result.pop('log', None)  # already live on the job
+    report_path = result.get('report_path')
+    if report_path and os.path.dirname(os.path.abspath(report_path)) == UPLOAD_FOLDER:
+        result['report_url'] = f"/download/{os.path.basename(report_path)}"
+    return result
+
+def _bulk_suggestions_job(job):
+    payload = job.payload
+    options = {k: payload[k] for k in ('incremental', 'fresh_days', 'marketplaces', 'report_format') if payload.get(k) is not None}
+    result = run_suggestion_scraper(payload['filepath'], UPLOAD_FOLDER, job=job, **options)
+    if not result['success']: raise RuntimeError(result['error'])
+    return result
+
+def _keyword_crawl_job(job):
+    payload = job.payload
+    result = run_keyword_crawl(payload['filepath'], UPLOAD_FOLDER, depth=payload.get('depth', 1),
+                               job=job, marketplace=payload.get('marketplace'), report_format=payload.get('report_format'))
+    if not result['success']: raise RuntimeError(result['error'])
+    return result
+
+def _bulk_details_job(job):
+    payload = job.payload
+    # Already-fetched ASINs come back from the details cache after a restart
+    targets = [tuple(t) for t in payload['targets']]
+    return write_bulk_report(targets, UPLOAD_FOLDER, report_format=payload.get('report_format'),
+                             job=job, refresh=payload.get('refresh', False))
+
+# One print run at a time: runs share the same printers
+JOBS.register('sku_print', _sku_print_job, max_workers=int(os.getenv("SKU_JOB_WORKERS", "1")))
+# Suggestion runs share the completion rate limits, so more workers wouldn't go faster
+JOBS.register('bulk_suggestions', _bulk_suggestions_job, max_workers=int(os.getenv("SUGGEST_JOB_WORKERS", "1")))
+JOBS.register('keyword_crawl', _keyword_crawl_job, max_workers=int(os.getenv("SUGGEST_JOB_WORKERS", "1")))
+# Each batch already fetches BULK_DETAILS_WORKERS pages at once
+JOBS.register('bulk_details', _bulk_details_job, max_workers=int(os.getenv("DETAILS_JOB_WORKERS", "1")))
+
 # 🔐 SECURITY SYSTEM START (Multi-User Safe Mode)
 USERS = {
     "admin": {
@@ -56,6 +132,10 @@ USERS = {
     }
 }
 
+def _valid_token(token):
+    # (For this simple system, the password acts as the access token)
+    return bool(token) and any(user_data['password'] == token for user_data in USERS.values())
+
 # 2. Authentication Decorator
 def require_auth(f):
     @wraps(f)
@@ -68,14 +148,7 @@ def require_auth(f):
         token = request.headers.get('X-Access-Token')
         
         # Check if token matches ANY active user password
-        # (For this simple system, the password acts as the access token)
-        is_valid = False
-        for user_key, user_data in USERS.items():
-            if user_data['password'] == token:
-                is_valid = True
-                break
-                
-        if not token or not is_valid:
+        if not _valid_token(token):
             return jsonify({"error": "⛔ Unauthorized: Please Login Again"}), 401
             
         return f(*args, **kwargs)
@@ -113,14 +186,81 @@ def verify_login():
 def sku_route():
     if 'file' not in request.files: return jsonify({"error": "No file"}), 400
     file = request.files['file']
+    try:
+        report_format = _report_format()
+    except ReportFormatError as e:
+        return jsonify({"error": str(e)}), 400
     
     import time
     unique_filename = f"{int(time.time())}_{file.filename}"
     filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
     file.save(filepath)
     
-    result = process_order_file(filepath, IMAGE_FOLDER_ABSOLUTE)
-    return jsonify(result)
+    job_id = JOBS.submit('sku_print', {"filepath": filepath, "filename": file.filename, "report_format": report_format})
+    if not _wants_async():
+        # Older dashboard builds expect the finished run (log + printed_images) in this response
+        job = _with_public_urls(JOBS.wait(job_id))
+        result = dict(job['result'] or {"printed_images": []})
+        result.update(job_id=job_id, status=job['status'], log=job['log'])
+        if job['error']: result['error'] = job['error']
+        return jsonify(result), (200 if job['status'] == 'done' else 500)
+
+    # Enqueue and return immediately; the dashboard polls /api/jobs/<job_id>
+    return jsonify({
+        "job_id": job_id,
+        "status_url": f"/api/jobs/{job_id}",
+        "log": [f"🧾 Print job queued: {job_id}"],
+        "printed_images": []
+    }), 202
+
+# --- JOB STATUS (Protected) ---
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@require_auth
+def job_status_route(job_id):
+    since = request.args.get('since', default=0, type=int)
+    job = JOBS.get(job_id, since=since)
+    if job is None: return jsonify({"error": "Job not found"}), 404
+    return jsonify(_with_public_urls(job))
+
+# --- JOB PROGRESS STREAM (Server-Sent Events) ---
+# Same X-Access-Token header as every other route: read it with fetch() and a stream
+# reader (EventSource can't send headers, and the password must not go in the URL).
+# A stream holds a worker thread, so it ends after EVENTS_MAX_SECONDS with a
+# 'reconnect' event (reconnect with ?since=<log_offset>); heartbeats notice clients
+# that went away in between.
+EVENTS_MAX_SECONDS = int(os.getenv("JOB_EVENTS_MAX_SECONDS", "300"))
+EVENTS_HEARTBEAT_SECONDS = 15
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+@require_auth
+def job_events_route(job_id):
+    if JOBS.get(job_id) is None: return jsonify({"error": "Job not found"}), 404
+
+    since = request.args.get('since', default=0, type=int)
+
+    def stream():
+        offset, last = since, None
+        deadline = time.monotonic() + EVENTS_MAX_SECONDS
+        last_sent = time.monotonic()
+        while True:
+            job = _with_public_urls(JOBS.get(job_id, since=offset))
+            offset = job['log_total']
+            finished = job['status'] in ('done', 'error')
+            snapshot = (job['status'], json.dumps(job['progress']), offset)
+            if job['log'] or snapshot != last or finished:
+                last, last_sent = snapshot, time.monotonic()
+                yield f"event: {'end' if finished else 'progress'}\ndata: {json.dumps(job, default=str)}\n\n"
+            if finished: return
+            if time.monotonic() >= deadline:
+                yield f"event: reconnect\ndata: {json.dumps({'log_offset': offset})}\n\n"
+                return
+            if time.monotonic() - last_sent >= EVENTS_HEARTBEAT_SECONDS:
+                last_sent = time.monotonic()
+                yield ": heartbeat\n\n"   # a closed connection fails here and ends the generator
+            time.sleep(1)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(stream()), mimetype='text/event-stream', headers=headers)
 
 # --- NEW ROUTE: FETCH AMAZON DETAILS (Protected) ---
 @app.route('/api/amazon-details', methods=['POST'])
@@ -130,9 +270,64 @@ def get_amazon_details():
     url = data.get('url')
     if not url: return jsonify({"error": "No URL provided"}), 400
     
-    result = get_product_details(url)
+    # refresh=true skips the cached copy (e.g. after the listing was edited)
+    result = get_product_details(url, refresh=bool(data.get('refresh')))
     return jsonify(result)
 
+# Streamed-fetch completeness (stop reasons, per-field hit rates) and cache counters
+@app.route('/api/amazon-details/stats', methods=['GET'])
+@require_auth
+def amazon_details_stats():
+    return jsonify({"stream": STREAM_STATS.snapshot(), "cache": DETAILS_CACHE.stats()})
+
+# --- BULK AMAZON DETAILS (Protected) ---
+# Targets: JSON {"urls": [...]} (links or ASINs; a list or one per line) or an uploaded sheet.
+# format=ndjson (default) streams one JSON line per product as it completes, then a
+# {"done": true} summary line; xlsx/csv/parquet runs a job that writes a workbook.
+@app.route('/api/bulk-amazon-details', methods=['POST'])
+@require_auth
+def bulk_amazon_details_route():
+    data = request.get_json(silent=True) or {}
+    try:
+        if 'file' in request.files:
+            file = request.files['file']
+            filepath = os.path.join(UPLOAD_FOLDER, f"asins_{int(time.time())}_{file.filename}")
+            file.save(filepath)
+            targets = read_targets(filepath)
+        else:
+            urls = data.get('urls') or data.get('asins') or request.form.get('urls') or []
+            if isinstance(urls, str): urls = urls.splitlines()
+            targets = parse_targets(urls)
+        fmt = (request.args.get('format') or request.form.get('format') or data.get('format') or 'ndjson').lower()
+        report_format = None if fmt == 'ndjson' else _report_format(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not targets: return jsonify({"error": "No Amazon links or ASINs provided"}), 400
+    if len(targets) > MAX_TARGETS:
+        return jsonify({"error": f"Too many products ({len(targets)}); the limit is {MAX_TARGETS} per request"}), 400
+    refresh = str(request.form.get('refresh', data.get('refresh', ''))).lower() in ('1', 'true')
+
+    if report_format:
+        job_id = JOBS.submit('bulk_details', {"targets": targets, "report_format": report_format, "refresh": refresh})
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "status_url": f"/api/jobs/{job_id}",
+            "events_url": f"/api/jobs/{job_id}/events"
+        }), 202
+
+    def stream():
+        ok = failed = 0
+        for result in iter_bulk_details(targets, refresh=refresh):
+            if result['status'] == 'success': ok += 1
+            else: failed += 1
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"done": True, "total": len(targets), "ok": ok, "failed": failed}) + "\n"
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(stream()), mimetype='application/x-ndjson', headers=headers)
+
 # --- UPDATED ROUTE: BLOG AUTOMATION (Protected) ---
 @app.route('/publish-blog', methods=['POST'])
 @require_auth  # <--- LOCKED
@@ -168,9 +363,13 @@ def generate_seo_links_route():
     
     if not product or not asin or not specs:
         return jsonify({"error": "Name, ASIN, and Specs are required"}), 400
+    try:
+        report_format = _report_format(data)
+    except ReportFormatError as e:
+        return jsonify({"error": str(e)}), 400
     
     # 1. Run the Logic
-    result_obj = get_hybrid_keywords(product, asin, specs)
+    result_obj = get_hybrid_keywords(product, asin, specs, report_format=report_format)
     
     if not result_obj or "data" not in result_obj:
         return jsonify({"error": "Failed to generate strategies"}), 500
@@ -235,32 +434,61 @@ def bulk_suggestions_route():
     if file.filename == '':
         return jsonify({"error": "No file selected"}), 400
 
+    # e.g. "US,IN": each keyword is looked up on every marketplace side by side
+    try:
+        markets = parse_marketplaces(request.form.get('marketplaces'))
+        report_format = _report_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         # Save Input File
-        import time
         filename = f"input_{int(time.time())}_{file.filename}"
         filepath = os.path.join(UPLOAD_FOLDER, filename)
         file.save(filepath)
 
-        # Process
-        result = run_suggestion_scraper(filepath, UPLOAD_FOLDER)
-
-        if not result['success']:
-            return jsonify({"error": result['error']}), 500
-
-        # URL Fix (Same as before)
-        final_url = request.host_url.rstrip('/') + result['file_url']
-        if request.headers.get('X-Forwarded-Proto') == 'https':
-            final_url = final_url.replace('http://', 'https://')
-
+        # Runs as a checkpointed background job; progress streams from /api/jobs/<job_id>/events
+        if request.form.get('mode') == 'crawl':
+            # Long-tail mode: alphabet expansion of every seed (depth 1 or 2)
+            job_id = JOBS.submit('keyword_crawl', {
+                "filepath": filepath,
+                "filename": file.filename,
+                "depth": request.form.get('depth', default=1, type=int),
+                "marketplace": markets[0].code,
+                "report_format": report_format,
+            })
+        else:
+            # Incremental by default: rows fetched within the freshness window are reused
+            job_id = JOBS.submit('bulk_suggestions', {
+                "filepath": filepath,
+                "filename": file.filename,
+                "incremental": request.form.get('incremental', '1') != '0',
+                "fresh_days": request.form.get('fresh_days', type=float),
+                "marketplaces": ",".join(m.code for m in markets),
+                "report_format": report_format,
+            })
         return jsonify({
             "success": True,
-            "download_url": final_url
-        })
+            "job_id": job_id,
+            "status_url": f"/api/jobs/{job_id}",
+            "events_url": f"/api/jobs/{job_id}/events"
+        }), 202
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def start_background_jobs():
+    """Startup hook: picks up jobs interrupted by a restart (once; see JobQueue.recover)."""
+    JOBS.recover()
+
+# WSGI servers import this module as "server" (gunicorn server:app). Any other name,
+# e.g. "__mp_main__" in a spawned helper process, must not touch the job store.
+if __name__ == 'server':
+    start_background_jobs()
+
 if __name__ == '__main__':
+    # Skip the Flask debug reloader's parent process: its child runs the app
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_jobs()
     print("Server running on Port 5000")
     app.run(debug=True, port=5000)
\ No newline at end of file
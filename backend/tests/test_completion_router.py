@@ -0,0 +1,72 @@
+import time
+import threading
+
+from features.completion_router import CLOSED, OPEN, CompletionRouter, RouteFailed
+
+
+def _failing():
+    raise RouteFailed("blocked")
+
+
+def test_open_route_is_skipped_while_another_is_healthy():
+    router = CompletionRouter(failure_threshold=1, cooldown_seconds=60)
+    router.call({"direct": _failing, "proxy": lambda: ["a"]})
+    calls = []
+    result = router.call({"direct": lambda: calls.append("direct"), "proxy": lambda: ["b"]})
+    assert result == ["b"]
+    assert calls == []
+
+
+def test_single_tripped_route_waits_for_cooldown_and_probes():
+    router = CompletionRouter(failure_threshold=1, cooldown_seconds=0.2)
+    assert router.call({"direct": _failing}) is None
+    assert router.stats()[0]["state"] == OPEN
+
+    started = time.monotonic()
+    result = router.call({"direct": lambda: ["kw"]})
+    assert result == ["kw"]
+    assert time.monotonic() - started >= 0.15
+    assert router.stats()[0]["state"] == CLOSED
+
+
+def test_waiters_share_the_probe_outcome():
+    router = CompletionRouter(failure_threshold=1, cooldown_seconds=0.1)
+    router.call({"direct": _failing})
+    probes = []
+
+    def probe():
+        started = time.monotonic()
+        time.sleep(0.1)
+        probes.append((started, time.monotonic()))
+        return ["kw"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(router.call({"direct": probe}))) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join(5)
+    assert results == [["kw"]] * 4
+    # One probe on its own, then the others go through the recovered route
+    probes.sort()
+    assert len(probes) == 4
+    assert all(started >= probes[0][1] for started, _ in probes[1:])
+
+
+def test_unused_probe_is_released():
+    router = CompletionRouter(failure_threshold=1, cooldown_seconds=0.05, max_wait=1)
+    router.call({"a": _failing, "b": _failing})
+    time.sleep(0.1)
+    # Both routes are due for a probe; "a" answers, so "b" is never run
+    assert router.call({"a": lambda: ["a"], "b": lambda: ["b"]}) == ["a"]
+
+    started = time.monotonic()
+    assert router.call({"b": lambda: ["b"]}) == ["b"]
+    assert time.monotonic() - started < 0.5
+    assert {r["route"]: r["state"] for r in router.stats()} == {"a": CLOSED, "b": CLOSED}
+
+
+def test_gives_up_after_max_wait():
+    router = CompletionRouter(failure_threshold=1, cooldown_seconds=60, max_wait=0.1)
+    router.call({"direct": _failing})
+    started = time.monotonic()
+    assert router.call({"direct": lambda: ["kw"]}) is None
+    assert time.monotonic() - started < 1
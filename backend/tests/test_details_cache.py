@@ -0,0 +1,47 @@
+from features import amazon_details
+from features.details_cache import DetailsCache
+
+HEAD = '<span id="productTitle">Steel Bottle</span><a id="bylineInfo">Brand: Acme</a>'
+TAIL = '<img id="landingImage" src="https://m.media-amazon.com/b.jpg"><div id="feature-bullets"><li>1 L</li></div>'
+
+
+class _Response:
+    status_code, encoding, text = 200, "utf-8", ""
+
+    def __init__(self, body):
+        self.body = body.encode()
+
+    def iter_content(self, size):
+        return (self.body[i:i + size] for i in range(0, len(self.body), size))
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+
+def _fetch_from(monkeypatch, body, budget):
+    monkeypatch.setenv("SCRAPE_DO_TOKEN", "offline")
+    monkeypatch.setattr(amazon_details.requests, "get", lambda *a, **k: _Response(body))
+    monkeypatch.setattr(amazon_details, "fetch_product_page",
+                        lambda asin, token, info=None, _f=amazon_details.fetch_product_page:
+                        _f(asin, token, stream=True, budget=budget, info=info))
+    return lambda: amazon_details.fetch_details("B000TEST01")
+
+
+def test_budget_cut_read_is_marked_partial_and_not_cached(tmp_path, monkeypatch):
+    body = HEAD + "x" * (4 * amazon_details.FETCH_CHUNK) + TAIL
+    fetch = _fetch_from(monkeypatch, body, budget=amazon_details.FETCH_CHUNK)
+    cache = DetailsCache(path=str(tmp_path / "details.db"))
+
+    details, source = cache.get_or_fetch("B000TEST01", fetch)
+    assert source == "fetched"
+    assert details["partial"] and details["missing"] == ["bullets", "image"]
+    assert cache.get_or_fetch("B000TEST01", fetch)[1] == "fetched"
+
+
+def test_complete_read_is_cached(tmp_path, monkeypatch):
+    fetch = _fetch_from(monkeypatch, HEAD + TAIL + "x" * 4096, budget=64 * 1024)
+    cache = DetailsCache(path=str(tmp_path / "details.db"))
+
+    details, _ = cache.get_or_fetch("B000TEST01", fetch)
+    assert "partial" not in details and details["title"] == "Steel Bottle"
+    assert cache.get_or_fetch("B000TEST01", fetch)[1] == "memory"
@@ -0,0 +1,32 @@
+from features.html_extract import IncrementalExtractor, find_element
+
+
+def test_skips_commented_out_element():
+    html = '<div><!-- <span id="productTitle">OLD</span> --><span id="productTitle">NEW</span></div>'
+    assert find_element(html, "span", {"id": "productTitle"}).get_text() == "NEW"
+
+
+def test_skips_element_inside_script():
+    html = "<script>x = '<span id=\"productTitle\">JS</span>';</script><span id=\"productTitle\">NEW</span>"
+    assert find_element(html, "span", {"id": "productTitle"}).get_text() == "NEW"
+
+
+def test_quoted_angle_brackets_in_attributes():
+    for alt in ("a > b", "a < b", "x<img id='y'>"):
+        html = f'<div><img alt="{alt}" id="landingImage" src="u.jpg"></div>'
+        element = find_element(html, "img", {"id": "landingImage"})
+        assert element is not None, alt
+        assert element.get("src") == "u.jpg"
+
+
+def test_attribute_text_outside_a_tag_is_not_a_match():
+    html = '<p>id="landingImage"> text</p><img id="other">'
+    assert find_element(html, "img", {"id": "landingImage"}) is None
+
+
+def test_incremental_waits_for_a_long_opening_tag():
+    html = '<html>' + 'x' * 3000 + '<img id="landingImage" data-a-dynamic-image="' + 'y' * 2000 + '" alt="a > b">'
+    extractor = IncrementalExtractor({"image": [("img", {"id": "landingImage"})]})
+    assert not extractor.feed(html[:3100])
+    assert not extractor.feed(html[3100:-5])
+    assert extractor.feed(html[-5:])
@@ -0,0 +1,22 @@
+from features.label_index import LabelIndex
+
+
+def _index(names):
+    return LabelIndex("/labels", names, 0, "sig")
+
+
+def test_suggests_closest_labels_for_a_near_miss():
+    index = _index([f"SP-{i:06d} Remote.lbl" for i in range(5000)] + ["SP-ATP6W Cover.lbl"])
+    assert index.suggest("SP-ATP6") == ["SP-ATP6W Cover.lbl"]
+    assert index.suggest("SP-004217X")[0] == "SP-004217 Remote.lbl"
+
+
+def test_no_suggestion_without_real_overlap():
+    index = _index(["SP-000001 Remote.lbl", "TV-STAND Cover.lbl"])
+    assert index.suggest("QWERTY-99") == []
+
+
+def test_suggestions_are_memoized():
+    index = _index(["SP-000001 Remote.lbl", "SP-000002 Remote.lbl"])
+    first = index.suggest("sp-000001x")
+    assert index.suggest("SP-000001X ") is first
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from fake_printer import FakePrinter
+from features.print_backends import PrinterStatusError, RawSocketBackend
+
+
+@pytest.fixture
+def label(tmp_path):
+    stem = tmp_path / "SP-0001 Remote"
+    (tmp_path / "SP-0001 Remote.lbl").write_text("")
+    (tmp_path / "SP-0001 Remote.zpl").write_text("^XA^FO50,50^A0N,40,40^FDSP-0001^FS^PQ1^XZ")
+    return str(stem) + ".lbl"
+
+
+@pytest.mark.parametrize("qty", [1, 10, 20])
+def test_print_label_returns_once_the_labels_are_out(label, qty):
+    with FakePrinter(seconds_per_label=0.02) as printer:
+        backend = RawSocketBackend(printer.host, printer.port)
+        backend.STATUS_POLL_SECONDS = 0.01
+        started = time.monotonic()
+        backend.print_label(label, qty)
+        elapsed = time.monotonic() - started
+        # Nothing left to print when print_label() returns
+        assert printer.wait_idle(timeout=0)
+        assert len(printer.jobs) == 1
+        assert elapsed >= qty * 0.02 * 0.9
+        assert backend.confirms_completion
+
+
+def test_silent_printer_falls_back_to_estimates(label):
+    with FakePrinter(answer_status=False) as printer:
+        backend = RawSocketBackend(printer.host, printer.port)
+        backend.STATUS_TIMEOUT = 0.2
+        backend.print_label(label, 1)
+        assert not backend.confirms_completion
+
+
+def test_stop_condition_fails_the_job(label, monkeypatch):
+    with FakePrinter(seconds_per_label=0.05) as printer:
+        status = printer.host_status
+
+        def paused():
+            return status().replace(b"\x02030,0,0,", b"\x02030,0,1,", 1)
+
+        monkeypatch.setattr(printer, "host_status", paused)
+        backend = RawSocketBackend(printer.host, printer.port)
+        backend.STATUS_POLL_SECONDS = 0.01
+        with pytest.raises(PrinterStatusError, match="paused"):
+            backend.print_label(label, 5)
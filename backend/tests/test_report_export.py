@@ -0,0 +1,35 @@
+import csv
+
+import openpyxl
+import pytest
+
+from features.report_export import ReportWriter, write_report
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        return list(csv.reader(fh))
+
+
+def test_dict_rows_without_columns_use_first_row_keys(tmp_path):
+    path = write_report(str(tmp_path / "out.csv"), [{"a": 1, "b": "x"}, {"b": "y", "a": 2, "c": 3}])
+    assert _read_csv(path) == [["a", "b"], ["1", "x"], ["2", "y"]]
+
+
+def test_list_rows_with_columns(tmp_path):
+    path = str(tmp_path / "out.xlsx")
+    with ReportWriter(path, ["SKU", "Qty"]) as out:
+        out.write_row(["A1", 2])
+        out.write_row(("B2", float("nan")))
+    rows = list(openpyxl.load_workbook(path).active.iter_rows(values_only=True))
+    assert rows == [("SKU", "Qty"), ("A1", 2), ("B2", None)]
+
+
+def test_list_rows_without_columns_are_rejected(tmp_path):
+    path = tmp_path / "out.csv"
+    out = ReportWriter(str(path))
+    with pytest.raises(ValueError, match="columns"):
+        out.write_row(["A1", 2])
+    out.abort()
+    assert not path.exists()
+    assert not (tmp_path / "out.csv.part").exists()
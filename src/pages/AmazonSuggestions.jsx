@@ -6,10 +6,86 @@ const AmazonSuggestions = () => {
   const [file, setFile] = useState(null);
   const [loading, setLoading] = useState(false);
   const [downloadUrl, setDownloadUrl] = useState(null);
+  const [progress, setProgress] = useState(null);
+  const [incremental, setIncremental] = useState(true);
+  const [mode, setMode] = useState('suggest');  // 'suggest' | 'crawl' (long-tail expansion)
+  const [depth, setDepth] = useState(1);
+  const [marketplaces, setMarketplaces] = useState(['US']);
+
+  const toggleMarketplace = (code) => {
+    setMarketplaces(prev => prev.includes(code)
+      ? (prev.length > 1 ? prev.filter(c => c !== code) : prev)
+      : [...prev, code]);
+  };
+  const [summary, setSummary] = useState(null);
 
   const handleFileChange = (e) => {
     setFile(e.target.files[0]);
     setDownloadUrl(null);
+    setProgress(null);
+  };
+
+  // Follow the background job over Server-Sent Events; resolves with the finished job.
+  // fetch() instead of EventSource so the token goes in a header, not the URL. The server
+  // ends each stream after a while with a 'reconnect' event: resume from its log offset.
+  const followJob = async (eventsUrl, token) => {
+    let since = 0;
+    while (true) {
+      const response = await fetch(`${api.defaults.baseURL}${eventsUrl}?since=${since}`, {
+        headers: { 'X-Access-Token': token || '', 'Accept': 'text/event-stream' }
+      });
+      if (!response.ok || !response.body) throw new Error(`Job stream failed (${response.status})`);
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let resume = null;
+      while (resume === null) {
+        const { done, value } = await reader.read();
+        if (done) throw new Error("Lost connection to the job stream");
+        buffer += decoder.decode(value, { stream: true });
+        // Events are separated by a blank line; ':' lines are heartbeats
+        let end;
+        while (resume === null && (end = buffer.indexOf('\n\n')) !== -1) {
+          const block = buffer.slice(0, end);
+          buffer = buffer.slice(end + 2);
+          let event = 'message', data = '';
+          for (const line of block.split('\n')) {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) data += line.slice(5).trim();
+          }
+          if (!data) continue;
+          const payload = JSON.parse(data);
+          if (event === 'reconnect') {
+            resume = payload.log_offset;
+          } else {
+            setProgress(payload.progress);
+            if (event === 'end') {
+              reader.cancel();
+              return payload;
+            }
+            since = payload.log_offset + payload.log.length;
+          }
+        }
+      }
+      reader.cancel();
+      since = resume;
+    }
+  };
+
+  const pollJob = async (statusUrl) => {
+    while (true) {
+      const { data } = await api.get(statusUrl);
+      setProgress(data.progress);
+      if (data.status === 'done' || data.status === 'error') return data;
+      await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+  };
+
+  const formatEta = (seconds) => {
+    if (seconds == null) return "--";
+    const m = Math.floor(seconds / 60);
+    return m ? `${m}m ${seconds % 60}s` : `${seconds}s`;
   };
 
   const handleUpload = async () => {
@@ -18,6 +94,11 @@ const AmazonSuggestions = () => {
     setLoading(true);
     const formData = new FormData();
     formData.append('file', file);
+    formData.append('incremental', incremental ? '1' : '0');
+    formData.append('mode', mode);
+    formData.append('depth', String(depth));
+    formData.append('marketplaces', marketplaces.join(','));
+    setSummary(null);
 
     // 1. Get the Token (Password) from Local Storage
     const token = localStorage.getItem('authToken');
@@ -30,8 +111,15 @@ const AmazonSuggestions = () => {
         }
       });
 
-      if (response.data.success) {
-        setDownloadUrl(response.data.download_url);
+      // The run continues on the server as a job; if the stream drops, fall back to polling
+      const { events_url, status_url } = response.data;
+      const job = await followJob(events_url, token).catch(() => pollJob(status_url));
+
+      if (job.status === 'done') {
+        setDownloadUrl(job.result.file_url);
+        setSummary(job.result.message);
+      } else {
+        alert("Error: " + (job.error || "Processing failed"));
       }
     } catch (error) {
       console.error(error);
@@ -70,7 +158,7 @@ const AmazonSuggestions = () => {
             <div className="border-2 border-dashed border-slate-300 rounded-xl p-10 text-center bg-slate-50 hover:bg-slate-100 transition-colors">
                 <input 
                     type="file" 
-                    accept=".xlsx, .xls"
+                    accept=".xlsx, .xls, .csv"
                     onChange={handleFileChange}
                     className="hidden" 
                     id="suggestion-upload"
@@ -81,13 +169,56 @@ const AmazonSuggestions = () => {
                         {file ? file.name : "Click to Upload Excel File"}
                     </span>
                     <span className="text-xs text-slate-400 mt-2">
-                        Supported: .xlsx (Column A should contain product names)
+                        Supported: .xlsx, .csv (a "Keyword"/"Product" column, else Column A)
                     </span>
                 </label>
             </div>
 
             {/* Actions */}
-            <div className="mt-6 flex justify-end">
+            <div className="mt-6 flex justify-between items-center">
+                <div className="flex items-center gap-4 text-sm text-slate-600">
+                    <select
+                        value={mode}
+                        onChange={(e) => setMode(e.target.value)}
+                        disabled={loading}
+                        className="border border-slate-300 rounded-lg px-2 py-1"
+                    >
+                        <option value="suggest">Top 10 suggestions</option>
+                        <option value="crawl">Long-tail crawl (a-z, 0-9)</option>
+                    </select>
+                    {['US', 'IN'].map(code => (
+                        <label key={code} className="flex items-center gap-1 cursor-pointer">
+                            <input
+                                type="checkbox"
+                                checked={marketplaces.includes(code)}
+                                onChange={() => toggleMarketplace(code)}
+                                disabled={loading}
+                            />
+                            {code}
+                        </label>
+                    ))}
+                    {mode === 'crawl' ? (
+                        <select
+                            value={depth}
+                            onChange={(e) => setDepth(Number(e.target.value))}
+                            disabled={loading}
+                            className="border border-slate-300 rounded-lg px-2 py-1"
+                        >
+                            <option value={1}>Depth 1</option>
+                            <option value={2}>Depth 2</option>
+                        </select>
+                    ) : (
+                        <label className="flex items-center gap-2 cursor-pointer">
+                            <input
+                                type="checkbox"
+                                checked={incremental}
+                                onChange={(e) => setIncremental(e.target.checked)}
+                                disabled={loading}
+                            />
+                            Reuse unchanged rows from recent runs
+                        </label>
+                    )}
+                </div>
                 <button 
                     onClick={handleUpload}
                     disabled={!file || loading}
@@ -98,6 +229,22 @@ const AmazonSuggestions = () => {
                 </button>
             </div>
 
+            {/* Live Progress */}
+            {loading && progress?.total > 0 && (
+                <div className="mt-6">
+                    <div className="flex justify-between text-xs font-bold text-slate-500 mb-2">
+                        <span>{progress.done} / {progress.total} {mode === 'crawl' ? 'seeds' : 'lookups'}</span>
+                        <span>{progress.rate ? `${progress.rate}/s` : ''} · ETA {formatEta(progress.eta_seconds)}</span>
+                    </div>
+                    <div className="h-2 bg-slate-100 rounded-full overflow-hidden">
+                        <div
+                            className="h-full bg-orange-500 transition-all"
+                            style={{ width: `${Math.round(100 * progress.done / progress.total)}%` }}
+                        />
+                    </div>
+                </div>
+            )}
+
             {/* Success / Download */}
             {downloadUrl && (
                 <div className="mt-8 p-4 bg-green-50 border border-green-200 rounded-xl flex justify-between items-center animate-pulse">
@@ -107,7 +254,7 @@ const AmazonSuggestions = () => {
                         </div>
                         <div>
                             <h4 className="text-sm font-bold text-green-800">Scraping Complete!</h4>
-                            <p className="text-xs text-green-600">Your keyword file is ready.</p>
+                            <p className="text-xs text-green-600">{summary || "Your keyword file is ready."}</p>
                         </div>
                     </div>
                     
@@ -15,6 +15,18 @@ const SKUPrinting = () => {
 
   useEffect(() => { logsEndRef.current?.scrollIntoView({ behavior: "smooth" }); }, [logs]);
 
+  // Polls /api/jobs/<id>, appending only the new log lines each time
+  const pollPrintJob = async (jobId) => {
+    let offset = 0;
+    while (true) {
+      const { data } = await api.get(`/api/jobs/${jobId}`, { params: { since: offset } });
+      if (data.log?.length) setLogs(prev => [...prev, ...data.log]);
+      offset = data.log_total;
+      if (data.status === 'done' || data.status === 'error') return data;
+      await new Promise(resolve => setTimeout(resolve, 1500));
+    }
+  };
+
   const handlePrint = async () => {
     if (!file) return;
     setStatus('processing');
@@ -27,13 +39,17 @@ const SKUPrinting = () => {
       // 2. USE 'api.post' (Secure) instead of 'axios.post'
       // Remove the domain, just use the endpoint '/print-sku'
       const response = await api.post('/print-sku', formData, {
-        headers: { 'Content-Type': 'multipart/form-data' }
+        // respond-async: get the job ID back right away instead of waiting for the whole run
+        headers: { 'Content-Type': 'multipart/form-data', 'Prefer': 'respond-async' }
       });
 
-      const { log, printed_images } = response.data;
-      setLogs(log);
-      setPrintedImages(printed_images);
-      setStatus('success');
+      // 3. The server queues the print run and returns a job ID; poll until it finishes
+      const { job_id, log } = response.data;
+      setLogs(prev => [...prev, ...(log || [])]);
+      const job = await pollPrintJob(job_id);
+
+      setPrintedImages(job.result?.printed_images || []);
+      setStatus(job.status === 'done' ? 'success' : 'error');
     } catch (error) {
       console.error("Print Error:", error);
       // Better error handling for 401